@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crée un template de prix allégé à partir du fichier de base
+============================================================
+
+Le fichier de base (nepastoucher.xlsx) fait ~1.7 Mo, dont ~1.57 Mo pour l'objet
+OLE embarqué (xl/embeddings/oleObject1.bin). Les parties suivantes n'ont aucun
+effet sur le calcul des prix et sont retirées :
+- xl/embeddings/ (objet OLE) + son dessin VML et son image d'aperçu
+- xl/printerSettings/ (paramètres d'impression)
+- customXml/ (métadonnées SharePoint)
+- xl/calcChain.xml (ordre de calcul, reconstruit par Excel)
+
+Le template allégé est vérifié : toutes les feuilles doivent contenir exactement
+les mêmes valeurs et formules que le fichier de base, sinon il est supprimé.
+Les scripts generate_*.py l'utilisent automatiquement s'il est à jour
+(voir generation_commune.choisir_template).
+
+L'objet OLE n'est de toute façon pas conservé dans les classeurs générés :
+openpyxl ne le réécrit pas.
+
+Utilisation :
+    python alleger_template.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+import sys
+import zipfile
+
+from generation_commune import chemin_template_allege, fichier_infos_template
+from registre_templates import empreinte_preparation
+from xlsx_brut import DATE_ZIP_FIXE
+
+# Configuration
+BASE_DIR = 'fichier de base'
+SOURCE_FILE = os.path.join(BASE_DIR, 'nepastoucher.xlsx')
+
+# Parties sans effet sur les prix
+PARTIES_INUTILES = ('xl/printerSettings/', 'customXml/', 'xl/calcChain.xml')
+# Objet OLE embarqué et son dessin VML
+PARTIES_EMBEDDINGS = ('xl/embeddings/', 'xl/drawings/vmlDrawing')
+
+RE_RELATION = re.compile(r'<Relationship\s[^>]*?/>')
+
+
+def _attribut(balise, nom):
+    """Lit un attribut dans une balise XML brute"""
+    m = re.search(rf'\s{nom}="([^"]*)"', balise)
+    return m.group(1) if m else None
+
+
+def _fichier_rels(partie):
+    """Chemin du fichier .rels associé à une partie (xl/a/b.xml -> xl/a/_rels/b.xml.rels)"""
+    dossier, nom = posixpath.split(partie)
+    return posixpath.join(dossier, '_rels', nom + '.rels')
+
+
+def _partie_source(fichier_rels):
+    """Partie décrite par un fichier .rels (inverse de _fichier_rels)"""
+    dossier, nom = posixpath.split(fichier_rels)
+    return posixpath.join(posixpath.dirname(dossier), nom[:-len('.rels')])
+
+
+def _cible(fichier_rels, relation):
+    """Résout la cible d'une relation en chemin de partie dans le zip"""
+    cible = _attribut(relation, 'Target')
+    if cible is None or _attribut(relation, 'TargetMode') == 'External':
+        return None
+    if cible.startswith('/'):
+        return cible[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(_partie_source(fichier_rels)), cible))
+
+
+def _retirer_references(xml, rid):
+    """Retire d'une partie XML les éléments qui référencent une relation supprimée"""
+    # Objets OLE : le bloc complet (Choice + Fallback) référence la relation
+    xml = re.sub(rf'<oleObjects>(?:(?!</oleObjects>).)*r:id="{rid}"(?:(?!</oleObjects>).)*</oleObjects>',
+                 '', xml, flags=re.S)
+    # Dessin VML (legacyDrawing) : élément vide
+    xml = re.sub(rf'<legacyDrawing[^>]*r:id="{rid}"[^>]*/>', '', xml)
+    # pageSetup : seul l'attribut vers les paramètres d'impression est retiré
+    xml = re.sub(rf'(<pageSetup[^>]*?)\s+r:id="{rid}"', r'\1', xml)
+    return xml
+
+
+def alleger_template(source, destination):
+    """
+    Écrit une copie allégée de source dans destination.
+    Retourne la liste des parties retirées.
+    """
+    with zipfile.ZipFile(source) as zin:
+        noms = zin.namelist()
+        contenus = {nom: zin.read(nom) for nom in noms}
+
+    prefixes = PARTIES_INUTILES + PARTIES_EMBEDDINGS
+    supprimees = {nom for nom in noms if nom.startswith(prefixes)}
+
+    # Supprimer les relations vers les parties retirées, jusqu'à stabilité
+    # (une partie retirée emporte son .rels, ce qui peut rendre une image orpheline)
+    while True:
+        supprimees |= {_fichier_rels(nom) for nom in supprimees if _fichier_rels(nom) in contenus}
+
+        for nom in noms:
+            if not nom.endswith('.rels') or nom in supprimees:
+                continue
+            xml = contenus[nom].decode('utf-8')
+            relations_retirees = []
+            for relation in RE_RELATION.findall(xml):
+                if _cible(nom, relation) in supprimees:
+                    xml = xml.replace(relation, '')
+                    relations_retirees.append(_attribut(relation, 'Id'))
+            if not relations_retirees:
+                continue
+            contenus[nom] = xml.encode('utf-8')
+
+            partie = _partie_source(nom)
+            if partie in contenus and partie not in supprimees:
+                xml_partie = contenus[partie].decode('utf-8')
+                for rid in relations_retirees:
+                    xml_partie = _retirer_references(xml_partie, rid)
+                    if f'"{rid}"' in xml_partie:
+                        raise ValueError(f"{partie} référence encore {rid}, allègement impossible")
+                contenus[partie] = xml_partie.encode('utf-8')
+
+                # Images qui n'étaient utilisées que par les éléments retirés (aperçu OLE)
+                if partie.startswith('xl/worksheets/'):
+                    for relation in RE_RELATION.findall(xml):
+                        rid = _attribut(relation, 'Id')
+                        if _attribut(relation, 'Type').endswith('/image') and f'"{rid}"' not in xml_partie:
+                            xml = xml.replace(relation, '')
+                    contenus[nom] = xml.encode('utf-8')
+
+        # Images devenues orphelines (aperçu de l'objet OLE)
+        referencees = set()
+        for nom in noms:
+            if nom.endswith('.rels') and nom not in supprimees:
+                for relation in RE_RELATION.findall(contenus[nom].decode('utf-8')):
+                    referencees.add(_cible(nom, relation))
+        orphelines = {nom for nom in noms
+                      if nom.startswith('xl/media/') and nom not in referencees and nom not in supprimees}
+        if not orphelines:
+            break
+        supprimees |= orphelines
+
+    # Forme de compatibilité de l'objet OLE dans les dessins (renvoie au VML retiré)
+    for nom in noms:
+        if nom.startswith('xl/drawings/drawing') and nom not in supprimees:
+            xml = contenus[nom].decode('utf-8')
+            xml = re.sub(r'<mc:AlternateContent(?:(?!</mc:AlternateContent>).)*a14:compatExt'
+                         r'(?:(?!</mc:AlternateContent>).)*</mc:AlternateContent>', '', xml, flags=re.S)
+            contenus[nom] = xml.encode('utf-8')
+
+    # Types de contenu
+    types = contenus['[Content_Types].xml'].decode('utf-8')
+    for nom in supprimees:
+        types = re.sub(rf'<Override PartName="/{re.escape(nom)}"[^>]*/>', '', types)
+    contenus['[Content_Types].xml'] = types.encode('utf-8')
+
+    # Dates fixes : le même fichier de base donne toujours le même template allégé
+    with zipfile.ZipFile(destination, 'w', zipfile.ZIP_DEFLATED) as zout:
+        for nom in noms:
+            if nom not in supprimees:
+                zout.writestr(zipfile.ZipInfo(nom, DATE_ZIP_FIXE), contenus[nom],
+                              compress_type=zipfile.ZIP_DEFLATED)
+
+    return sorted(supprimees)
+
+
+def _valeurs_feuille(ws):
+    """Valeurs et formules d'une feuille, comparables entre deux classeurs"""
+    valeurs = {}
+    for coordonnees, cell in ws._cells.items():
+        valeur = cell.value
+        if valeur is None:
+            continue
+        # Les formules matricielles (ArrayFormula) n'ont pas d'égalité par valeur
+        if hasattr(valeur, 'ref') and hasattr(valeur, 'text'):
+            valeur = ('matricielle', valeur.ref, valeur.text)
+        valeurs[coordonnees] = valeur
+    return valeurs
+
+
+def verifier_template(source, destination):
+    """
+    Vérifie que le template allégé donne les mêmes prix : mêmes feuilles, mêmes
+    noms définis, et mêmes valeurs/formules dans toutes les cellules.
+    Retourne la liste des différences (vide si identique).
+    """
+    import openpyxl
+
+    wb_source = openpyxl.load_workbook(source)
+    wb_allege = openpyxl.load_workbook(destination)
+    differences = []
+
+    if wb_source.sheetnames != wb_allege.sheetnames:
+        differences.append(f"Feuilles : {wb_source.sheetnames} ≠ {wb_allege.sheetnames}")
+    if sorted(wb_source.defined_names.keys()) != sorted(wb_allege.defined_names.keys()):
+        differences.append("Noms définis différents")
+
+    for nom in wb_source.sheetnames:
+        if nom not in wb_allege.sheetnames:
+            continue
+        cellules_source = _valeurs_feuille(wb_source[nom])
+        cellules_allege = _valeurs_feuille(wb_allege[nom])
+        if cellules_source != cellules_allege:
+            ecarts = set(cellules_source.items()) ^ set(cellules_allege.items())
+            differences.append(f"Feuille '{nom}' : {len(ecarts)} cellules différentes")
+
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crée un template de prix allégé")
+    parser.add_argument('--source', default=SOURCE_FILE, help="Fichier de base (défaut : %(default)s)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("ALLÈGEMENT DU TEMPLATE DE PRIX")
+    print("=" * 80)
+
+    if not os.path.exists(args.source):
+        print(f"❌ Erreur: {args.source} n'existe pas !")
+        sys.exit(1)
+
+    destination = chemin_template_allege(args.source)
+    supprimees = alleger_template(args.source, destination)
+
+    print(f"\n🗑️  {len(supprimees)} parties retirées :")
+    for nom in supprimees:
+        print(f"   - {nom}")
+
+    print("\n🔍 Vérification des formules et valeurs...")
+    differences = verifier_template(args.source, destination)
+    if differences:
+        os.remove(destination)
+        print("❌ Le template allégé ne donne pas les mêmes prix, il a été supprimé :")
+        for difference in differences:
+            print(f"   - {difference}")
+        sys.exit(1)
+
+    # Empreinte du fichier de base : le template allégé n'est utilisé que s'il correspond
+    with open(args.source, 'rb') as f:
+        empreinte = hashlib.sha256(f.read()).hexdigest()
+    infos = {
+        'source': os.path.basename(args.source),
+        'source_sha256': empreinte,
+        'source_taille': os.path.getsize(args.source),
+        'source_mtime': os.path.getmtime(args.source),
+        'code_sha256': empreinte_preparation(),
+    }
+    with open(fichier_infos_template(args.source), 'w', encoding='utf-8') as f:
+        json.dump(infos, f, indent=2, ensure_ascii=False)
+
+    taille_source = os.path.getsize(args.source)
+    taille_allegee = os.path.getsize(destination)
+    print(f"   ✅ Formules et valeurs identiques")
+    print(f"\n📄 Template allégé : {destination}")
+    print(f"   {taille_source / 1024:.0f} Ko → {taille_allegee / 1024:.0f} Ko "
+          f"({100 * taille_allegee / taille_source:.0f}%)")
+
+
+if __name__ == '__main__':
+    main()
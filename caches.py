@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caches LRU bornés en taille, en mémoire et sur disque
+======================================================
+
+Utilisés par materialisation.py (classeurs construits, .cache_variants/) et
+registre_templates.py (templates et bases préparées, .cache_templates/) ;
+chacun fixe son dossier et sa taille maximale.
+"""
+
+import os
+from collections import OrderedDict
+
+
+class CacheMemoire:
+    """Cache LRU en mémoire, borné par la taille totale des contenus"""
+
+    def __init__(self, taille_max):
+        self.taille_max = taille_max
+        self.taille = 0
+        self.entrees = OrderedDict()
+
+    def lire(self, cle):
+        contenu = self.entrees.get(cle)
+        if contenu is not None:
+            self.entrees.move_to_end(cle)
+        return contenu
+
+    def ecrire(self, cle, contenu):
+        if len(contenu) > self.taille_max:
+            return
+        if cle in self.entrees:
+            self.taille -= len(self.entrees.pop(cle))
+        self.entrees[cle] = contenu
+        self.taille += len(contenu)
+        while self.taille > self.taille_max:
+            _, ancien = self.entrees.popitem(last=False)
+            self.taille -= len(ancien)
+
+    def vider(self):
+        self.entrees.clear()
+        self.taille = 0
+
+
+class CacheDisque:
+    """
+    Cache LRU sur disque : la clé (empreinte, nom) correspond à
+    <dossier>/<empreinte>/<nom>.xlsx.
+    La date de modification sert de date de dernier accès (mise à jour à
+    chaque lecture) ; les fichiers les plus anciens sont supprimés au-delà
+    de taille_max.
+    """
+
+    def __init__(self, dossier, taille_max):
+        self.dossier = dossier
+        self.taille_max = taille_max
+
+    def _chemin(self, cle):
+        empreinte, nom = cle
+        return os.path.join(self.dossier, empreinte, f'{nom}.xlsx')
+
+    def lire(self, cle):
+        chemin = self._chemin(cle)
+        try:
+            with open(chemin, 'rb') as f:
+                contenu = f.read()
+            os.utime(chemin)
+            return contenu
+        except OSError:
+            return None
+
+    def ecrire(self, cle, contenu):
+        chemin = self._chemin(cle)
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        # Fichier temporaire + renommage : un classeur n'est jamais lu à moitié écrit
+        temporaire = f'{chemin}.{os.getpid()}.tmp'
+        with open(temporaire, 'wb') as f:
+            f.write(contenu)
+        os.replace(temporaire, chemin)
+        self._limiter()
+
+    def _fichiers(self):
+        fichiers = []
+        for racine, _, noms in os.walk(self.dossier):
+            for nom in noms:
+                if nom.endswith('.xlsx'):
+                    chemin = os.path.join(racine, nom)
+                    try:
+                        infos = os.stat(chemin)
+                    except OSError:
+                        continue
+                    fichiers.append((infos.st_mtime, infos.st_size, chemin))
+        return fichiers
+
+    def _limiter(self):
+        fichiers = self._fichiers()
+        taille = sum(taille for _, taille, _ in fichiers)
+        for _, taille_fichier, chemin in sorted(fichiers):
+            if taille <= self.taille_max:
+                break
+            try:
+                os.remove(chemin)
+            except OSError:
+                continue
+            taille -= taille_fichier
+
+    def taille(self):
+        return sum(taille for _, taille, _ in self._fichiers())
+
+    def vider(self):
+        for _, _, chemin in self._fichiers():
+            try:
+                os.remove(chemin)
+            except OSError:
+                pass
@@ -13,6 +13,11 @@ Processus :
 3. Calcul des formules Excel (ouverture dans Excel)
 4. Extraction des prix et composants depuis les Excel
 5. Génération du fichier final resultats_tous.json
+6. Vérification de la cohérence des prix (verifier_prix.py)
+
+Calcul direct (tarification_directe.py) : les étapes 2 à 4 en une passe, chaque
+variant est calculé dans le classeur de base ouvert une fois dans Excel, sans
+écrire ni relire de fichier par variant (les fichiers Excel sont facultatifs).
 
 Utilisation :
     python calculateur_prix_camflex.py
@@ -26,6 +31,8 @@ import json
 from datetime import datetime
 from pathlib import Path
 
+from generation_commune import FICHIER_METRIQUES, choisir_template
+
 # Configuration
 BASE_DIR = 'fichier de base'
 SOURCE_FILE = os.path.join(BASE_DIR, 'nepastoucher.xlsx')
@@ -140,6 +147,33 @@ def verifier_fichier_base():
     
     return True
 
+def preparer_template_allege():
+    """Crée le template allégé utilisé par les scripts de génération (optionnel)"""
+    print_section("Template de prix allégé")
+
+    if choisir_template(SOURCE_FILE) != SOURCE_FILE:
+        print("   ✅ Le template allégé est à jour")
+        return True
+
+    print("   Le fichier de base contient des parties inutiles pour les prix")
+    print("   (objet OLE de ~1.5 Mo, paramètres d'impression, customXml, calcChain).")
+    creer = demander_oui_non(
+        "   🪶 Voulez-vous créer un template allégé pour accélérer la génération ?",
+        defaut=True
+    )
+    if not creer:
+        print("   ⏭️  Utilisation du fichier de base complet")
+        return True
+
+    result = subprocess.run([sys.executable, 'alleger_template.py'], capture_output=True, text=True)
+    if result.returncode == 0:
+        print(f"   ✅ Template allégé créé et vérifié")
+    else:
+        print(f"   ⚠️  Template allégé non créé, utilisation du fichier de base complet")
+        if result.stdout:
+            print(f"      {result.stdout.strip().splitlines()[-1]}")
+    return True
+
 def verifier_scripts_generation():
     """Vérifie que tous les scripts de génération existent"""
     print_section("Vérification des scripts de génération")
@@ -212,6 +246,7 @@ def generer_tous_excel():
             echecs += 1
     
     print(f"\n📊 Résumé : {succes} succès, {echecs} échecs")
+    afficher_metriques_generation()
     
     if echecs > 0:
         continuer = demander_oui_non(
@@ -222,6 +257,27 @@ def generer_tous_excel():
     
     return True
 
+def afficher_metriques_generation():
+    """Tableau des durées par type (metriques.json écrit par chaque script de génération)"""
+    lignes = []
+    for type_abri in sorted(os.listdir(RESULTATS_DIR)) if os.path.isdir(RESULTATS_DIR) else []:
+        chemin = os.path.join(RESULTATS_DIR, type_abri, FICHIER_METRIQUES)
+        if not os.path.exists(chemin):
+            continue
+        with open(chemin, 'r', encoding='utf-8') as f:
+            metriques = json.load(f)
+        phases = metriques.get('phases', {})
+        lignes.append((type_abri, metriques.get('variants', 0), metriques.get('duree_secondes', 0),
+                       phases.get('chargement', {}).get('p50_ms'), phases.get('enregistrement', {}).get('p50_ms'),
+                       max((p.get('p95_ms', 0) for p in phases.values()), default=0)))
+    if not lignes:
+        return
+    print(f"\n⏱️  Durées de génération (ms par variant, détail dans {RESULTATS_DIR}/<type>/{FICHIER_METRIQUES}) :")
+    print(f"   {'Type':<28}{'Variants':>9}{'Durée (s)':>11}{'Chargement p50':>16}{'Enreg. p50':>12}{'p95 max':>9}")
+    for type_abri, variants, duree, chargement, enregistrement, p95 in lignes:
+        print(f"   {type_abri:<28}{variants:>9}{duree:>11.1f}{chargement or 0:>16.1f}"
+              f"{enregistrement or 0:>12.1f}{p95:>9.1f}")
+
 def compter_fichiers_excel():
     """Compte le nombre de fichiers Excel dans le dossier résultats"""
     count = 0
@@ -293,6 +349,52 @@ def extraire_prix_et_composants():
         print(f"\n❌ Erreur lors de l'extraction : {e}")
         return False
 
+def calculer_prix_directement():
+    """Génère et calcule chaque variant dans Excel en une passe (tarification_directe.py)"""
+    print_header("ÉTAPES 2-3 : CALCUL DIRECT DES PRIX ET COMPOSANTS")
+
+    script_tarification = 'tarification_directe.py'
+    if not os.path.exists(script_tarification):
+        print(f"\n❌ Script de calcul direct introuvable : {script_tarification}")
+        return False
+
+    types_abris = [script[len('generate_'):-len('.py')] for script in GENERATION_SCRIPTS]
+    print(f"\n🚀 Calcul des prix pour {len(types_abris)} types d'abrivélos...")
+    print("   (Le fichier de base est ouvert une fois dans Excel, chaque variant y est appliqué puis recalculé)\n")
+
+    commande = [sys.executable, script_tarification] + types_abris
+    if demander_oui_non("📝 Voulez-vous aussi écrire les fichiers Excel de chaque variant ?", defaut=False):
+        commande.append('--classeurs')
+
+    try:
+        result = subprocess.run(commande, text=True, timeout=3600)
+        if result.returncode == 0:
+            print("\n✅ Calcul terminé avec succès")
+        else:
+            print(f"\n⚠️  Calcul terminé avec des avertissements (code {result.returncode})")
+        return True  # On continue même avec des avertissements
+    except subprocess.TimeoutExpired:
+        print("\n❌ Le calcul a pris trop de temps")
+        return False
+    except Exception as e:
+        print(f"\n❌ Erreur lors du calcul : {e}")
+        return False
+
+def verifier_coherence_prix():
+    """Vérifie la cohérence des prix extraits (verifier_prix.py) avant leur envoi dans Odoo"""
+    print_header("VÉRIFICATION DE LA COHÉRENCE DES PRIX")
+    print("\n🔎 Monotonie en largeur et en profondeur, G <= PT, N <= P, bornes de la remise...\n")
+
+    try:
+        result = subprocess.run([sys.executable, 'verifier_prix.py'], text=True, timeout=600)
+    except Exception as e:
+        print(f"\n❌ Erreur lors de la vérification : {e}")
+        return False
+    if result.returncode != 0:
+        print("\n⚠️  Prix incohérents : vérifiez-les (rapport_coherence.json) avant l'upload dans Odoo")
+        return False
+    return True
+
 def afficher_resultats_finaux():
     """Affiche un résumé des résultats finaux"""
     print_header("RÉSULTATS FINAUX")
@@ -347,15 +449,31 @@ def main():
         print("\n❌ Impossible de continuer sans fichier de base valide")
         return
     
-    # Étape 2 : Génération des fichiers Excel
-    if not generer_tous_excel():
-        print("\n❌ Échec lors de la génération des fichiers Excel")
-        return
+    # Template allégé (optionnel)
+    preparer_template_allege()
     
-    # Étape 3 : Extraction des prix
-    if not extraire_prix_et_composants():
-        print("\n❌ Échec lors de l'extraction des prix")
-        return
+    calcul_direct = demander_oui_non(
+        "\n⚡ Calculer les prix directement dans Excel, sans générer puis rouvrir chaque fichier ?",
+        defaut=False
+    )
+    if calcul_direct:
+        # Étapes 2 et 3 en une passe
+        if not calculer_prix_directement():
+            print("\n❌ Échec lors du calcul direct des prix")
+            return
+    else:
+        # Étape 2 : Génération des fichiers Excel
+        if not generer_tous_excel():
+            print("\n❌ Échec lors de la génération des fichiers Excel")
+            return
+        
+        # Étape 3 : Extraction des prix
+        if not extraire_prix_et_composants():
+            print("\n❌ Échec lors de l'extraction des prix")
+            return
+    
+    # Contrôle des prix avant Odoo (les anomalies sont signalées, on continue)
+    verifier_coherence_prix()
     
     # Résultats finaux
     afficher_resultats_finaux()
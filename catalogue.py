@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Catalogue des classeurs générés (résultats/catalogue.json)
+==========================================================
+
+resume.json ne liste que les 10 premiers fichiers d'un type. Le catalogue liste
+chaque SKU généré, indexé par SKU :
+- type d'abri, chemin du fichier (ex. résultats/metallique_ferme/MET-F-7M-P-1000-PT.xlsx)
+- paramètres du variant (ceux de planifier())
+- SHA-256 et taille du classeur, date de génération
+
+Il est tenu à jour par generation_commune.generer_type (génération complète d'un
+type : ses entrées sont remplacées ; régénération ciblée : elles sont fusionnées).
+Les étapes suivantes (extraction, fusion, URLs) le lisent au lieu de parcourir
+résultats/ et de deviner le type d'après le chemin ; sans catalogue, elles
+parcourent résultats/ comme avant (lister_fichiers).
+
+Utilisation :
+    python catalogue.py                  # résumé du catalogue
+    python catalogue.py MET-F-7M-P-1000-PT
+    python catalogue.py --reconstruire   # catalogue des fichiers existants (sans régénérer)
+    python catalogue.py --verifier       # fichiers absents, modifiés ou hors catalogue
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+from generation_commune import RESULTATS_DIR, TYPES_ABRIS, charger_generateur, ecrire_json_atomique
+
+FICHIER_CATALOGUE = 'catalogue.json'
+VERSION_CATALOGUE = 1
+
+
+def _date(horodatage=None):
+    return datetime.fromtimestamp(horodatage).strftime("%Y-%m-%d %H:%M:%S") if horodatage \
+        else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def entree_catalogue(type_abri, variant, chemin, contenu, date=None):
+    """Entrée du catalogue d'un classeur (contenu : octets écrits dans chemin)"""
+    return {
+        'sku': variant['fichier'][:-len('.xlsx')],
+        'type': type_abri,
+        'chemin': chemin,
+        'parametres': {cle: valeur for cle, valeur in variant.items() if cle != 'fichier'},
+        'sha256': hashlib.sha256(contenu).hexdigest(),
+        'taille': len(contenu),
+        'date_generation': date or _date(),
+    }
+
+
+class Catalogue:
+    """Entrées indexées par SKU, avec un index secondaire par chemin"""
+
+    def __init__(self, resultats_dir=RESULTATS_DIR, skus=None, date=None):
+        self.resultats_dir = resultats_dir
+        self.chemin = os.path.join(resultats_dir, FICHIER_CATALOGUE)
+        self.skus = skus or {}
+        self.date = date
+        self._par_chemin = None
+
+    @classmethod
+    def charger(cls, resultats_dir=RESULTATS_DIR):
+        """Catalogue de resultats_dir, ou None s'il n'existe pas (ou est illisible)"""
+        try:
+            with open(os.path.join(resultats_dir, FICHIER_CATALOGUE), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(resultats_dir, data.get('skus', {}), data.get('date'))
+
+    def __len__(self):
+        return len(self.skus)
+
+    def entree(self, sku):
+        """Entrée d'un SKU (avec ou sans .xlsx), ou None"""
+        nom = os.path.basename(sku)
+        return self.skus.get(nom[:-len('.xlsx')] if nom.endswith('.xlsx') else nom)
+
+    def par_chemin(self, chemin):
+        """Entrée d'un fichier d'après son chemin, ou None"""
+        if self._par_chemin is None:
+            self._par_chemin = {os.path.normpath(e['chemin']): e for e in self.skus.values()}
+        return self._par_chemin.get(os.path.normpath(chemin))
+
+    def types(self):
+        return sorted({e['type'] for e in self.skus.values()})
+
+    def entrees(self, type_abri=None):
+        """Entrées (d'un type, ou toutes), triées par chemin"""
+        return sorted((e for e in self.skus.values() if type_abri is None or e['type'] == type_abri),
+                      key=lambda e: e['chemin'])
+
+    def mettre_a_jour_type(self, type_abri, entrees, remplacer=True):
+        """
+        Enregistre les entrées d'un type. remplacer : les entrées absentes de
+        `entrees` sont retirées (génération complète) ; sinon elles sont gardées.
+        Un classeur identique (même SHA-256) garde sa date de génération.
+        """
+        if remplacer:
+            self.skus = {sku: e for sku, e in self.skus.items() if e['type'] != type_abri}
+        for entree in entrees:
+            ancienne = self.skus.get(entree['sku'])
+            if ancienne is not None and ancienne.get('sha256') == entree['sha256']:
+                entree = dict(entree, date_generation=ancienne['date_generation'])
+            self.skus[entree['sku']] = entree
+        self._par_chemin = None
+
+    def retirer(self, skus):
+        for sku in skus:
+            self.skus.pop(sku, None)
+        self._par_chemin = None
+
+    def enregistrer(self):
+        """Écriture atomique (voir generation_commune.ecrire_atomique)"""
+        os.makedirs(self.resultats_dir, exist_ok=True)
+        self.date = _date()
+        data = {
+            'version': VERSION_CATALOGUE,
+            'date': self.date,
+            'total': len(self.skus),
+            'skus': dict(sorted(self.skus.items())),
+        }
+        ecrire_json_atomique(self.chemin, data, indent=1)
+
+
+def lister_fichiers(resultats_dir=RESULTATS_DIR):
+    """
+    [(type_abri, chemin)] des classeurs générés, triés par chemin.
+    D'après le catalogue s'il existe ; sinon parcours de resultats_dir, le type
+    étant le nom du sous-dossier.
+    """
+    catalogue = Catalogue.charger(resultats_dir)
+    if catalogue is not None:
+        return [(e['type'], e['chemin']) for e in catalogue.entrees()]
+    return _parcourir(resultats_dir)
+
+
+def _parcourir(resultats_dir):
+    """[(nom du sous-dossier, chemin)] des .xlsx de resultats_dir/*/"""
+    fichiers = []
+    if os.path.isdir(resultats_dir):
+        for type_abri in sorted(os.listdir(resultats_dir)):
+            dossier = os.path.join(resultats_dir, type_abri)
+            if not os.path.isdir(dossier):
+                continue
+            for nom in sorted(os.listdir(dossier)):
+                if nom.endswith('.xlsx') and not nom.startswith('~'):
+                    fichiers.append((type_abri, os.path.join(dossier, nom)))
+    return fichiers
+
+
+def reconstruire(resultats_dir=RESULTATS_DIR, types_abris=TYPES_ABRIS):
+    """
+    Catalogue des fichiers existants de resultats_dir/<type>/ (sans régénérer) :
+    paramètres d'après le plan actuel du type ; les fichiers hors plan sont ignorés.
+    Retourne (catalogue, fichiers hors plan).
+    """
+    catalogue = Catalogue(resultats_dir)
+    hors_plan = []
+    for type_abri in types_abris:
+        dossier = os.path.join(resultats_dir, type_abri)
+        if not os.path.isdir(dossier):
+            continue
+        plan = {v['fichier']: v for v in charger_generateur(type_abri).planifier()}
+        entrees = []
+        for nom in sorted(os.listdir(dossier)):
+            if not nom.endswith('.xlsx') or nom.startswith('~'):
+                continue
+            chemin = os.path.join(dossier, nom)
+            if nom not in plan:
+                hors_plan.append(chemin)
+                continue
+            with open(chemin, 'rb') as f:
+                contenu = f.read()
+            entrees.append(entree_catalogue(type_abri, plan[nom], chemin, contenu,
+                                            _date(os.path.getmtime(chemin))))
+        catalogue.mettre_a_jour_type(type_abri, entrees)
+    return catalogue, hors_plan
+
+
+def verifier(catalogue):
+    """(absents, modifiés, hors catalogue) : écarts entre le catalogue et le disque"""
+    absents, modifies = [], []
+    for entree in catalogue.entrees():
+        try:
+            with open(entree['chemin'], 'rb') as f:
+                contenu = f.read()
+        except OSError:
+            absents.append(entree['chemin'])
+            continue
+        if hashlib.sha256(contenu).hexdigest() != entree['sha256']:
+            modifies.append(entree['chemin'])
+    hors_catalogue = [chemin for _, chemin in _parcourir(catalogue.resultats_dir)
+                      if catalogue.par_chemin(chemin) is None]
+    return absents, modifies, hors_catalogue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalogue des classeurs générés")
+    parser.add_argument('skus', nargs='*', help="SKU à afficher (ex. MET-F-7M-P-1000-PT)")
+    parser.add_argument('--resultats', default=RESULTATS_DIR, help="Dossier des résultats (défaut : %(default)s)")
+    parser.add_argument('--reconstruire', action='store_true',
+                        help="Cataloguer les fichiers existants (paramètres d'après le plan actuel)")
+    parser.add_argument('--verifier', action='store_true', help="Comparer le catalogue avec les fichiers")
+    args = parser.parse_args()
+
+    if args.reconstruire:
+        catalogue, hors_plan = reconstruire(args.resultats)
+        catalogue.enregistrer()
+        print(f"✅ {len(catalogue)} SKU catalogués dans {catalogue.chemin}")
+        if hors_plan:
+            print(f"⚠️  {len(hors_plan)} fichier(s) hors plan ignoré(s) (supprimés à la prochaine génération)")
+        return
+
+    catalogue = Catalogue.charger(args.resultats)
+    if catalogue is None:
+        print(f"❌ Pas de catalogue dans {args.resultats}/ : lancez une génération "
+              f"ou python catalogue.py --reconstruire")
+        sys.exit(1)
+
+    if args.skus:
+        erreurs = 0
+        for sku in args.skus:
+            entree = catalogue.entree(sku)
+            if entree is None:
+                print(f"❌ {sku} absent du catalogue")
+                erreurs += 1
+            else:
+                print(json.dumps(entree, indent=2, ensure_ascii=False))
+        sys.exit(1 if erreurs else 0)
+
+    if args.verifier:
+        absents, modifies, hors_catalogue = verifier(catalogue)
+        for libelle, chemins in (('absent(s)', absents), ('modifié(s) depuis la génération', modifies),
+                                 ('hors catalogue', hors_catalogue)):
+            if chemins:
+                print(f"⚠️  {len(chemins)} fichier(s) {libelle} :")
+                for chemin in chemins[:20]:
+                    print(f"   - {chemin}")
+                if len(chemins) > 20:
+                    print(f"   ... et {len(chemins) - 20} autre(s)")
+        if absents or modifies or hors_catalogue:
+            sys.exit(1)
+        print(f"✅ {len(catalogue)} fichiers conformes au catalogue")
+        return
+
+    print(f"📚 {catalogue.chemin} ({catalogue.date}) : {len(catalogue)} SKU")
+    for type_abri in catalogue.types():
+        entrees = catalogue.entrees(type_abri)
+        taille = sum(e['taille'] for e in entrees)
+        print(f"   {type_abri:<28}{len(entrees):>6} SKU {taille / (1024 * 1024):>8.1f} Mo   "
+              f"dernière génération : {max(e['date_generation'] for e in entrees)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Décomposition des largeurs et profondeurs en segments valides
+=============================================================
+
+La feuille Configure n'accepte que des segments de taille fixe :
+- largeurs (B1..G1, 6 segments max) : 2.03, 2.53, 4.06, 5.06, 6.09 (2, 2.5, 4, 5, 6 m)
+- profondeurs (A2..A13, 12 segments max) : 2.03, 2.53 (2, 2.5 m)
+- profondeur des ouverts : un seul segment
+
+Pour chaque total de 0.5 à MAX_TOTAL m (par pas de 0.5 m), la meilleure
+décomposition est calculée une fois, à l'import, puis lue dans une table.
+Règles, par ordre de priorité :
+1. disposition symétrique (ex. 7 m = 2.5 + 2 + 2.5)
+2. le moins de segments possible
+3. 2.53 en premier (aux extrémités)
+4. segments les plus réguliers (ex. 14 m = 5 + 4 + 5 plutôt que 6 + 2 + 6)
+Un total impossible à atteindre (ex. 3 m en largeur) prend la décomposition du
+total atteignable le plus proche (le plus grand en cas d'égalité).
+
+Les décompositions historiques des scripts generate_*.py sont conservées
+telles quelles (EPINGLES_*), même quand les règles en donneraient une autre.
+
+Utilisation :
+    python decomposition.py            # affiche les tables
+    python decomposition.py 7 9.5 16   # décompose des largeurs / profondeurs
+"""
+
+import argparse
+
+MAX_TOTAL = 30  # m
+
+SEGMENTS_LARGEUR = [2.03, 2.53, 4.06, 5.06, 6.09]
+SEGMENTS_PROFONDEUR = [2.03, 2.53]
+
+# Taille nominale (m) de chaque segment
+NOMINAL = {2.03: 2, 2.53: 2.5, 4.06: 4, 5.06: 5, 6.09: 6}
+
+# Décompositions historiques des scripts, conservées à l'identique
+EPINGLES_LARGEUR = {
+    2: [2.03],
+    2.5: [2.53],
+    4: [4.06],
+    5: [5.06],
+    6: [6.09],
+    7: [2.53, 2.03, 2.53],  # 2.5m + 2m + 2.5m
+    8: [4.06, 4.06],  # 4m + 4m
+    9: [2.53, 4.06, 2.53],  # 2.5m + 4m + 2.5m
+    10: [5.06, 5.06],  # 5m + 5m
+    11: [2.53, 6.09, 2.53],  # 2.5m + 6m + 2.5m
+    12: [6.09, 6.09],  # 6m + 6m
+    13: [4.06, 5.06, 4.06],  # 4m + 5m + 4m
+    14: [5.06, 4.06, 5.06],  # 5m + 4m + 5m
+}
+
+# Règles exactes pour les FERMÉS
+EPINGLES_PROFONDEUR_FERME = {
+    4: [2.03, 2.03],
+    4.5: [2.03, 2.53],
+    5: [2.53, 2.53],
+    6: [2.03, 2.03, 2.03],
+    7: [2.03, 2.53, 2.53],
+    8: [2.03, 2.03, 2.03, 2.03],  # 4 fois 2
+    9: [2.53, 2.03, 2.03, 2.53],  # Symétrique : 2.5 + 2 + 2 + 2.5
+    10: [2.03, 2.03, 2.03, 2.03, 2.03],  # 5 fois 2
+    11: [2.53, 2.03, 2.03, 2.03, 2.03],  # 2.5 au début puis que des 2
+    12: [2.03, 2.03, 2.03, 2.03, 2.03, 2.03],  # 6 fois 2
+}
+
+
+def _demi_metres(total):
+    """Total en demi-mètres (clé des tables) : 4.5 -> 9"""
+    return int(round(total * 2))
+
+
+def _combinaisons(reste, segments, max_segments):
+    """Multi-ensembles de segments (tuples triés) dont la somme vaut reste (en demi-mètres)"""
+    if reste == 0:
+        return [()]
+    if not segments or max_segments == 0:
+        return []
+    segment, autres = segments[0], segments[1:]
+    taille = _demi_metres(NOMINAL[segment])
+    resultats = []
+    for nombre in range(min(reste // taille, max_segments) + 1):
+        for suite in _combinaisons(reste - nombre * taille, autres, max_segments - nombre):
+            resultats.append((segment,) * nombre + suite)
+    return resultats
+
+
+def _ordre(segments):
+    """2.53 en premier, puis les segments du plus grand au plus petit"""
+    return sorted(segments, key=lambda s: (s != 2.53, -s))
+
+
+def _disposition(combinaison):
+    """(disposition, symétrique) : symétrique si au plus un segment est en nombre impair"""
+    nombres = {s: combinaison.count(s) for s in set(combinaison)}
+    impairs = [s for s, n in nombres.items() if n % 2]
+    if len(impairs) > 1:
+        return _ordre(combinaison), False
+    moitie = _ordre([s for s, n in nombres.items() for _ in range(n // 2)])
+    return moitie + impairs + moitie[::-1], True
+
+
+def _cle(disposition, symetrique):
+    """Clé de classement : la plus petite est la meilleure (voir les règles)"""
+    nominales = [NOMINAL[s] for s in disposition]
+    return (not symetrique, len(disposition), disposition[0] != 2.53,
+            max(nominales) - min(nominales), [-s for s in disposition])
+
+
+def meilleure_decomposition(total, segments, max_segments):
+    """Meilleure décomposition exacte d'un total (m), ou None s'il est inatteignable"""
+    candidats = [_disposition(c) for c in _combinaisons(_demi_metres(total), segments, max_segments)]
+    if not candidats:
+        return None
+    return min(candidats, key=lambda candidat: _cle(*candidat))[0]
+
+
+class TableDecomposition:
+    """
+    Décompositions précalculées pour tous les totaux de 0.5 à max_total m.
+    table(total) renvoie une nouvelle liste (la table n'est jamais modifiée).
+    """
+
+    def __init__(self, segments, max_segments, epingles=None, max_total=MAX_TOTAL):
+        self.segments = list(segments)
+        self.max_segments = max_segments
+        self.max_total = max_total
+        self.epingles = dict(epingles or {})
+        self.table = {}
+
+        exactes = {}
+        for demi in range(1, _demi_metres(max_total) + 1):
+            decomposition = meilleure_decomposition(demi / 2, self.segments, max_segments)
+            if decomposition is not None:
+                exactes[demi] = decomposition
+        for total, decomposition in self.epingles.items():
+            exactes[_demi_metres(total)] = list(decomposition)
+        if not exactes:
+            raise ValueError("Aucun total atteignable avec ces segments")
+
+        for demi in range(1, _demi_metres(max_total) + 1):
+            if demi in exactes:
+                self.table[demi] = exactes[demi]
+            else:
+                # Total atteignable le plus proche, le plus grand en cas d'égalité
+                proche = min(exactes, key=lambda d: (abs(d - demi), -d))
+                self.table[demi] = exactes[proche]
+
+    def __call__(self, total):
+        demi = _demi_metres(total)
+        if demi not in self.table:
+            raise ValueError(f"Total hors table : {total} m (0.5 à {self.max_total} m)")
+        return list(self.table[demi])
+
+    def est_exacte(self, total):
+        """Vrai si la décomposition atteint exactement le total (à 0.5 m près)"""
+        return _demi_metres(sum(NOMINAL[s] for s in self(total))) == _demi_metres(total)
+
+
+decomposer_largeur = TableDecomposition(SEGMENTS_LARGEUR, 6, EPINGLES_LARGEUR)
+decomposer_profondeur_ferme = TableDecomposition(SEGMENTS_PROFONDEUR, 12, EPINGLES_PROFONDEUR_FERME)
+# Ouverts : la profondeur est directement 2.03m ou 2.53m
+decomposer_profondeur_ouvert = TableDecomposition(SEGMENTS_PROFONDEUR, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Décompositions des largeurs et profondeurs")
+    parser.add_argument('totaux', nargs='*', type=float, help="Totaux à décomposer (m)")
+    args = parser.parse_args()
+
+    tables = [('Largeur', decomposer_largeur),
+              ('Profondeur (fermés)', decomposer_profondeur_ferme),
+              ('Profondeur (ouverts)', decomposer_profondeur_ouvert)]
+    totaux = args.totaux or [demi / 2 for demi in range(4, 2 * 14 + 1)]
+    for libelle, table in tables:
+        print(f"\n📐 {libelle}")
+        for total in totaux:
+            decomposition = table(total)
+            remarques = []
+            if not table.est_exacte(total):
+                remarques.append(f"≈ {sum(NOMINAL[s] for s in decomposition):g}m")
+            if _demi_metres(total) in {_demi_metres(t) for t in table.epingles}:
+                remarques.append("épinglé")
+            print(f"   {total:>5g}m → {decomposition}  {' '.join(remarques)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,91 +2,113 @@
 # -*- coding: utf-8 -*-
 """
 Script pour extraire les prix (H7, H9) et les composants (A2:E110) de tous les fichiers Excel
-- Traite uniquement les fichiers sans prix
+- Traite uniquement les fichiers nouveaux, sans prix, ou modifiés depuis leur
+  extraction (manifeste par résultat : taille, date, SHA-256, version de l'extraction)
 - Système de retry limité (2 tentatives par run, réinitialisé à chaque lancement)
 - Gestion robuste de la mémoire (max 2 workers)
 - Sauvegarde fréquente pour éviter la perte de données
+- --sans-excel : fichiers déjà recalculés, lus en parallèle sur tous les cœurs
+  (un processus par cœur, le processus principal est le seul à écrire)
+- Télémétrie (telemetrie.py) : débit, échecs, file, ETA et durée de chaque étape,
+  affichés toutes les 15 s et écrits dans extraction_metriques.json
+
+Utilisation :
+    python extract_prices_and_components.py
+    python extract_prices_and_components.py --sans-excel [--processus 8] [--tout]
 """
 
-import openpyxl
-import json
+import argparse
+import contextlib
+import hashlib
 import os
 import subprocess
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from threading import Lock
 import time
 
+from catalogue import Catalogue, lister_fichiers
+from stockage_composants import StockageComposants, composants_types
+from stockage_resultats import STOCKAGES, ouvrir_stockage
+from telemetrie import INTERVALLE, TelemetrieExtraction
+from xlsx_brut import lire_sorties
+
 # Configuration
+VERSION_EXTRACTION = 1  # à incrémenter quand la lecture des prix ou des composants change
 resultats_dir = 'résultats'
 composant_dir = 'composant'
 resultats_json_file = 'resultats_tous.json'
 max_workers = 2  # Réduit à 2 pour la stabilité (était 5)
 max_attempts_per_run = 2  # Maximum 2 tentatives par fichier par run
 delay_between_files = 1.5  # Délai entre chaque fichier pour laisser Excel se stabiliser
+taille_lot_max = 64  # --sans-excel : fichiers par lot envoyé à un processus
 
-# Lock pour thread-safe writing
-json_lock = Lock()
+composants_lock = Lock()  # _composants ouvert une seule fois, même depuis plusieurs threads
+_catalogue = None  # catalogue.json de resultats_dir (False s'il n'existe pas), chargé une fois
+_composants = None  # StockageComposants de composant_dir, ouvert une fois
+_telemetrie = None  # TelemetrieExtraction de l'extraction en cours
 
-def load_existing_results():
-    """Charge les résultats existants depuis resultats_tous.json"""
-    if os.path.exists(resultats_json_file):
-        try:
-            with open(resultats_json_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Créer un dictionnaire indexé par chemin pour vérification rapide
-                results_dict = {}
-                for r in data.get('resultats', []):
-                    chemin = r.get('chemin_complet', '')
-                    if chemin:
-                        results_dict[chemin] = r
-                return data, results_dict
-        except Exception as e:
-            print(f"⚠️  Erreur lors du chargement de {resultats_json_file}: {e}")
-            return {'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'resultats': []}, {}
-    return {'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'resultats': []}, {}
+def mesurer(etape):
+    """Chronomètre une étape dans la télémétrie de l'extraction en cours (sans effet hors extraction)"""
+    return _telemetrie.mesurer(etape) if _telemetrie is not None else contextlib.nullcontext()
 
-def save_results(data):
-    """Sauvegarde les résultats dans resultats_tous.json"""
-    with json_lock:
-        try:
-            # Trier les résultats par chemin pour un ordre cohérent
-            data['resultats'] = sorted(data['resultats'], key=lambda x: x.get('chemin_complet', ''))
-            data['date_derniere_maj'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            data['total'] = len(data['resultats'])
-            
-            with open(resultats_json_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"❌ Erreur lors de la sauvegarde: {e}")
+def load_existing_results(stockage=None):
+    """
+    Ouvre le stockage des résultats (stockage_resultats : base SQLite, ou journal
+    rejoué au démarrage). Retourne (base, {chemin: résultat}).
+    """
+    base = ouvrir_stockage(stockage, resultats_json_file)
+    return base, base.resultats()
 
-def extract_components(ws_prc):
-    """Extrait les composants de A2 à E110 de la feuille PRC import"""
-    components = []
-    for row in range(2, 111):  # Lignes 2 à 110
-        row_data = []
-        for col in range(1, 6):  # Colonnes A à E (1 à 5)
-            cell_value = ws_prc.cell(row, col).value
-            # Convertir les valeurs pour JSON
-            if cell_value is None:
-                row_data.append(None)
-            elif isinstance(cell_value, (int, float)):
-                row_data.append(cell_value)
-            else:
-                row_data.append(str(cell_value))
-        components.append(row_data)
-    return components
+def save_results(base):
+    """Exporte les résultats dans resultats_tous.json (en une passe ; compacte le journal)"""
+    try:
+        base.exporter()
+    except Exception as e:
+        print(f"❌ Erreur lors de la sauvegarde: {e}")
+
+def extract_components(lignes):
+    """
+    Composants de A2 à E110 de la feuille PRC import (lignes de xlsx_brut.lire_sorties),
+    creux et typés, en colonnes (stockage_composants.composants_types) : lignes vides
+    et en-tête retirés, quantités en nombres
+    """
+    return composants_types(lignes)
+
+def _executer_applescript(applescript, timeout):
+    """(succès, erreur) d'un script AppleScript"""
+    try:
+        result = subprocess.run(
+            ['osascript', '-e', applescript],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+        
+        if result.returncode == 0:
+            return True, None
+        else:
+            error_msg = result.stderr.strip() if result.stderr else "Erreur inconnue"
+            return False, error_msg
+            
+    except subprocess.TimeoutExpired:
+        return False, "Timeout: le fichier a pris trop de temps"
+    except Exception as e:
+        return False, str(e)
 
 def open_and_calculate_excel(file_path):
     """
     Ouvre un fichier Excel dans Excel, force le recalcul, sauvegarde et ferme.
     Utilise AppleScript pour contrôler Excel sur macOS.
     Délais augmentés pour laisser le temps aux formules complexes de se calculer.
+    Deux appels (ouverture, puis recalcul + sauvegarde + fermeture), chronométrés
+    séparément dans la télémétrie ; le second désigne le classeur par son nom.
     """
     file_path_abs = os.path.abspath(file_path)
+    nom_classeur = os.path.basename(file_path_abs).replace('"', '\\"')
     
     # Script AppleScript amélioré avec délais plus longs
-    applescript = f'''
+    ouverture = f'''
     tell application "Microsoft Excel"
         -- Vérifier que le fichier n'est pas déjà ouvert
         set fileRef to POSIX file "{file_path_abs}"
@@ -100,6 +122,11 @@ def open_and_calculate_excel(file_path):
         
         -- Attendre que le fichier soit chargé
         delay 0.8
+    end tell
+    '''
+    recalcul = f'''
+    tell application "Microsoft Excel"
+        set wb to workbook "{nom_classeur}"
         
         -- Forcer le recalcul complet de toutes les formules
         calculate workbook
@@ -108,37 +135,25 @@ def open_and_calculate_excel(file_path):
         delay 2.5
         
         -- Sauvegarder le fichier
-        save active workbook
+        save wb
         
         -- Attendre que la sauvegarde soit terminée
         delay 0.5
         
         -- Fermer le fichier
-        close active workbook saving yes
+        close wb saving yes
         
         -- Attendre que la fermeture soit terminée
         delay 0.3
     end tell
     '''
     
-    try:
-        result = subprocess.run(
-            ['osascript', '-e', applescript],
-            capture_output=True,
-            text=True,
-            timeout=45  # Timeout augmenté
-        )
-        
-        if result.returncode == 0:
-            return True, None
-        else:
-            error_msg = result.stderr.strip() if result.stderr else "Erreur inconnue"
-            return False, error_msg
-            
-    except subprocess.TimeoutExpired:
-        return False, "Timeout: le fichier a pris trop de temps"
-    except Exception as e:
-        return False, str(e)
+    with mesurer('ouverture'):
+        success, error = _executer_applescript(ouverture, timeout=20)
+    if not success:
+        return False, error
+    with mesurer('recalcul'):
+        return _executer_applescript(recalcul, timeout=45)  # Timeout augmenté
 
 def is_valid_price(value):
     """
@@ -152,32 +167,126 @@ def is_valid_price(value):
         return False
     return True
 
+def _type_abri_fichier(file_path):
+    """Type d'abri (dossier de composant/) depuis le chemin"""
+    for type_abri in ('carport', 'bosquet_ferme', 'bosquet_ouvert', 'domino_ferme', 'domino_ouvert',
+                      'metallique_ferme', 'metallique_ouvert', 'neve_ouvert'):
+        if type_abri in file_path:
+            return type_abri
+    return 'autre'
+
+def manifeste_fichier(infos, contenu):
+    """Taille, date de modification et SHA-256 d'un classeur, version de l'extraction"""
+    return {
+        'taille': infos.st_size,
+        'mtime_ns': infos.st_mtime_ns,
+        'sha256': hashlib.sha256(contenu).hexdigest(),
+        'version': VERSION_EXTRACTION,
+    }
+
+def etat_fichier(file_path, resultat):
+    """
+    Compare un classeur à son résultat d'extraction. Retourne (état, manifeste) :
+    - 'nouveau' : pas de résultat ; 'sans_prix' : résultat sans prix valides
+    - 'modifie' : classeur modifié depuis son extraction, ou résultat déjà marqué
+      périmé (réextraction échouée : il le reste jusqu'à une réextraction réussie)
+    - 'version' : extrait par une autre version de l'extraction
+    - 'inchange' : rien à refaire ; manifeste à enregistrer s'il a changé (résultat
+      antérieur au manifeste, ou date de modification seule changée), sinon None
+    Le contenu n'est relu que si la taille ou la date de modification ont changé.
+    """
+    if resultat is None:
+        return 'nouveau', None
+    if resultat.get('perime'):
+        return 'modifie', None
+    infos = os.stat(file_path)
+    manifeste = resultat.get('manifeste')
+    nouveau = None
+    if manifeste is None:
+        # Résultat antérieur au manifeste : classeur modifié s'il est plus récent que l'extraction
+        try:
+            date_extraction = datetime.strptime(resultat.get('date_extraction') or '', "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            date_extraction = datetime.min
+        if datetime.fromtimestamp(infos.st_mtime) > date_extraction:
+            return 'modifie', None
+        with open(file_path, 'rb') as f:
+            nouveau = manifeste_fichier(infos, f.read())
+    elif manifeste.get('version') != VERSION_EXTRACTION:
+        return 'version', None
+    elif (manifeste.get('taille'), manifeste.get('mtime_ns')) != (infos.st_size, infos.st_mtime_ns):
+        with open(file_path, 'rb') as f:
+            nouveau = manifeste_fichier(infos, f.read())
+        if nouveau['sha256'] != manifeste.get('sha256'):
+            return 'modifie', None
+    if not (is_valid_price(resultat.get('prix_avant_reduction')) and
+            is_valid_price(resultat.get('prix_apres_reduction'))):
+        return 'sans_prix', None
+    return 'inchange', nouveau
+
+def lire_fichier_calcule(file_path, attempt_number):
+    """
+    ÉTAPE 2 : lit les prix et composants d'un fichier déjà recalculé (valeurs en
+    cache des seules cellules utiles de PRC import, sans charger le classeur dans
+    openpyxl). Retourne (result, components, erreur). N'écrit rien : utilisable
+    dans un processus de extraire_en_processus.
+    """
+    # Lu une fois : le manifeste décrit exactement le contenu dont les valeurs sont extraites
+    infos = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        contenu = f.read()
+    try:
+        sorties = lire_sorties(contenu)
+    except KeyError as e:
+        return None, None, e.args[0]
+    
+    # Lire les prix avec vérification
+    prix_avant_raw = sorties['prix_brut']  # H7
+    prix_apres_raw = sorties['prix_net']  # H9
+    
+    # Vérifier que les prix sont valides (nombres > 0)
+    prix_avant = prix_avant_raw if is_valid_price(prix_avant_raw) else None
+    prix_apres = prix_apres_raw if is_valid_price(prix_apres_raw) else None
+    
+    # Extraire les composants (A2:E110)
+    components = extract_components(sorties['composants'])
+    
+    # Créer le résultat
+    result = {
+        'fichier': os.path.basename(file_path),
+        'chemin_complet': file_path,
+        'type_abri': _type_abri_fichier(file_path),
+        'prix_avant_reduction': prix_avant,
+        'prix_apres_reduction': prix_apres,
+        'date_extraction': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'tentative': attempt_number,
+        'manifeste': manifeste_fichier(infos, contenu),
+        'perime': False,
+        'erreur': None
+    }
+    return result, components, None
+
+def stockage_composants():
+    """Stockage normalisé des composants (stockage_composants.py), ouvert une fois"""
+    global _composants
+    with composants_lock:
+        if _composants is None:
+            _composants = StockageComposants(composant_dir)
+    return _composants
+
+def enregistrer_composants(result, components):
+    """
+    Sauvegarde les composants d'un fichier dans le stockage normalisé (composant/) :
+    articles et nomenclatures dédoublonnés, une entrée d'index par SKU. Une
+    extraction vide ne remplace pas des composants déjà extraits.
+    """
+    stockage_composants().enregistrer(result['type_abri'], result['fichier'], result['chemin_complet'], components)
+
 def process_excel_file(file_path, existing_results_dict, attempt_number):
     """
     Traite un fichier Excel et extrait les prix et composants.
     attempt_number: numéro de la tentative (1 ou 2)
     """
-    fichier_basename = os.path.basename(file_path)
-    
-    # Déterminer le type d'abri depuis le chemin
-    type_abri = 'autre'
-    if 'carport' in file_path:
-        type_abri = 'carport'
-    elif 'bosquet_ferme' in file_path:
-        type_abri = 'bosquet_ferme'
-    elif 'bosquet_ouvert' in file_path:
-        type_abri = 'bosquet_ouvert'
-    elif 'domino_ferme' in file_path:
-        type_abri = 'domino_ferme'
-    elif 'domino_ouvert' in file_path:
-        type_abri = 'domino_ouvert'
-    elif 'metallique_ferme' in file_path:
-        type_abri = 'metallique_ferme'
-    elif 'metallique_ouvert' in file_path:
-        type_abri = 'metallique_ouvert'
-    elif 'neve_ouvert' in file_path:
-        type_abri = 'neve_ouvert'
-    
     try:
         # ÉTAPE 1 : Ouvrir le fichier dans Excel pour calculer les formules
         success, error = open_and_calculate_excel(file_path)
@@ -188,131 +297,131 @@ def process_excel_file(file_path, existing_results_dict, attempt_number):
         time.sleep(0.5)
         
         # ÉTAPE 2 : Lire les données calculées
-        wb = openpyxl.load_workbook(file_path, data_only=True)
-        
-        if 'PRC import' not in wb.sheetnames:
-            wb.close()
-            return None, f"Feuille 'PRC import' introuvable", False
-        
-        ws_prc = wb['PRC import']
+        with mesurer('lecture'):
+            result, components, error = lire_fichier_calcule(file_path, attempt_number)
+        if error:
+            return None, error, False
         
-        # Lire les prix avec vérification
-        prix_avant_raw = ws_prc.cell(7, 8).value  # H7
-        prix_apres_raw = ws_prc.cell(9, 8).value  # H9
-        
-        # Vérifier que les prix sont valides (nombres > 0)
-        prix_avant = prix_avant_raw if is_valid_price(prix_avant_raw) else None
-        prix_apres = prix_apres_raw if is_valid_price(prix_apres_raw) else None
-        
-        # Extraire les composants (A2:E110)
-        components = extract_components(ws_prc)
-        
-        wb.close()
-        
-        # Créer le résultat
-        result = {
-            'fichier': fichier_basename,
-            'chemin_complet': file_path,
-            'type_abri': type_abri,
-            'prix_avant_reduction': prix_avant,
-            'prix_apres_reduction': prix_apres,
-            'date_extraction': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'tentative': attempt_number
-        }
-        
-        # Sauvegarder les composants dans un fichier JSON séparé
-        composant_type_dir = os.path.join(composant_dir, type_abri)
-        os.makedirs(composant_type_dir, exist_ok=True)
-        
-        composant_file = os.path.join(composant_type_dir, fichier_basename.replace('.xlsx', '.json'))
-        
-        # Vérifier si le fichier composant existe déjà
-        composants_existants = None
-        if os.path.exists(composant_file):
-            try:
-                with open(composant_file, 'r', encoding='utf-8') as f:
-                    data_existant = json.load(f)
-                    composants_existants = data_existant.get('composants', [])
-            except:
-                pass
-        
-        # Vérifier si les nouveaux composants sont valides (non vides)
-        composants_valides = components and len(components) > 0 and any(
-            any(cell is not None and cell != '' for cell in row) 
-            for row in components
-        )
-        
-        # Écraser seulement si les nouveaux composants sont valides
-        # Sinon, garder l'ancien s'il existe
-        if composants_valides or composants_existants is None:
-            composant_data = {
-                'fichier_source': fichier_basename,
-                'chemin_source': file_path,
-                'date_extraction': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'composants': components
-            }
-            
-            with json_lock:
-                with open(composant_file, 'w', encoding='utf-8') as f:
-                    json.dump(composant_data, f, indent=2, ensure_ascii=False)
-        # Si les nouveaux composants sont vides mais qu'il y a un ancien, on garde l'ancien
-        elif composants_existants:
-            # Mettre à jour seulement la date d'extraction mais garder les anciens composants
-            composant_data = {
-                'fichier_source': fichier_basename,
-                'chemin_source': file_path,
-                'date_extraction': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'composants': composants_existants,
-                'note': 'Composants conservés (nouvelle extraction vide)'
-            }
-            
-            with json_lock:
-                with open(composant_file, 'w', encoding='utf-8') as f:
-                    json.dump(composant_data, f, indent=2, ensure_ascii=False)
+        with mesurer('composants'):
+            enregistrer_composants(result, components)
         
         return result, None, False
         
     except Exception as e:
         return None, f"Erreur: {e}", False
 
+def extraire_lot(lot):
+    """
+    Exécuté dans un processus de extraire_en_processus : lit chaque fichier du lot
+    (valeurs déjà calculées). Retourne [(file_path, result, components, erreur,
+    durée de lecture)] ; les écritures sont faites par le processus principal.
+    """
+    resultats = []
+    for file_path in lot:
+        debut = time.perf_counter()
+        try:
+            result, components, error = lire_fichier_calcule(file_path, 1)
+        except Exception as e:
+            result, components, error = None, None, f"Erreur: {e}"
+        resultats.append((file_path, result, components, error, time.perf_counter() - debut))
+    return resultats
+
+def extraire_en_processus(fichiers_a_traiter, base, nb_processus):
+    """
+    Extraction sans Excel (fichiers déjà recalculés) : la liste est découpée en lots
+    répartis sur nb_processus processus, qui ne font que lire et analyser. Les
+    résultats reviennent au fur et à mesure au processus principal, seul à écrire
+    (composants, base des résultats). Retourne (succès, fichiers sans prix).
+    """
+    # Lots assez petits pour répartir la charge, assez gros pour amortir les échanges
+    taille_lot = max(1, min(taille_lot_max, -(-len(fichiers_a_traiter) // (nb_processus * 4))))
+    lots = [fichiers_a_traiter[i:i + taille_lot] for i in range(0, len(fichiers_a_traiter), taille_lot)]
+    
+    succes = 0
+    fichiers_sans_prix = []
+    completed = 0
+    with ProcessPoolExecutor(max_workers=nb_processus) as executor:
+        futures = [executor.submit(extraire_lot, lot) for lot in lots]
+        for future in as_completed(futures):
+            for file_path, result, components, error, duree_lecture in future.result():
+                completed += 1
+                _telemetrie.tentative_commencee()
+                _telemetrie.ajouter_duree('lecture', duree_lecture)
+                basename = os.path.basename(file_path)
+                if result is None:
+                    result = {
+                        'fichier': basename,
+                        'chemin_complet': file_path,
+                        'type_abri': get_type_abri_from_path(file_path),
+                        'prix_avant_reduction': None,
+                        'prix_apres_reduction': None,
+                        'date_extraction': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        'tentative': 1,
+                        'erreur': error
+                    }
+                else:
+                    with mesurer('composants'):
+                        enregistrer_composants(result, components)
+                
+                valides = is_valid_price(result['prix_avant_reduction']) and is_valid_price(result['prix_apres_reduction'])
+                if valides:
+                    succes += 1
+                    _telemetrie.tentative_terminee('succes')
+                    print(f"[{completed}] ✅ {basename} | Avant: {result['prix_avant_reduction']:.2f} € | "
+                          f"Après: {result['prix_apres_reduction']:.2f} €")
+                else:
+                    fichiers_sans_prix.append(file_path)
+                    _telemetrie.tentative_terminee('echec')
+                    print(f"[{completed}] ❌ {basename} | {error or 'Prix non calculés (ouvrir dans Excel)'}")
+                
+                if valides or base.resultat(file_path) is None:
+                    base.enregistrer(result)
+                else:
+                    # Comme avec Excel : anciens prix et date d'extraction gardés, le
+                    # résultat reste à retraiter au prochain run
+                    base.enregistrer({'chemin_complet': file_path, 'tentative': 1,
+                                      'erreur': error or 'Prix non calculés (ouvrir dans Excel)'})
+    
+    save_results(base)
+    return succes, fichiers_sans_prix
+
 def find_excel_files(directory):
-    """Trouve tous les fichiers Excel dans le dossier résultats"""
-    fichiers = []
-    if os.path.exists(directory):
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if file.endswith('.xlsx') and not file.startswith('~') and file != 'TOUS_LES_RESULTATS.xlsx':
-                    fichiers.append(os.path.join(root, file))
-    return sorted(fichiers)
+    """Trouve tous les fichiers Excel dans le dossier résultats (d'après catalogue.json s'il existe)"""
+    return sorted(chemin for _, chemin in lister_fichiers(directory))
 
 def get_type_abri_from_path(file_path):
-    """Détermine le type d'abri depuis le chemin"""
-    if 'carport' in file_path:
-        return 'carport'
-    elif 'bosquet_ferme' in file_path:
-        return 'bosquet_ferme'
-    elif 'bosquet_ouvert' in file_path:
-        return 'bosquet_ouvert'
-    elif 'domino_ferme' in file_path:
-        return 'domino_ferme'
-    elif 'domino_ouvert' in file_path:
-        return 'domino_ouvert'
-    elif 'metallique_ferme' in file_path:
-        return 'metallique_ferme'
-    elif 'metallique_ouvert' in file_path:
-        return 'metallique_ouvert'
-    elif 'neve_ouvert' in file_path:
-        return 'neve_ouvert'
-    return 'autre'
+    """Détermine le type d'abri : d'après catalogue.json, sinon depuis le chemin"""
+    global _catalogue
+    if _catalogue is None:
+        _catalogue = Catalogue.charger(resultats_dir) or False
+    entree = _catalogue.par_chemin(file_path) if _catalogue else None
+    if entree is not None:
+        return entree['type']
+    return _type_abri_fichier(file_path)
 
 def main():
+    parser = argparse.ArgumentParser(description="Extrait les prix et composants des fichiers Excel générés")
+    parser.add_argument('--sans-excel', action='store_true',
+                        help="Ne pas recalculer dans Excel : lire les valeurs déjà calculées, en parallèle")
+    parser.add_argument('--processus', type=int, default=os.cpu_count() or 1,
+                        help="--sans-excel : nombre de processus (défaut : %(default)s, un par cœur)")
+    parser.add_argument('--tout', action='store_true', help="Retraiter aussi les fichiers qui ont déjà leurs prix")
+    parser.add_argument('--stockage', choices=STOCKAGES,
+                        help="Stockage des résultats : base SQLite, ou journal (une ligne par fichier, "
+                             "compacté périodiquement). Défaut : celui déjà utilisé, sinon sqlite")
+    parser.add_argument('--intervalle-telemetrie', type=float, default=INTERVALLE,
+                        help="Secondes entre deux lignes d'état / écritures de extraction_metriques.json "
+                             "(défaut : %(default)s)")
+    args = parser.parse_args()
+    global _telemetrie
+    
     print("=" * 80)
     print("EXTRACTION DES PRIX ET COMPOSANTS (VERSION AMÉLIORÉE)")
     print("=" * 80)
     
     # Charger les résultats existants
     print("\n📖 Chargement des résultats existants...")
-    results_data, existing_results_dict = load_existing_results()
+    base, existing_results_dict = load_existing_results(args.stockage)
     print(f"   {len(existing_results_dict)} fichiers déjà dans les résultats")
     
     # Trouver tous les fichiers Excel
@@ -328,41 +437,72 @@ def main():
     os.makedirs(composant_dir, exist_ok=True)
     
     # Activer Excel une seule fois au début
-    print("🔧 Activation d'Excel...")
-    subprocess.run(['osascript', '-e', 'tell application "Microsoft Excel" to activate'], 
-                   capture_output=True)
-    time.sleep(1)
+    if not args.sans_excel:
+        print("🔧 Activation d'Excel...")
+        subprocess.run(['osascript', '-e', 'tell application "Microsoft Excel" to activate'], 
+                       capture_output=True)
+        time.sleep(1)
     
-    # Filtrer les fichiers : ne traiter que ceux SANS PRIX
+    # Filtrer les fichiers : ne traiter que les nouveaux, ceux SANS PRIX et ceux
+    # modifiés depuis leur extraction (manifeste : taille, date, SHA-256, version)
     fichiers_a_traiter = []
-    fichiers_avec_prix = 0
-    fichiers_sans_resultat = 0
+    etats = {'nouveau': 0, 'sans_prix': 0, 'modifie': 0, 'version': 0, 'inchange': 0}
     
     for fichier in fichiers:
-        # Vérifier si le fichier a déjà un prix dans les résultats
-        if fichier in existing_results_dict:
-            resultat = existing_results_dict[fichier]
-            prix_avant = resultat.get('prix_avant_reduction')
-            prix_apres = resultat.get('prix_apres_reduction')
-            
-            # Si le fichier a des prix valides, on ne le retraite pas
-            if is_valid_price(prix_avant) and is_valid_price(prix_apres):
-                fichiers_avec_prix += 1
-                continue
-            # Sinon, on le retraite (pas de prix ou prix invalides)
-            else:
-                fichiers_a_traiter.append(fichier)
-        else:
-            # Fichier pas encore dans les résultats, on le traite
-            fichiers_sans_resultat += 1
+        etat, manifeste = etat_fichier(fichier, existing_results_dict.get(fichier))
+        etats[etat] += 1
+        if etat == 'modifie':
+            # Résultat périmé : signalé tant que le fichier n'a pas été réextrait
+            base.enregistrer({'chemin_complet': fichier, 'perime': True})
+        elif manifeste is not None:
+            base.enregistrer({'chemin_complet': fichier, 'manifeste': manifeste})
+        
+        # Fichier inchangé avec des prix valides : on ne le retraite pas (sauf --tout)
+        if etat != 'inchange' or args.tout:
             fichiers_a_traiter.append(fichier)
     
-    print(f"\n📊 Fichiers à traiter (sans prix): {len(fichiers_a_traiter)}")
-    print(f"   Fichiers avec prix complets: {fichiers_avec_prix}")
-    print(f"   Fichiers sans résultat: {fichiers_sans_resultat}")
+    print(f"\n📊 Fichiers à traiter: {len(fichiers_a_traiter)}")
+    print(f"   Fichiers inchangés avec prix complets: {etats['inchange']}")
+    print(f"   Fichiers sans résultat: {etats['nouveau']}")
+    print(f"   Fichiers sans prix: {etats['sans_prix']}")
+    if etats['modifie']:
+        print(f"   ⚠️  Fichiers modifiés depuis leur extraction (résultats périmés): {etats['modifie']}")
+    if etats['version']:
+        print(f"   Fichiers extraits par une autre version de l'extraction: {etats['version']}")
     
     if not fichiers_a_traiter:
-        print("\n✅ Tous les fichiers ont des prix complets !")
+        print("\n✅ Tous les fichiers ont des prix complets et à jour !")
+        base.fermer()
+        return
+    
+    _telemetrie = TelemetrieExtraction(len(fichiers_a_traiter), 'sans_excel' if args.sans_excel else 'excel',
+                                       intervalle=args.intervalle_telemetrie)
+    _telemetrie.demarrer()
+    
+    if args.sans_excel:
+        nb_processus = max(1, min(args.processus, len(fichiers_a_traiter)))
+        print(f"\n🚀 Lecture en parallèle avec {nb_processus} processus (sans Excel)...")
+        print()
+        start_time = time.time()
+        succes, fichiers_sans_prix = extraire_en_processus(fichiers_a_traiter, base, nb_processus)
+        elapsed_time = time.time() - start_time
+        _telemetrie.fermer()
+        
+        print(f"\n" + "=" * 80)
+        print("RÉSUMÉ")
+        print("=" * 80)
+        print(f"✅ Succès (avec prix): {succes}")
+        if fichiers_sans_prix:
+            print(f"❌ Sans prix calculé: {len(fichiers_sans_prix)}")
+        print(f"⏱️  Temps total: {elapsed_time:.1f} secondes ({len(fichiers_a_traiter) / max(elapsed_time, 1e-6):.0f} fichiers/s)")
+        print(f"\n💾 Résultats sauvegardés dans: {base.chemin} (exportés dans {resultats_json_file})")
+        print(f"💾 Composants sauvegardés dans: {composant_dir}/")
+        print(f"📈 Métriques de l'extraction dans: {_telemetrie.chemin}")
+        base.fermer()
+        if _composants is not None:
+            _composants.fermer()
+        if fichiers_sans_prix:
+            print(f"\n💡 Fichiers sans valeurs calculées : relancez sans --sans-excel pour les recalculer dans Excel")
         return
     
     # Système de retry : dictionnaire pour suivre les tentatives pendant ce run
@@ -386,12 +526,12 @@ def main():
     completed = 0
     
     # Créer une copie locale des résultats pour mise à jour
-    results_list = results_data.get('resultats', [])
     results_dict_local = existing_results_dict.copy()
     
     def process_with_retry(file_path, attempt_num):
         """Traite un fichier avec gestion du retry"""
-        nonlocal results_list, results_dict_local, attempts_dict
+        nonlocal results_dict_local, attempts_dict
+        _telemetrie.tentative_commencee()
         
         # Incrémenter le compteur de tentatives
         attempts_dict[file_path] = attempt_num
@@ -404,17 +544,9 @@ def main():
             
             # Vérifier si on a obtenu des prix valides
             if is_valid_price(prix_avant) and is_valid_price(prix_apres):
-                # Succès : on a des prix valides
-                chemin = result['chemin_complet']
-                if chemin in results_dict_local:
-                    # Mettre à jour l'existant
-                    idx = next((i for i, r in enumerate(results_list) if r.get('chemin_complet') == chemin), None)
-                    if idx is not None:
-                        results_list[idx].update(result)
-                else:
-                    # Ajouter nouveau
-                    results_list.append(result)
-                    results_dict_local[chemin] = result
+                # Succès : on a des prix valides (ajout ou mise à jour de l'existant, par chemin)
+                base.enregistrer(result)
+                results_dict_local[result['chemin_complet']] = result
                 
                 return file_path, result, True, None, None
             else:
@@ -442,6 +574,7 @@ def main():
         
         if not current_round:
             break
+        _telemetrie.nouveau_tour()
         
         # Traiter ce round en parallèle
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -464,10 +597,7 @@ def main():
                         prix_apres = result.get('prix_apres_reduction')
                         print(f"[{completed}] ✅ {basename} | Tentative {attempt_num}/{max_attempts_per_run} | Avant: {prix_avant:.2f} € | Après: {prix_apres:.2f} €")
                         succes += 1
-                        
-                        # Sauvegarder immédiatement après chaque succès
-                        results_data['resultats'] = results_list
-                        save_results(results_data)
+                        _telemetrie.tentative_terminee('succes')
                         
                         # Délai entre fichiers
                         time.sleep(delay_between_files)
@@ -476,6 +606,7 @@ def main():
                         if attempt_num < max_attempts_per_run and "retry possible" in status:
                             # Retenter
                             next_round.append((file_path_result, attempt_num + 1))
+                            _telemetrie.tentative_terminee('retry')
                             print(f"[{completed}] ⚠️  {basename} | Tentative {attempt_num}/{max_attempts_per_run} | {status}")
                         else:
                             # Plus de tentatives possibles
@@ -483,13 +614,15 @@ def main():
                             error_msg = error if error else status
                             print(f"[{completed}] ❌ {basename} | Tentative {attempt_num}/{max_attempts_per_run} | {error_msg}")
                             echecs += 1
+                            _telemetrie.tentative_terminee('echec')
                             
                             # Sauvegarder quand même (même sans prix)
                             chemin = file_path_result
                             if chemin in results_dict_local:
-                                idx = next((i for i, r in enumerate(results_list) if r.get('chemin_complet') == chemin), None)
-                                if idx is not None:
-                                    results_list[idx]['date_extraction'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                                # Anciens prix et date d'extraction gardés : un résultat
+                                # périmé le reste et sera retraité au prochain run
+                                base.enregistrer({'chemin_complet': chemin, 'tentative': attempt_num,
+                                                  'erreur': error_msg})
                             else:
                                 type_abri = get_type_abri_from_path(chemin)
                                 result_no_price = {
@@ -502,14 +635,9 @@ def main():
                                     'tentative': attempt_num,
                                     'erreur': error_msg
                                 }
-                                results_list.append(result_no_price)
+                                base.enregistrer(result_no_price)
                                 results_dict_local[chemin] = result_no_price
                             
-                            # Sauvegarder périodiquement (tous les 5 fichiers)
-                            if completed % 5 == 0:
-                                results_data['resultats'] = results_list
-                                save_results(results_data)
-                            
                             # Délai entre fichiers
                             time.sleep(delay_between_files)
                     
@@ -518,16 +646,17 @@ def main():
                     basename = os.path.basename(file_path)
                     print(f"[{completed}] ❌ {basename} | Exception: {e}")
                     echecs += 1
+                    _telemetrie.tentative_terminee('echec')
                     time.sleep(delay_between_files)
         
         # Mettre à jour la liste des fichiers restants
         remaining_files = next_round
     
     # Sauvegarder les résultats finaux
-    results_data['resultats'] = results_list
-    save_results(results_data)
+    save_results(base)
     
     elapsed_time = time.time() - start_time
+    _telemetrie.fermer()
     
     # Résumé
     print(f"\n" + "=" * 80)
@@ -540,10 +669,15 @@ def main():
     if len(fichiers_a_traiter) > 0:
         print(f"⚡ Temps moyen par fichier: {elapsed_time/len(fichiers_a_traiter):.1f} secondes")
     
-    print(f"\n💾 Résultats sauvegardés dans: {resultats_json_file}")
+    print(f"\n💾 Résultats sauvegardés dans: {base.chemin} (exportés dans {resultats_json_file})")
     print(f"💾 Composants sauvegardés dans: {composant_dir}/")
+    print(f"📈 Métriques de l'extraction dans: {_telemetrie.chemin}")
     
     # Statistiques sur les prix
+    results_list = list(base.resultats().values())
+    base.fermer()
+    if _composants is not None:
+        _composants.fermer()
     prix_complets = [r for r in results_list if is_valid_price(r.get('prix_avant_reduction')) and is_valid_price(r.get('prix_apres_reduction'))]
     print(f"\n📊 {len(prix_complets)}/{len(results_list)} fichiers avec prix complets")
     
@@ -21,6 +21,8 @@ import csv
 from pathlib import Path
 from urllib.parse import quote
 
+from catalogue import Catalogue
+
 # Configuration
 RESULTATS_DIR = 'résultats'
 OUTPUT_CSV = 'urls_drive.csv'
@@ -58,6 +60,7 @@ def generer_url_fichier(nom_dossier, nom_fichier):
 def parcourir_resultats():
     """
     Parcourt le dossier résultats et collecte tous les fichiers
+    (les classeurs de catalogue.json s'il existe)
     Retourne une liste de tuples (nom_dossier, nom_fichier)
     """
     fichiers = []
@@ -66,6 +69,14 @@ def parcourir_resultats():
         print(f"❌ Le dossier '{RESULTATS_DIR}' n'existe pas")
         return fichiers
     
+    catalogue = Catalogue.charger(RESULTATS_DIR)
+    if catalogue is not None:
+        print(f"📚 Catalogue '{catalogue.chemin}' : {len(catalogue)} classeurs\n")
+        for entree in catalogue.entrees():
+            fichiers.append((os.path.basename(os.path.dirname(entree['chemin'])),
+                             os.path.basename(entree['chemin'])))
+        return fichiers
+    
     print(f"📁 Parcours du dossier '{RESULTATS_DIR}'...\n")
     
     # Parcourir tous les sous-dossiers
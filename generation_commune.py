@@ -0,0 +1,826 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cœur commun aux scripts de génération (generate_*.py)
+======================================================
+
+Chaque script generate_<type>.py décrit un type d'abri :
+- TYPE_ABRI, TITRE, source_file : identité du type et fichier de base
+- CODE_SKU : préfixe des noms de fichiers (ex. 'MET-F' -> MET-F-7M-P-1000-PT.xlsx)
+- planifier() : variants à générer (dictionnaires ; liste ou générateur), sans aucune I/O
+- decrire(variant) : lignes affichées pour chaque variant
+- configurer(ws, variant) : écrit un variant dans la feuille Configure
+- PARAMETRES_RESUME / DIMENSIONS : contenu de resume.json et du résumé final
+
+generer_type() enchaîne planification, construction de chaque classeur en
+mémoire et écriture dans une sortie, en pipeline (un thread par étage, files
+bornées) : la mémoire reste stable quelle que soit la taille du catalogue, et
+--max-memoire ralentit la construction au-delà d'un seuil. Sorties :
+- SortieDossier : résultats/<type>/<SKU>.xlsx (comportement historique)
+- SortieZip : chaque variant est ajouté à une archive ZIP ouverte dès qu'il
+  est construit (API web), sans passer par des fichiers intermédiaires
+
+Chaque phase de la construction (chargement, configuration, enregistrement,
+normalisation, écriture) est chronométrée : p50 / p95 / max par type dans
+metriques.json, à côté de resume.json, et dans un tableau en fin de génération.
+
+Chaque classeur écrit est inscrit dans résultats/catalogue.json (SKU, chemin,
+paramètres, SHA-256, taille, date ; voir catalogue.py), que lisent les étapes
+d'extraction, de fusion et de publication.
+
+Les classeurs sont déterministes (construire_classeur) : leur SHA-256 peut
+servir à éviter un envoi, dédupliquer un stockage ou mettre en cache une
+réponse HTTP (voir verifier_determinisme.py).
+"""
+
+import argparse
+import contextlib
+import gc
+import hashlib
+import importlib
+import io
+import json
+import math
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+from xlsx_brut import normaliser_xlsx
+
+RESULTATS_DIR = 'résultats'
+FICHIER_METRIQUES = 'metriques.json'
+FICHIER_JOURNAL = '.generation_en_cours'
+
+# Types d'abris : résultats/<type>/ est produit par generate_<type>.py
+TYPES_ABRIS = [
+    'carport',
+    'bosquet_ferme',
+    'bosquet_ferme_compact',
+    'bosquet_ouvert',
+    'bosquet_ouvert_compact',
+    'domino_ferme',
+    'domino_ferme_compact',
+    'domino_ouvert',
+    'domino_ouvert_compact',
+    'metallique_ferme',
+    'metallique_ferme_compact',
+    'metallique_ouvert',
+    'metallique_ouvert_compact',
+    'neve_ferme',
+    'neve_ferme_compact',
+    'neve_ouvert',
+]
+
+
+def charger_generateur(type_abri):
+    """Importe le module generate_<type_abri>.py (sans lancer la génération)"""
+    return importlib.import_module(f'generate_{type_abri}')
+
+
+# ---------------------------------------------------------------------------
+# Variantes et nomenclature
+# ---------------------------------------------------------------------------
+
+def dedupliquer_variantes(variantes):
+    """
+    Fusionne les variantes dont la configuration Excel est identique.
+    Le nom du fichier (SKU) ne dépend pas de la variante : deux variantes avec
+    les mêmes valeurs (wall_material, remove_cladding, ...) écriraient deux fois
+    le même fichier.
+    Retourne (variantes_uniques, fusions) où fusions = [(nom_fusionne, nom_conserve), ...]
+    """
+    uniques = {}
+    fusions = []
+    for variante in variantes:
+        # Forme canonique : toutes les clés sauf le nom, dans un ordre stable
+        cle = tuple(sorted((k, v) for k, v in variante.items() if k != 'nom'))
+        if cle in uniques:
+            fusions.append((variante['nom'], uniques[cle]['nom']))
+        else:
+            uniques[cle] = variante
+    return list(uniques.values()), fusions
+
+
+def afficher_fusions(fusions):
+    """Affiche les variantes fusionnées par dedupliquer_variantes"""
+    for nom, conserve in fusions:
+        print(f"♻️  Variante '{nom}' identique à '{conserve}' : fusionnée (même fichier généré)")
+
+
+def code_largeur(largeur_totale):
+    """Largeur dans le SKU : 2.5 -> '2.5M', 6 -> '6M'"""
+    if largeur_totale == int(largeur_totale):
+        return f'{int(largeur_totale)}M'
+    return f'{largeur_totale}M'
+
+
+def code_version(version):
+    """Version dans le SKU : N pour Standard, P pour PLUS"""
+    return 'N' if version == 'Standard' else 'P'
+
+
+def code_traitement(treatment):
+    """Traitement dans le SKU : G pour Galvanized, PT pour Powder coated"""
+    return 'G' if treatment == 'Galvanized' else 'PT'
+
+
+def nom_sku(type_code, largeur_totale, version, profondeur_code, treatment):
+    """Nom du fichier : {type}-{largeur}M-{version}-{profondeur}-{treatment}.xlsx"""
+    return (f'{type_code}-{code_largeur(largeur_totale)}-{code_version(version)}'
+            f'-{profondeur_code}-{code_traitement(treatment)}.xlsx')
+
+
+RE_SKU = re.compile(r'^(?P<code>[A-Z][A-Z-]*?)-(?P<largeur>\d+(?:\.\d+)?)M-(?P<version>[NP])'
+                    r'-(?P<profondeur>\d+)-(?P<traitement>G|PT)$')
+
+
+def analyser_sku(sku):
+    """
+    Inverse de nom_sku : 'MET-F-7M-P-1000-PT' (ou MET-F-7M-P-1000-PT.xlsx) ->
+    {'code': 'MET-F', 'largeur_totale': 7, 'version': 'PLUS', 'profondeur_code': '1000',
+     'treatment': 'Powder coated'}
+    Lève ValueError si le SKU ne suit pas la nomenclature.
+    """
+    nom = os.path.basename(sku)
+    if nom.endswith('.xlsx'):
+        nom = nom[:-len('.xlsx')]
+    m = RE_SKU.match(nom)
+    if not m:
+        raise ValueError(f"SKU invalide : {sku} (attendu : TYPE-<largeur>M-<N|P>-<profondeur>-<G|PT>)")
+    largeur = float(m.group('largeur'))
+    return {
+        'code': m.group('code'),
+        'largeur_totale': int(largeur) if largeur == int(largeur) else largeur,
+        'version': 'Standard' if m.group('version') == 'N' else 'PLUS',
+        'profondeur_code': m.group('profondeur'),
+        'treatment': 'Galvanized' if m.group('traitement') == 'G' else 'Powder coated',
+    }
+
+
+# ---------------------------------------------------------------------------
+# Template
+# ---------------------------------------------------------------------------
+
+def chemin_template_allege(source_file):
+    """Chemin du template allégé associé à un fichier de base (voir alleger_template.py)"""
+    racine, extension = os.path.splitext(source_file)
+    return f"{racine}_allege{extension}"
+
+
+def fichier_infos_template(source_file):
+    """Fichier JSON décrivant le fichier de base dont le template allégé est issu"""
+    racine, _ = os.path.splitext(chemin_template_allege(source_file))
+    return f"{racine}.json"
+
+
+def choisir_template(source_file):
+    """
+    Retourne le template à copier pour chaque variant : le template allégé s'il
+    a été créé à partir de la version actuelle du fichier de base, par le code
+    actuel (registre_templates.empreinte_preparation), sinon le fichier de base
+    lui-même.
+    """
+    from registre_templates import empreinte_preparation
+    allege = chemin_template_allege(source_file)
+    infos_file = fichier_infos_template(source_file)
+    if not (os.path.exists(allege) and os.path.exists(infos_file)):
+        return source_file
+    try:
+        with open(infos_file, 'r', encoding='utf-8') as f:
+            infos = json.load(f)
+    except (OSError, ValueError):
+        return source_file
+    # Taille + date de modification : le fichier de base n'a pas été remplacé
+    if (infos.get('source_taille') != os.path.getsize(source_file)
+            or infos.get('source_mtime') != os.path.getmtime(source_file)):
+        return source_file
+    if infos.get('code_sha256') != empreinte_preparation():
+        return source_file
+    return allege
+
+
+# ---------------------------------------------------------------------------
+# Chronométrage des phases
+# ---------------------------------------------------------------------------
+
+PHASES = ['chargement', 'configuration', 'enregistrement', 'normalisation', 'ecriture']
+
+
+def percentile(valeurs_triees, p):
+    """Percentile p (0-100) d'une liste triée, méthode du rang le plus proche"""
+    if not valeurs_triees:
+        return None
+    rang = max(1, math.ceil(p / 100 * len(valeurs_triees)))
+    return valeurs_triees[rang - 1]
+
+
+class Chronometre:
+    """Durées de chaque phase, variant par variant"""
+
+    def __init__(self):
+        self.durees = {}  # phase -> [secondes]
+
+    @contextlib.contextmanager
+    def mesurer(self, phase):
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durees.setdefault(phase, []).append(time.perf_counter() - debut)
+
+    def statistiques(self):
+        """{phase: {n, total_s, p50_ms, p95_ms, max_ms}}, dans l'ordre de PHASES"""
+        phases = [p for p in PHASES if p in self.durees] + [p for p in self.durees if p not in PHASES]
+        statistiques = {}
+        for phase in phases:
+            durees = sorted(self.durees[phase])
+            statistiques[phase] = {
+                'n': len(durees),
+                'total_s': round(sum(durees), 3),
+                'p50_ms': round(percentile(durees, 50) * 1000, 2),
+                'p95_ms': round(percentile(durees, 95) * 1000, 2),
+                'max_ms': round(durees[-1] * 1000, 2),
+            }
+        return statistiques
+
+
+def afficher_metriques(statistiques, precedentes=None, titre="Durées par variant (ms)"):
+    """Tableau p50 / p95 / max par phase ; écart de p50 avec la génération précédente"""
+    print(f"\n⏱️  {titre} :")
+    print(f"   {'Phase':<16}{'p50':>9}{'p95':>9}{'max':>9}{'total (s)':>11}{'p50 préc.':>11}")
+    for phase, stats in statistiques.items():
+        ancienne = (precedentes or {}).get(phase, {}).get('p50_ms')
+        comparaison = ''
+        if ancienne:
+            ecart = 100 * (stats['p50_ms'] - ancienne) / ancienne
+            comparaison = f"{ancienne:>11.1f} {ecart:+.0f}%"
+            # Plus de 20 % et plus d'une milliseconde : les phases très courtes sont bruitées
+            if ecart > 20 and stats['p50_ms'] - ancienne > 1:
+                comparaison += ' ⚠️'
+        print(f"   {phase:<16}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['max_ms']:>9.1f}"
+              f"{stats['total_s']:>11.1f}{comparaison}")
+
+
+def construire_classeur(template, configurer, variant, deterministe=True, chrono=None):
+    """
+    Construit le classeur d'un variant en mémoire.
+    template : contenu (octets) du fichier de base ; retourne les octets du .xlsx
+    deterministe : dates du zip et de docProps/core.xml fixées, parties triées
+    (xlsx_brut.normaliser_xlsx) : mêmes entrées -> mêmes octets, d'une exécution
+    et d'une machine à l'autre (à version d'openpyxl égale)
+    chrono : Chronometre qui reçoit la durée de chaque phase
+    """
+    import openpyxl
+
+    chrono = chrono or Chronometre()
+    with chrono.mesurer('chargement'):
+        wb = openpyxl.load_workbook(io.BytesIO(template), data_only=False)
+    with chrono.mesurer('configuration'):
+        configurer(wb['Configure'], variant)
+    with chrono.mesurer('enregistrement'):
+        contenu = io.BytesIO()
+        wb.save(contenu)
+        wb.close()
+    if not deterministe:
+        return contenu.getvalue()
+    with chrono.mesurer('normalisation'):
+        return normaliser_xlsx(contenu.getvalue(), reference=template)
+
+
+# ---------------------------------------------------------------------------
+# Sorties
+# ---------------------------------------------------------------------------
+
+def _empreinte_fichier(chemin):
+    with open(chemin, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Modules partagés dont dépend le contenu des classeurs, en plus du script du type
+# (alleger_template.py : le template allégé est la base de chaque classeur)
+MODULES_GENERATION = ('alleger_template.py', 'decomposition.py', 'generation_commune.py', 'xlsx_brut.py')
+
+
+def empreinte_code(generateur):
+    """
+    Empreinte du code qui produit les classeurs d'un type : script de génération,
+    MODULES_GENERATION et version d'openpyxl. Change après toute correction de
+    configurer() ou de la table de décomposition.
+    """
+    import openpyxl
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    empreinte = hashlib.sha256()
+    for chemin in [generateur.__file__] + [os.path.join(dossier, module) for module in MODULES_GENERATION]:
+        empreinte.update(_empreinte_fichier(chemin).encode('ascii'))
+    empreinte.update(openpyxl.__version__.encode('ascii'))
+    return empreinte.hexdigest()
+
+
+def ecrire_atomique(chemin, contenu):
+    """
+    Écrit contenu (octets) dans chemin via un fichier temporaire du même dossier,
+    synchronisé sur disque puis renommé : chemin contient l'ancien contenu ou le
+    nouveau, jamais un fichier tronqué. Le fichier temporaire (.<nom>.<pid>.tmp)
+    ne se termine pas par .xlsx : les scripts qui parcourent résultats/ l'ignorent.
+    """
+    dossier, nom = os.path.split(chemin)
+    temporaire = os.path.join(dossier, f'.{nom}.{os.getpid()}.{threading.get_ident()}.tmp')
+    try:
+        with open(temporaire, 'wb') as f:
+            f.write(contenu)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporaire, chemin)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporaire)
+        raise
+
+
+def ecrire_json_atomique(chemin, data, indent=2):
+    """json.dump atomique (voir ecrire_atomique)"""
+    ecrire_atomique(chemin, json.dumps(data, indent=indent, ensure_ascii=False).encode('utf-8'))
+
+
+class JournalGeneration:
+    """
+    Journal d'une génération complète en cours (résultats/<type>/.generation_en_cours) :
+    une ligne d'en-tête (empreinte des entrées), puis le nom de chaque classeur dès
+    qu'il est écrit. Une génération interrompue reprend après les classeurs déjà
+    écrits si les entrées n'ont pas changé ; le journal est supprimé à la fin.
+    Une ligne perdue (arrêt brutal) ne coûte que la reconstruction d'un classeur.
+    """
+
+    def __init__(self, chemin, cle):
+        self.chemin = chemin
+        self.cle = cle
+        self.fichier = None
+
+    def termines(self):
+        """Classeurs écrits par une génération interrompue aux mêmes entrées, encore présents"""
+        try:
+            with open(self.chemin, 'r', encoding='utf-8') as f:
+                lignes = f.read().split('\n')
+        except OSError:
+            return set()
+        if not lignes or lignes[0] != self.cle:
+            return set()
+        # La dernière ligne, sans retour à la ligne, peut être incomplète
+        dossier = os.path.dirname(self.chemin)
+        return {nom for nom in lignes[1:-1] if os.path.exists(os.path.join(dossier, nom))}
+
+    def ouvrir(self, reprise):
+        if not reprise:
+            ecrire_atomique(self.chemin, f'{self.cle}\n'.encode('utf-8'))
+        self.fichier = open(self.chemin, 'a', encoding='utf-8')
+
+    def noter(self, nom_fichier):
+        self.fichier.write(f'{nom_fichier}\n')
+        self.fichier.flush()
+
+    def fermer(self):
+        if self.fichier is not None:
+            self.fichier.close()
+            self.fichier = None
+
+    def supprimer(self):
+        self.fermer()
+        with contextlib.suppress(OSError):
+            os.remove(self.chemin)
+
+
+class SortieDossier:
+    """
+    Écrit chaque variant dans résultats/<type>/<SKU>.xlsx, avec un resume.json par type.
+    Chaque fichier est écrit de façon atomique ; les anciens classeurs hors plan ne
+    sont supprimés qu'à la fin d'une génération complète (terminer_type).
+    """
+
+    def __init__(self, resultats_dir=RESULTATS_DIR, nettoyer=True):
+        self.resultats_dir = resultats_dir
+        self.nettoyer = nettoyer
+
+    def dossier(self, type_abri):
+        return os.path.join(self.resultats_dir, type_abri)
+
+    def ouvrir_type(self, type_abri):
+        output_dir = self.dossier(type_abri)
+        os.makedirs(output_dir, exist_ok=True)
+        # Fichiers temporaires laissés par une génération tuée pendant une écriture
+        for nom in os.listdir(output_dir):
+            if nom.startswith('.') and nom.endswith('.tmp'):
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(output_dir, nom))
+
+    def journal(self, type_abri, cle):
+        return JournalGeneration(os.path.join(self.dossier(type_abri), FICHIER_JOURNAL), cle)
+
+    def ecrire(self, type_abri, nom_fichier, contenu):
+        ecrire_atomique(os.path.join(self.dossier(type_abri), nom_fichier), contenu)
+
+    def lire(self, type_abri, nom_fichier):
+        with open(os.path.join(self.dossier(type_abri), nom_fichier), 'rb') as f:
+            return f.read()
+
+    def terminer_type(self, type_abri, fichiers):
+        """Fin d'une génération complète : supprime les anciens classeurs hors plan"""
+        if not self.nettoyer:
+            return
+        planifies = set(fichiers)
+        output_dir = self.dossier(type_abri)
+        for old_file in os.listdir(output_dir):
+            if old_file.endswith('.xlsx') and old_file not in planifies:
+                os.remove(os.path.join(output_dir, old_file))
+
+    def ecrire_resume(self, type_abri, resume):
+        ecrire_json_atomique(os.path.join(self.dossier(type_abri), 'resume.json'), resume)
+
+    def ecrire_catalogue(self, type_abri, entrees, remplacer=True):
+        """
+        Met à jour résultats/catalogue.json (voir catalogue.py). Sans catalogue,
+        les classeurs déjà présents des autres types y sont d'abord inscrits.
+        """
+        from catalogue import Catalogue, reconstruire
+        catalogue = Catalogue.charger(self.resultats_dir)
+        if catalogue is None:
+            catalogue, _ = reconstruire(self.resultats_dir)
+        catalogue.mettre_a_jour_type(type_abri, entrees, remplacer)
+        catalogue.enregistrer()
+
+    def lire_metriques(self, type_abri):
+        """Métriques de la génération précédente, ou None"""
+        try:
+            with open(os.path.join(self.dossier(type_abri), FICHIER_METRIQUES), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def ecrire_metriques(self, type_abri, metriques):
+        ecrire_json_atomique(os.path.join(self.dossier(type_abri), FICHIER_METRIQUES), metriques)
+
+    def fermer(self):
+        pass
+
+
+class SortieZip:
+    """
+    Ajoute chaque variant à une archive ZIP ouverte dès qu'il est construit.
+    Les .xlsx sont déjà compressés (deflate) : ils sont stockés tels quels
+    (ZIP_STORED) au lieu d'être recompressés.
+    destination : chemin ou objet fichier (un flux non positionnable est accepté)
+    """
+
+    def __init__(self, destination):
+        self.zip = zipfile.ZipFile(destination, 'w', zipfile.ZIP_STORED)
+
+    def dossier(self, type_abri):
+        return f'archive ZIP ({type_abri}/)'
+
+    def ouvrir_type(self, type_abri):
+        pass
+
+    def journal(self, type_abri, cle):
+        # Une archive envoyée au fil de l'eau ne se reprend pas
+        return None
+
+    def ecrire(self, type_abri, nom_fichier, contenu):
+        self.zip.writestr(f'{type_abri}/{nom_fichier}', contenu, compress_type=zipfile.ZIP_STORED)
+
+    def ecrire_resume(self, type_abri, resume):
+        # L'archive ne contient que les classeurs
+        pass
+
+    def terminer_type(self, type_abri, fichiers):
+        pass
+
+    def ecrire_catalogue(self, type_abri, entrees, remplacer=True):
+        pass
+
+    def lire_metriques(self, type_abri):
+        return None
+
+    def ecrire_metriques(self, type_abri, metriques):
+        pass
+
+    def fermer(self):
+        self.zip.close()
+
+
+# ---------------------------------------------------------------------------
+# Pipeline borné : planification -> construction -> écriture
+# ---------------------------------------------------------------------------
+
+TAILLE_FILE = 4  # classeurs construits en attente d'écriture (et variants planifiés en attente)
+
+_FIN = object()
+
+
+class _Erreur:
+    """Exception levée dans un étage du pipeline, transmise à l'étage suivant"""
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def memoire_residente():
+    """Mémoire résidente (octets) du processus, ou None si elle n'est pas mesurable"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _mettre(file, element, arret):
+    """put() qui abandonne si le pipeline est arrêté (erreur de l'étage suivant)"""
+    while not arret.is_set():
+        try:
+            file.put(element, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def pipeline(variants, construire, taille_file=TAILLE_FILE, memoire_max=None, statistiques=None):
+    """
+    Générateur de (variant, contenu) : la planification et la construction tournent
+    chacune dans un thread, reliées par des files bornées (taille_file éléments).
+    Au plus ~2 × taille_file + 2 variants et taille_file + 1 classeurs sont en mémoire,
+    quelle que soit la taille du catalogue ; variants peut être un générateur.
+    memoire_max (octets) : tant que la mémoire résidente dépasse ce seuil, la
+    construction attend que l'écriture ait vidé la file.
+    statistiques : dict complété avec 'planifies' et 'memoire_max_observee'
+    """
+    statistiques = statistiques if statistiques is not None else {}
+    statistiques.update(planifies=0, memoire_max_observee=memoire_residente())
+    file_plan = queue.Queue(taille_file)
+    file_classeurs = queue.Queue(taille_file)
+    arret = threading.Event()
+
+    def planifier():
+        try:
+            for variant in variants:
+                statistiques['planifies'] += 1
+                _mettre(file_plan, variant, arret)
+                if arret.is_set():
+                    return
+            _mettre(file_plan, _FIN, arret)
+        except Exception as e:
+            _mettre(file_plan, _Erreur(e), arret)
+
+    def construire_tous():
+        while not arret.is_set():
+            element = file_plan.get()
+            if element is _FIN or isinstance(element, _Erreur):
+                _mettre(file_classeurs, element, arret)
+                return
+            memoire = memoire_residente()
+            if memoire_max is not None and memoire is not None:
+                # Laisser l'écriture vider la file avant de construire un nouveau classeur
+                while memoire > memoire_max and not file_classeurs.empty() and not arret.is_set():
+                    time.sleep(0.05)
+                    memoire = memoire_residente()
+                if memoire > memoire_max:
+                    gc.collect()
+            if memoire is not None:
+                statistiques['memoire_max_observee'] = max(statistiques['memoire_max_observee'] or 0, memoire)
+            try:
+                _mettre(file_classeurs, (element, construire(element)), arret)
+            except Exception as e:
+                _mettre(file_classeurs, _Erreur(e), arret)
+                return
+
+    etages = [threading.Thread(target=planifier, daemon=True),
+              threading.Thread(target=construire_tous, daemon=True)]
+    for etage in etages:
+        etage.start()
+    try:
+        while True:
+            element = file_classeurs.get()
+            if element is _FIN:
+                return
+            if isinstance(element, _Erreur):
+                raise element.exception
+            yield element
+    finally:
+        arret.set()
+        # Débloquer l'étage de construction s'il attend un variant
+        try:
+            file_plan.put_nowait(_FIN)
+        except queue.Full:
+            pass
+        for etage in etages:
+            etage.join()
+
+
+# ---------------------------------------------------------------------------
+# Génération
+# ---------------------------------------------------------------------------
+
+def generer_type(generateur, sortie=None, source_file=None, filtre=None, memoire_max=None,
+                 taille_file=TAILLE_FILE, registre=None):
+    """
+    Génère tous les variants d'un type d'abri (module generate_*.py).
+    Les variants sont planifiés sans I/O, puis chaque classeur est construit en
+    mémoire et confié à la sortie (SortieDossier par défaut), au fil d'un pipeline
+    borné (voir pipeline) : la mémoire ne dépend pas de la taille du catalogue.
+    source_file remplace le fichier de base du script (chemin relatif au dossier courant).
+    filtre(variant) -> bool : régénération partielle (voir regenerer.py) ; seuls les
+    variants retenus sont écrits, les autres fichiers et resume.json sont conservés.
+    memoire_max : mémoire résidente (octets) au-delà de laquelle la construction ralentit.
+    registre : RegistreTemplates (défaut : registre partagé du processus, .cache_templates/).
+    Retourne la liste des noms de fichiers générés.
+    """
+    type_abri = generateur.TYPE_ABRI
+    source_file = source_file or generateur.source_file
+
+    print("=" * 80)
+    print(generateur.TITRE)
+    print("=" * 80)
+
+    afficher_fusions(getattr(generateur, 'variantes_fusionnees', []))
+
+    # Vérifier que le fichier source existe
+    if not os.path.exists(source_file):
+        print(f"❌ Erreur: {source_file} n'existe pas !")
+        raise FileNotFoundError(source_file)
+
+    # Template allégé, retrouvé par empreinte du fichier de base (voir registre_templates.py)
+    from registre_templates import registre_par_defaut
+    template_enregistre = (registre or registre_par_defaut()).template(source_file)
+    template = template_enregistre.contenu
+    template_file = (f"{source_file} ({'allégé' if template_enregistre.allege else 'complet'}, "
+                     f"{template_enregistre.empreinte[:12]})")
+    print(f"📄 Template : {template_file} — {template_enregistre.origine}")
+
+    if sortie is None:
+        sortie = SortieDossier(generateur.resultats_dir, nettoyer=filtre is None)
+    precedentes = sortie.lire_metriques(type_abri)
+    sortie.ouvrir_type(type_abri)
+
+    # Journal de la génération complète : reprise après une interruption
+    # (même template et même code de génération, voir empreinte_code)
+    import openpyxl
+    journal = None
+    if filtre is None:
+        cle_journal = f'{template_enregistre.empreinte[:16]}-{empreinte_code(generateur)[:16]}'
+        journal = sortie.journal(type_abri, cle_journal)
+    termines = journal.termines() if journal is not None else set()
+    if termines:
+        print(f"♻️  Reprise de la génération interrompue : {len(termines)} classeurs déjà écrits")
+
+    plan = {'variants': 0}
+    premiers = []  # 10 premiers variants, pour resume.json
+    repris = []    # variants écrits par la génération interrompue
+
+    def variants():
+        # Consommé par l'étage de planification du pipeline
+        for variant in generateur.planifier():
+            plan['variants'] += 1
+            if filtre is None or filtre(variant):
+                if len(premiers) < 10:
+                    premiers.append(variant)
+                if variant['fichier'] in termines:
+                    repris.append(variant)
+                    continue
+                yield variant
+    debut = time.perf_counter()
+    chrono = Chronometre()
+    etat_pipeline = {}
+
+    def construire(variant):
+        return construire_classeur(template, generateur.configurer, variant, chrono=chrono)
+
+    from catalogue import entree_catalogue
+    fichiers = []
+    entrees = []  # tous les variants, pour catalogue.json
+    if journal is not None:
+        journal.ouvrir(reprise=bool(termines))
+    try:
+        for compteur, (variant, contenu) in enumerate(
+                pipeline(variants(), construire, taille_file, memoire_max, etat_pipeline), 1):
+            print(f"\n📦 Création {compteur}: {variant['fichier']}")
+            for ligne in generateur.decrire(variant):
+                print(f"   {ligne}")
+
+            with chrono.mesurer('ecriture'):
+                sortie.ecrire(type_abri, variant['fichier'], contenu)
+            if journal is not None:
+                journal.noter(variant['fichier'])
+            fichiers.append(variant['fichier'])
+            entrees.append(entree_catalogue(type_abri, variant,
+                                            os.path.join(sortie.dossier(type_abri), variant['fichier']), contenu))
+    finally:
+        if journal is not None:
+            journal.fermer()
+
+    for variant in repris:
+        contenu = sortie.lire(type_abri, variant['fichier'])
+        fichiers.append(variant['fichier'])
+        entrees.append(entree_catalogue(type_abri, variant,
+                                        os.path.join(sortie.dossier(type_abri), variant['fichier']), contenu))
+
+    duree = time.perf_counter() - debut
+    statistiques = chrono.statistiques()
+    memoire = etat_pipeline.get('memoire_max_observee')
+    sortie.ecrire_catalogue(type_abri, entrees, remplacer=filtre is None)
+
+    if filtre is not None:
+        print(f"\n" + "=" * 80)
+        print(f"✅ {len(fichiers)} / {plan['variants']} fichiers régénérés dans {sortie.dossier(type_abri)}")
+        print("=" * 80)
+        if fichiers:
+            afficher_metriques(statistiques, (precedentes or {}).get('phases'))
+        return fichiers
+
+    # Sauvegarder le résumé
+    parametres = dict(generateur.PARAMETRES_RESUME)
+    resume = {
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'type': parametres.pop('type'),
+        'total_fichiers': len(fichiers),
+        # Durée de construction + écriture ; inconnue après une reprise (seule une
+        # partie des classeurs a été construite)
+        'duree_secondes': None if repris else round(duree, 2),
+        **parametres,
+        'fichiers': premiers  # Limiter à 10 pour le JSON (liste complète : catalogue.json)
+    }
+    sortie.ecrire_resume(type_abri, resume)
+    sortie.terminer_type(type_abri, fichiers)
+
+    # Métriques : repérer une régression après une mise à jour d'openpyxl ou du template
+    sortie.ecrire_metriques(type_abri, {
+        'date': resume['date'],
+        'type': type_abri,
+        'template': template_file,
+        'openpyxl': openpyxl.__version__,
+        'python': sys.version.split()[0],
+        'variants': len(fichiers) - len(repris),
+        'duree_secondes': round(duree, 3),
+        'memoire_max_mo': round(memoire / (1024 * 1024), 1) if memoire else None,
+        'phases': statistiques,
+    })
+    if journal is not None:
+        journal.supprimer()
+
+    print(f"\n" + "=" * 80)
+    print(f"✅ {len(fichiers)} fichiers créés dans {sortie.dossier(type_abri)}")
+    print("=" * 80)
+
+    print(f"\n📋 Résumé:")
+    for libelle, valeur in generateur.DIMENSIONS:
+        print(f"   {libelle}: {valeur}")
+    facteurs = ' × '.join(str(valeur) for _, valeur in generateur.DIMENSIONS if isinstance(valeur, int))
+    print(f"   Total: {facteurs} = {len(fichiers)} fichiers")
+
+    if fichiers:
+        afficher_metriques(statistiques, (precedentes or {}).get('phases'))
+    if memoire:
+        print(f"   Mémoire résidente max : {memoire / (1024 * 1024):.0f} Mo")
+
+    return fichiers
+
+
+def ajouter_options_pipeline(parser):
+    """Options --max-memoire et --file du pipeline de génération"""
+    parser.add_argument('--max-memoire', '--max-memory', type=int, metavar='MO',
+                        help="Mémoire résidente (Mo) au-delà de laquelle la construction attend l'écriture")
+    parser.add_argument('--file', type=int, default=TAILLE_FILE, metavar='N',
+                        help="Classeurs en attente d'écriture (défaut : %(default)s)")
+
+
+def memoire_max_options(args):
+    """--max-memoire en octets (None si absent ou non mesurable ici)"""
+    if not args.max_memoire:
+        return None
+    if memoire_residente() is None:
+        print("⚠️  Mémoire résidente non mesurable ici (pip install psutil) : --max-memoire ignoré")
+        return None
+    return args.max_memoire * 1024 * 1024
+
+
+def executer(generateur):
+    """Point d'entrée des scripts generate_*.py"""
+    parser = argparse.ArgumentParser(description=generateur.TITRE)
+    ajouter_options_pipeline(parser)
+    args = parser.parse_args()
+    try:
+        generer_type(generateur, memoire_max=memoire_max_options(args), taille_file=args.file)
+    except FileNotFoundError:
+        sys.exit(1)
+
+    print(f"\n💡 Prochaines étapes:")
+    print(f"   Utilisez calculateur_prix_camflex.py pour :")
+    print(f"   1. Calculer automatiquement les formules Excel")
+    print(f"   2. Extraire les prix et composants")
+    print(f"   3. Générer le fichier final resultats_tous.json")
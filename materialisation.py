@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Construction d'un classeur à la demande à partir de son SKU
+============================================================
+
+La plupart des SKU ne sont jamais ouverts : au lieu de pré-générer tout
+résultats/, materialiser(sku) construit le classeur au moment où il est demandé.
+- le SKU (ex. MET-F-7M-P-1000-PT) est analysé (generation_commune.analyser_sku)
+  puis retrouvé dans le plan du script generate_<type>.py correspondant
+- le classeur est obtenu en appliquant à la base préparée le delta enregistré
+  par configurer(ws, variant) (xlsx_brut) : quelques millisecondes
+- les derniers classeurs demandés restent dans un cache LRU borné en taille,
+  en mémoire et sur disque (.cache_variants/)
+
+Le cache est associé à l'empreinte du template et à celle du code de génération
+(generation_commune.empreinte_code : script du type, decomposition.py...) : un
+nouveau fichier de base ou une correction de configurer() n'utilise jamais les
+classeurs construits avant.
+
+Utilisation :
+    python materialisation.py MET-F-7M-P-1000-PT BOS-F-4M-N-400-G --dossier /tmp
+    python materialisation.py --vider-cache
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from caches import CacheDisque, CacheMemoire
+from generation_commune import TYPES_ABRIS, analyser_sku, charger_generateur, empreinte_code
+
+CACHE_DIR = '.cache_variants'
+TAILLE_MAX_MEMOIRE = 64 * 1024 * 1024   # 64 Mo (~400 classeurs avec le template allégé)
+TAILLE_MAX_DISQUE = 512 * 1024 * 1024   # 512 Mo
+
+
+class Materialiseur:
+    """
+    Construit les classeurs à partir de leur SKU, avec cache LRU mémoire + disque.
+    cache_disque=None désactive le cache disque ; racine : dossier du projet,
+    auquel sont relatifs les fichiers de base des scripts (défaut : dossier courant).
+    """
+
+    def __init__(self, cache_memoire=None, cache_disque=None, types_abris=TYPES_ABRIS, racine='.',
+                 registre=None):
+        self.cache_memoire = cache_memoire if cache_memoire is not None else CacheMemoire(TAILLE_MAX_MEMOIRE)
+        self.cache_disque = cache_disque
+        self.types_abris = types_abris
+        self.racine = racine
+        self.registre = registre  # RegistreTemplates (défaut : registre partagé du processus)
+        self._generateurs = None  # CODE_SKU -> module generate_*.py
+        self._plans = {}          # type d'abri -> {fichier: variant}
+        self._empreintes = {}     # type d'abri -> empreinte du code chargé
+
+    def generateur(self, code):
+        """Module generate_*.py d'un code de SKU ('MET-F' -> generate_metallique_ferme)"""
+        if self._generateurs is None:
+            self._generateurs = {}
+            for type_abri in self.types_abris:
+                generateur = charger_generateur(type_abri)
+                self._generateurs[generateur.CODE_SKU] = generateur
+        try:
+            return self._generateurs[code]
+        except KeyError:
+            raise KeyError(f"Type de SKU inconnu : {code}") from None
+
+    def trouver(self, sku):
+        """(generateur, variant) d'un SKU ; KeyError s'il ne fait pas partie du catalogue"""
+        parametres = analyser_sku(sku)
+        generateur = self.generateur(parametres['code'])
+        type_abri = generateur.TYPE_ABRI
+        if type_abri not in self._plans:
+            self._plans[type_abri] = {v['fichier']: v for v in generateur.planifier()}
+        nom_fichier = os.path.basename(sku)
+        if not nom_fichier.endswith('.xlsx'):
+            nom_fichier += '.xlsx'
+        try:
+            return generateur, self._plans[type_abri][nom_fichier]
+        except KeyError:
+            raise KeyError(f"{sku} ne fait pas partie du catalogue {type_abri}") from None
+
+    def template(self, generateur):
+        """Template du générateur (voir registre_templates.py ; relu si le fichier a changé)"""
+        if self.registre is None:
+            from registre_templates import registre_par_defaut
+            self.registre = registre_par_defaut()
+        source_file = os.path.join(self.racine, generateur.source_file)
+        if not os.path.exists(source_file):
+            raise FileNotFoundError(source_file)
+        return self.registre.template(source_file)
+
+    def materialiser(self, sku):
+        """Octets du classeur .xlsx d'un SKU (ex. 'MET-F-7M-P-1000-PT')"""
+        generateur, variant = self.trouver(sku)
+        template = self.template(generateur)
+        if generateur.TYPE_ABRI not in self._empreintes:
+            # Calculée au chargement : décrit le code effectivement utilisé par ce processus
+            self._empreintes[generateur.TYPE_ABRI] = empreinte_code(generateur)
+        cle = (f'{template.empreinte[:16]}-{self._empreintes[generateur.TYPE_ABRI][:16]}',
+               variant['fichier'][:-len('.xlsx')])
+
+        contenu = self.cache_memoire.lire(cle)
+        if contenu is not None:
+            return contenu
+        if self.cache_disque is not None:
+            contenu = self.cache_disque.lire(cle)
+        if contenu is None:
+            base = template.base()
+            delta = base.enregistrer(generateur.configurer, variant)
+            contenu = base.materialiser(delta['cellules'], delta['defusions'])
+            if self.cache_disque is not None:
+                self.cache_disque.ecrire(cle, contenu)
+        self.cache_memoire.ecrire(cle, contenu)
+        return contenu
+
+
+_materialiseur = None
+
+
+def materialiser(sku):
+    """Octets du classeur d'un SKU, avec le cache par défaut (mémoire + .cache_variants/)"""
+    global _materialiseur
+    if _materialiseur is None:
+        _materialiseur = Materialiseur(cache_disque=CacheDisque(CACHE_DIR, TAILLE_MAX_DISQUE))
+    return _materialiseur.materialiser(sku)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construit des classeurs à la demande à partir de leur SKU")
+    parser.add_argument('skus', nargs='*', help="SKU (ex. MET-F-7M-P-1000-PT)")
+    parser.add_argument('--dossier', default='.', help="Dossier de destination (défaut : %(default)s)")
+    parser.add_argument('--cache', default=CACHE_DIR, help="Dossier du cache disque (défaut : %(default)s)")
+    parser.add_argument('--cache-max-mo', type=int, default=TAILLE_MAX_DISQUE // (1024 * 1024),
+                        help="Taille maximale du cache disque en Mo (défaut : %(default)s)")
+    parser.add_argument('--sans-cache', action='store_true', help="Ne pas utiliser le cache disque")
+    parser.add_argument('--vider-cache', action='store_true', help="Vider le cache disque")
+    args = parser.parse_args()
+
+    cache_disque = None if args.sans_cache else CacheDisque(args.cache, args.cache_max_mo * 1024 * 1024)
+    if args.vider_cache and cache_disque is not None:
+        cache_disque.vider()
+        print(f"🗑️  Cache {args.cache}/ vidé")
+    if not args.skus:
+        if not args.vider_cache:
+            parser.print_usage()
+        return
+
+    materialiseur = Materialiseur(cache_disque=cache_disque)
+    os.makedirs(args.dossier, exist_ok=True)
+    erreurs = 0
+    for sku in args.skus:
+        debut = time.perf_counter()
+        try:
+            contenu = materialiseur.materialiser(sku)
+        except (ValueError, KeyError) as e:
+            print(f"❌ {e.args[0]}")
+            erreurs += 1
+            continue
+        except FileNotFoundError as e:
+            print(f"❌ Erreur: {e.args[0]} n'existe pas !")
+            erreurs += 1
+            continue
+        nom_fichier = os.path.basename(sku)
+        if not nom_fichier.endswith('.xlsx'):
+            nom_fichier += '.xlsx'
+        chemin = os.path.join(args.dossier, nom_fichier)
+        with open(chemin, 'wb') as f:
+            f.write(contenu)
+        print(f"✅ {chemin} ({len(contenu) / 1024:.0f} Ko, {(time.perf_counter() - debut) * 1000:.1f} ms)")
+
+    if cache_disque is not None:
+        print(f"💾 Cache {args.cache}/ : {cache_disque.taille() / (1024 * 1024):.1f} Mo")
+    if erreurs:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,12 +5,17 @@ Fusionne tous les fichiers Excel générés en un seul fichier Excel
 avec des feuilles organisées par type d'abri
 """
 
+import io
 import openpyxl
 import os
 import json
 from datetime import datetime
 from collections import defaultdict
 
+from catalogue import lister_fichiers
+from generation_commune import ecrire_atomique
+from xlsx_brut import lire_sorties
+
 print("=" * 80)
 print("FUSION DE TOUS LES FICHIERS EXCEL")
 print("=" * 80)
@@ -19,15 +24,27 @@ print("=" * 80)
 resultats_dir = 'résultats'
 output_file = os.path.join(resultats_dir, 'TOUS_LES_RESULTATS.xlsx')
 
-# Trouver tous les fichiers Excel
-fichiers = []
-if os.path.exists(resultats_dir):
-    for root, dirs, files in os.walk(resultats_dir):
-        for file in files:
-            if file.endswith('.xlsx') and not file.startswith('~') and file != 'TOUS_LES_RESULTATS.xlsx':
-                fichiers.append(os.path.join(root, file))
-
-fichiers = sorted(fichiers)
+# Libellé de chaque type d'abri (nom du dossier dans résultats/)
+LIBELLES_TYPES = {
+    'bosquet_ferme': 'Bosquet Fermé',
+    'bosquet_ferme_compact': 'Bosquet Fermé Compact',
+    'bosquet_ouvert': 'Bosquet Ouvert',
+    'bosquet_ouvert_compact': 'Bosquet Ouvert Compact',
+    'domino_ferme': 'Domino Fermé',
+    'domino_ferme_compact': 'Domino Fermé Compact',
+    'domino_ouvert': 'Domino Ouvert',
+    'domino_ouvert_compact': 'Domino Ouvert Compact',
+    'metallique_ferme': 'Métallique Fermé',
+    'metallique_ferme_compact': 'Métallique Fermé Compact',
+    'metallique_ouvert': 'Métallique Ouvert',
+    'metallique_ouvert_compact': 'Métallique Ouvert Compact',
+    'neve_ferme': 'Neve Fermé',
+    'neve_ferme_compact': 'Neve Fermé Compact',
+    'neve_ouvert': 'Neve Ouvert',
+}
+
+# Trouver tous les fichiers Excel (d'après catalogue.json s'il existe)
+fichiers = lister_fichiers(resultats_dir)
 
 if not fichiers:
     print("❌ Aucun fichier Excel trouvé dans le dossier résultats")
@@ -38,60 +55,8 @@ print(f"\n📦 {len(fichiers)} fichiers trouvés\n")
 # Organiser les fichiers par type
 fichiers_par_type = defaultdict(list)
 
-for fichier in fichiers:
-    chemin_relatif = os.path.relpath(fichier, resultats_dir)
-    dossier = os.path.dirname(chemin_relatif)
-    
-    # Déterminer le type depuis le chemin
-    if 'bosquet_ferme' in dossier:
-        type_abri = 'Bosquet Fermé'
-        sous_type = 'ferme'
-    elif 'bosquet_ferme_compact' in dossier:
-        type_abri = 'Bosquet Fermé Compact'
-        sous_type = 'ferme_compact'
-    elif 'bosquet_ouvert' in dossier:
-        type_abri = 'Bosquet Ouvert'
-        sous_type = 'ouvert'
-    elif 'bosquet_ouvert_compact' in dossier:
-        type_abri = 'Bosquet Ouvert Compact'
-        sous_type = 'ouvert_compact'
-    elif 'domino_ferme' in dossier:
-        type_abri = 'Domino Fermé'
-        sous_type = 'ferme'
-    elif 'domino_ferme_compact' in dossier:
-        type_abri = 'Domino Fermé Compact'
-        sous_type = 'ferme_compact'
-    elif 'domino_ouvert' in dossier:
-        type_abri = 'Domino Ouvert'
-        sous_type = 'ouvert'
-    elif 'domino_ouvert_compact' in dossier:
-        type_abri = 'Domino Ouvert Compact'
-        sous_type = 'ouvert_compact'
-    elif 'metallique_ferme' in dossier:
-        type_abri = 'Métallique Fermé'
-        sous_type = 'ferme'
-    elif 'metallique_ferme_compact' in dossier:
-        type_abri = 'Métallique Fermé Compact'
-        sous_type = 'ferme_compact'
-    elif 'metallique_ouvert' in dossier:
-        type_abri = 'Métallique Ouvert'
-        sous_type = 'ouvert'
-    elif 'metallique_ouvert_compact' in dossier:
-        type_abri = 'Métallique Ouvert Compact'
-        sous_type = 'ouvert_compact'
-    elif 'neve_ferme' in dossier:
-        type_abri = 'Neve Fermé'
-        sous_type = 'ferme'
-    elif 'neve_ferme_compact' in dossier:
-        type_abri = 'Neve Fermé Compact'
-        sous_type = 'ferme_compact'
-    elif 'neve_ouvert' in dossier:
-        type_abri = 'Neve Ouvert'
-        sous_type = 'ouvert'
-    else:
-        type_abri = 'Autre'
-        sous_type = 'autre'
-    
+for dossier, fichier in fichiers:
+    type_abri = LIBELLES_TYPES.get(dossier, 'Autre')
     fichiers_par_type[type_abri].append(fichier)
 
 print(f"📊 Types d'abris trouvés: {len(fichiers_par_type)}\n")
@@ -162,20 +127,17 @@ for type_abri in sorted(fichiers_par_type.keys()):
     # Traiter chaque fichier de ce type
     for fichier in sorted(fichiers_par_type[type_abri]):
         try:
-            wb = openpyxl.load_workbook(fichier, data_only=True)
-            
-            # Lire les données
-            ws_configure = wb['Configure']
-            ws_prc = wb['PRC import']
+            # Lire les données (valeurs en cache de Configure et PRC import seulement)
+            sorties = lire_sorties(fichier, composants=False)
             
-            largeur = ws_configure.cell(1, 2).value
-            profondeur = ws_configure.cell(2, 1).value
-            treatment = ws_configure.cell(16, 2).value
-            version = ws_configure.cell(17, 2).value
+            largeur = sorties['largeur']
+            profondeur = sorties['profondeur']
+            treatment = sorties['treatment']
+            version = sorties['version']
             
-            price_brut = ws_prc.cell(7, 8).value
-            price_remise = ws_prc.cell(8, 8).value
-            price_net = ws_prc.cell(9, 8).value
+            price_brut = sorties['prix_brut']
+            price_remise = sorties['remise']
+            price_net = sorties['prix_net']
             
             fichier_basename = os.path.basename(fichier)
             chemin_relatif = os.path.relpath(fichier, resultats_dir)
@@ -243,7 +205,9 @@ ws_resume.auto_filter.ref = ws_resume.dimensions
 
 # Sauvegarder le fichier
 print(f"\n💾 Sauvegarde du fichier fusionné...")
-wb_final.save(output_file)
+contenu = io.BytesIO()
+wb_final.save(contenu)
+ecrire_atomique(output_file, contenu.getvalue())
 
 print(f"\n" + "=" * 80)
 print("✅ FUSION TERMINÉE")
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pack des résultats : le template une fois + un delta par variant
+=================================================================
+
+Les ~1100 classeurs de résultats/ (~105 Mo) sont des copies du fichier de base
+qui ne diffèrent que par quelques cellules de la feuille Configure. Le pack
+(résultats.pack, ~100 Ko par fichier de base + ~1 Ko par variant) contient :
+- bases/<sha256>.xlsx : chaque template, préparé une seule fois (xlsx_brut.preparer_base)
+- index.json : pour chaque SKU, son type, ses paramètres, le delta de la feuille
+  Configure (cellules modifiées + défusions) et, si elles ont déjà été extraites,
+  ses sorties (prix de resultats_tous.json, composants de composant/)
+
+Un classeur est reconstruit à la demande en quelques millisecondes : seule la
+feuille Configure est réécrite, les autres parties sont recopiées telles quelles.
+
+Utilisation :
+    python pack_resultats.py creer                      # tous les types
+    python pack_resultats.py creer --types carport --verifier 5
+    python pack_resultats.py extraire MET-F-7M-P-1000-PT --dossier /tmp
+    python pack_resultats.py deballer                   # recrée résultats/<type>/
+    python pack_resultats.py info
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+from generation_commune import (RESULTATS_DIR, TYPES_ABRIS, SortieDossier, charger_generateur,
+                                construire_classeur)
+from registre_templates import registre_par_defaut
+from stockage_composants import charger_composants
+from xlsx_brut import Base
+
+FICHIER_PACK = 'résultats.pack'
+VERSION_PACK = 1
+
+# Sorties déjà extraites (voir extract_prices_and_components.py)
+RESULTATS_JSON = 'resultats_tous.json'
+COMPOSANT_DIR = 'composant'
+
+
+def sku_de_fichier(nom_fichier):
+    """'MET-F-7M-P-1000-PT.xlsx' -> 'MET-F-7M-P-1000-PT'"""
+    nom = os.path.basename(nom_fichier)
+    return nom[:-len('.xlsx')] if nom.endswith('.xlsx') else nom
+
+
+def charger_sorties(resultats_json=RESULTATS_JSON, composant_dir=COMPOSANT_DIR):
+    """Prix et composants déjà extraits, par SKU : {sku: {...}}"""
+    sorties = {}
+    if os.path.exists(resultats_json):
+        with open(resultats_json, 'r', encoding='utf-8') as f:
+            for resultat in json.load(f).get('resultats', []):
+                sorties.setdefault(sku_de_fichier(resultat['fichier']), {}).update({
+                    'prix_avant_reduction': resultat.get('prix_avant_reduction'),
+                    'prix_apres_reduction': resultat.get('prix_apres_reduction'),
+                    'date_extraction': resultat.get('date_extraction'),
+                })
+    for sku, composants in charger_composants(composant_dir).items():
+        if composants:
+            sorties.setdefault(sku, {})['composants'] = composants
+    return sorties
+
+
+def creer_pack(destination=FICHIER_PACK, types_abris=TYPES_ABRIS, avec_sorties=True):
+    """
+    Crée le pack à partir des scripts generate_*.py (planifier + configurer),
+    sans construire aucun classeur. Retourne l'index écrit.
+    """
+    bases = {}        # sha256 -> octets de la base préparée
+    par_template = {}  # fichier de base -> (sha256 de la base préparée, Base)
+    variants = {}
+    sorties = charger_sorties() if avec_sorties else {}
+
+    for type_abri in types_abris:
+        generateur = charger_generateur(type_abri)
+        if not os.path.exists(generateur.source_file):
+            print(f"⚠️  {type_abri} : {generateur.source_file} n'existe pas, type ignoré")
+            continue
+
+        if generateur.source_file not in par_template:
+            template = registre_par_defaut().template(generateur.source_file)
+            contenu = template.contenu_base()
+            empreinte = hashlib.sha256(contenu).hexdigest()
+            bases[empreinte] = contenu
+            par_template[generateur.source_file] = (empreinte, template.base())
+        empreinte, base = par_template[generateur.source_file]
+
+        plan = list(generateur.planifier())
+        for variant in plan:
+            sku = sku_de_fichier(variant['fichier'])
+            if sku in variants:
+                raise ValueError(f"SKU en double : {sku} ({variants[sku]['type']} et {type_abri})")
+            delta = base.enregistrer(generateur.configurer, variant)
+            variants[sku] = {'type': type_abri, 'base': empreinte, 'parametres': variant, **delta}
+            if sku in sorties:
+                variants[sku]['sorties'] = sorties[sku]
+        print(f"   ✅ {type_abri} : {len(plan)} variants")
+
+    index = {
+        'version': VERSION_PACK,
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'bases': {empreinte: {'template': chemin} for chemin, (empreinte, _) in par_template.items()},
+        'variants': variants,
+    }
+
+    # Écriture dans un fichier temporaire : un pack interrompu ne remplace pas l'ancien
+    temporaire = destination + '.tmp'
+    with zipfile.ZipFile(temporaire, 'w', zipfile.ZIP_DEFLATED) as z:
+        for empreinte, contenu in bases.items():
+            # Déjà compressé (xlsx)
+            z.writestr(f'bases/{empreinte}.xlsx', contenu, compress_type=zipfile.ZIP_STORED)
+        z.writestr('index.json', json.dumps(index, ensure_ascii=False, separators=(',', ':')))
+    os.replace(temporaire, destination)
+    return index
+
+
+class PackResultats:
+    """Lecture d'un pack : liste des SKU, reconstruction d'un classeur, sorties"""
+
+    def __init__(self, chemin=FICHIER_PACK):
+        self.chemin = chemin
+        self.zip = zipfile.ZipFile(chemin)
+        self.index = json.loads(self.zip.read('index.json'))
+        if self.index.get('version') != VERSION_PACK:
+            raise ValueError(f"{chemin} : version de pack {self.index.get('version')} non prise en charge")
+        self._bases = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def fermer(self):
+        self.zip.close()
+
+    def skus(self, type_abri=None):
+        return [sku for sku, entree in self.index['variants'].items()
+                if type_abri is None or entree['type'] == type_abri]
+
+    def variant(self, sku):
+        """Entrée de l'index (type, base, parametres, cellules, defusions, sorties)"""
+        try:
+            return self.index['variants'][sku_de_fichier(sku)]
+        except KeyError:
+            raise KeyError(f"SKU inconnu dans {self.chemin} : {sku}") from None
+
+    def base(self, empreinte):
+        if empreinte not in self._bases:
+            self._bases[empreinte] = Base(self.zip.read(f'bases/{empreinte}.xlsx'))
+        return self._bases[empreinte]
+
+    def materialiser(self, sku):
+        """Octets du classeur .xlsx du SKU"""
+        entree = self.variant(sku)
+        return self.base(entree['base']).materialiser(entree['cellules'], entree['defusions'])
+
+    def sorties(self, sku):
+        """Prix et composants déjà extraits (None s'ils ne l'ont pas été)"""
+        return self.variant(sku).get('sorties')
+
+
+def deballer(pack, resultats_dir=RESULTATS_DIR, types_abris=None):
+    """Recrée résultats/<type>/<SKU>.xlsx depuis le pack ; retourne le nombre de fichiers"""
+    sortie = SortieDossier(resultats_dir, nettoyer=False)
+    ouverts = set()
+    total = 0
+    for sku in pack.skus():
+        entree = pack.variant(sku)
+        type_abri = entree['type']
+        if types_abris and type_abri not in types_abris:
+            continue
+        if type_abri not in ouverts:
+            sortie.ouvrir_type(type_abri)
+            ouverts.add(type_abri)
+        sortie.ecrire(type_abri, entree['parametres']['fichier'], pack.materialiser(sku))
+        total += 1
+    sortie.fermer()
+    return total
+
+
+def verifier_pack(pack, echantillon=3):
+    """
+    Compare des SKU tirés au hasard avec le classeur construit par openpyxl
+    (generation_commune.construire_classeur) : mêmes feuilles, noms définis,
+    valeurs et formules, et mêmes plages fusionnées dans Configure.
+    Retourne la liste des différences (vide si identique).
+    """
+    import openpyxl
+    from alleger_template import verifier_template
+
+    differences = []
+    skus = pack.skus()
+    for sku in random.sample(skus, min(echantillon, len(skus))):
+        entree = pack.variant(sku)
+        generateur = charger_generateur(entree['type'])
+        template = registre_par_defaut().template(generateur.source_file)
+        attendu = construire_classeur(template.contenu, generateur.configurer, entree['parametres'])
+        obtenu = pack.materialiser(sku)
+
+        for difference in verifier_template(io.BytesIO(attendu), io.BytesIO(obtenu)):
+            differences.append(f"{sku} : {difference}")
+        fusions = [sorted(str(plage) for plage in openpyxl.load_workbook(io.BytesIO(contenu))
+                          ['Configure'].merged_cells.ranges) for contenu in (attendu, obtenu)]
+        if fusions[0] != fusions[1]:
+            differences.append(f"{sku} : plages fusionnées {fusions[0]} ≠ {fusions[1]}")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack des résultats : template + deltas par variant")
+    parser.add_argument('--pack', default=FICHIER_PACK, help="Fichier pack (défaut : %(default)s)")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+
+    creer = commandes.add_parser('creer', help="Crée le pack depuis les scripts generate_*.py")
+    creer.add_argument('--types', nargs='+', choices=TYPES_ABRIS, default=TYPES_ABRIS)
+    creer.add_argument('--sans-sorties', action='store_true',
+                       help="Ne pas inclure les prix et composants déjà extraits")
+    creer.add_argument('--verifier', type=int, default=0, metavar='N',
+                       help="Comparer N SKU avec les classeurs construits par openpyxl")
+
+    extraire = commandes.add_parser('extraire', help="Reconstruit des classeurs à partir de leur SKU")
+    extraire.add_argument('skus', nargs='+')
+    extraire.add_argument('--dossier', default='.', help="Dossier de destination (défaut : %(default)s)")
+
+    deballer_cmd = commandes.add_parser('deballer', help="Recrée résultats/<type>/ depuis le pack")
+    deballer_cmd.add_argument('--types', nargs='+', choices=TYPES_ABRIS)
+    deballer_cmd.add_argument('--dossier', default=RESULTATS_DIR)
+
+    commandes.add_parser('info', help="Contenu du pack")
+    args = parser.parse_args()
+
+    if args.commande == 'creer':
+        print("=" * 80)
+        print("CRÉATION DU PACK DES RÉSULTATS")
+        print("=" * 80)
+        index = creer_pack(args.pack, args.types, avec_sorties=not args.sans_sorties)
+        avec_sorties = sum(1 for entree in index['variants'].values() if 'sorties' in entree)
+        print(f"\n📦 {args.pack} : {len(index['variants'])} variants, {len(index['bases'])} base(s), "
+              f"{avec_sorties} avec prix/composants, {os.path.getsize(args.pack) / 1024:.0f} Ko")
+        if args.verifier:
+            print(f"\n🔍 Vérification de {args.verifier} SKU...")
+            with PackResultats(args.pack) as pack:
+                differences = verifier_pack(pack, args.verifier)
+            if differences:
+                print("❌ Les classeurs reconstruits diffèrent :")
+                for difference in differences:
+                    print(f"   - {difference}")
+                sys.exit(1)
+            print("   ✅ Valeurs, formules et fusions identiques")
+        return
+
+    if not os.path.exists(args.pack):
+        print(f"❌ Erreur: {args.pack} n'existe pas ! (python pack_resultats.py creer)")
+        sys.exit(1)
+
+    with PackResultats(args.pack) as pack:
+        if args.commande == 'extraire':
+            os.makedirs(args.dossier, exist_ok=True)
+            for sku in args.skus:
+                debut = time.perf_counter()
+                try:
+                    contenu = pack.materialiser(sku)
+                except KeyError as e:
+                    print(f"❌ {e.args[0]}")
+                    continue
+                chemin = os.path.join(args.dossier, pack.variant(sku)['parametres']['fichier'])
+                with open(chemin, 'wb') as f:
+                    f.write(contenu)
+                print(f"✅ {chemin} ({(time.perf_counter() - debut) * 1000:.1f} ms)")
+
+        elif args.commande == 'deballer':
+            debut = time.perf_counter()
+            total = deballer(pack, args.dossier, args.types)
+            print(f"✅ {total} fichiers recréés dans {args.dossier}/ en {time.perf_counter() - debut:.1f} s")
+
+        elif args.commande == 'info':
+            print(f"📦 {args.pack} ({os.path.getsize(args.pack) / 1024:.0f} Ko) — créé le {pack.index['date']}")
+            for empreinte, infos in pack.index['bases'].items():
+                print(f"   Base {empreinte[:12]} : {infos['template']}")
+            par_type = {}
+            for entree in pack.index['variants'].values():
+                par_type[entree['type']] = par_type.get(entree['type'], 0) + 1
+            for type_abri, nombre in par_type.items():
+                print(f"   {type_abri}: {nombre} variants")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planification d'une génération (dry-run), sans aucune I/O de classeur
+======================================================================
+
+Développe le plan de chaque script generate_*.py (planifier(), sans rien
+construire) et affiche, avant de lancer une génération :
+- le nombre de fichiers par type et au total
+- les doublons : variantes fusionnées, SKU planifiés deux fois (un fichier
+  en écraserait un autre), SKU présents dans plusieurs types
+- les fichiers de résultats/<type>/ qui ne font plus partie du plan
+- une estimation de la durée et de la taille sur disque
+
+Estimations :
+- durée : durée par classeur mesurée à la dernière génération du type
+  (metriques.json) ; inconnue si le type n'a jamais été généré
+- taille : taille moyenne des .xlsx existants, sinon taille du template
+
+Utilisation :
+    python planifier_generation.py
+    python planifier_generation.py --types metallique_ferme neve_ouvert
+    python planifier_generation.py --json      # pour dimensionner un job ou un timeout
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from generation_commune import (FICHIER_METRIQUES, RESULTATS_DIR, TYPES_ABRIS, charger_generateur,
+                                choisir_template)
+
+
+def _duree_par_fichier(dossier):
+    """Secondes par classeur mesurées à la dernière génération (metriques.json), ou None"""
+    try:
+        with open(os.path.join(dossier, FICHIER_METRIQUES), 'r', encoding='utf-8') as f:
+            metriques = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # variants : classeurs construits (hors reprise), ceux dont duree_secondes mesure la durée
+    if metriques.get('duree_secondes') and metriques.get('variants'):
+        return metriques['duree_secondes'] / metriques['variants']
+    return None
+
+
+def planifier_type(type_abri, resultats_dir=None):
+    """Plan d'un type d'abri : nombre de fichiers, doublons, estimations"""
+    generateur = charger_generateur(type_abri)
+    variants = list(generateur.planifier())
+    dossier = os.path.join(resultats_dir or generateur.resultats_dir, type_abri)
+
+    noms = [v['fichier'] for v in variants]
+    vus = set()
+    doublons = sorted({nom for nom in noms if nom in vus or vus.add(nom)})
+
+    existants = []
+    if os.path.isdir(dossier):
+        existants = [os.path.join(dossier, nom) for nom in os.listdir(dossier) if nom.endswith('.xlsx')]
+    obsoletes = sorted(os.path.basename(chemin) for chemin in existants
+                       if os.path.basename(chemin) not in vus)
+
+    secondes = _duree_par_fichier(dossier)
+    if existants:
+        taille_fichier = sum(os.path.getsize(chemin) for chemin in existants) / len(existants)
+        source_taille = f'{len(existants)} fichiers existants'
+    elif os.path.exists(generateur.source_file):
+        taille_fichier = os.path.getsize(choisir_template(generateur.source_file))
+        source_taille = 'taille du template'
+    else:
+        taille_fichier = 0
+        source_taille = f'{generateur.source_file} introuvable'
+
+    fichiers = len(set(noms))
+    return {
+        'type': type_abri,
+        'fichiers': fichiers,
+        'variants_planifies': len(variants),
+        'doublons': doublons,
+        'variantes_fusionnees': [nom for nom, _ in getattr(generateur, 'variantes_fusionnees', [])],
+        'obsoletes': obsoletes,
+        'source_present': os.path.exists(generateur.source_file),
+        'secondes_estimees': round(fichiers * secondes, 1) if secondes is not None else None,
+        'source_duree': FICHIER_METRIQUES if secondes is not None else 'inconnue',
+        'octets_estimes': int(fichiers * taille_fichier),
+        'source_taille': source_taille,
+        'skus': noms,
+    }
+
+
+def planifier_generation(types_abris=TYPES_ABRIS, resultats_dir=None):
+    """Plan de tous les types ; les SKU présents dans plusieurs types sont signalés"""
+    plans = [planifier_type(type_abri, resultats_dir) for type_abri in types_abris]
+    types_par_sku = {}
+    for plan in plans:
+        for sku in set(plan['skus']):
+            types_par_sku.setdefault(sku, []).append(plan['type'])
+    return {
+        'types': plans,
+        'total_fichiers': sum(plan['fichiers'] for plan in plans),
+        # Inconnue dès qu'un type n'a pas de durée mesurée
+        'secondes_estimees': None if any(plan['secondes_estimees'] is None for plan in plans)
+        else round(sum(plan['secondes_estimees'] for plan in plans), 1),
+        'octets_estimes': sum(plan['octets_estimes'] for plan in plans),
+        'skus_multi_types': {sku: types for sku, types in sorted(types_par_sku.items()) if len(types) > 1},
+    }
+
+
+def _duree(secondes):
+    if secondes is None:
+        return 'inconnue'
+    minutes, secondes = divmod(int(round(secondes)), 60)
+    return f'{minutes} min {secondes:02d} s' if minutes else f'{secondes} s'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Planifie une génération sans construire de classeur")
+    parser.add_argument('--types', nargs='+', choices=TYPES_ABRIS, default=TYPES_ABRIS)
+    parser.add_argument('--resultats', default=RESULTATS_DIR, help="Dossier des résultats (défaut : %(default)s)")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON (sans la liste des SKU)")
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    plan = planifier_generation(args.types, args.resultats)
+
+    if args.json:
+        for plan_type in plan['types']:
+            del plan_type['skus']
+        plan['duree_planification'] = round(time.perf_counter() - debut, 3)
+        json.dump(plan, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+
+    print("=" * 80)
+    print("PLANIFICATION DE LA GÉNÉRATION (aucun fichier écrit)")
+    print("=" * 80)
+    print(f"\n{'Type':<28}{'Fichiers':>9}{'Durée':>14}{'Taille':>11}   Remarques")
+    print("-" * 80)
+    for p in plan['types']:
+        remarques = []
+        if not p['source_present']:
+            remarques.append("fichier de base absent")
+        if p['variantes_fusionnees']:
+            remarques.append(f"{len(p['variantes_fusionnees'])} variante(s) fusionnée(s)")
+        if p['doublons']:
+            remarques.append(f"{len(p['doublons'])} SKU en double")
+        if p['obsoletes']:
+            remarques.append(f"{len(p['obsoletes'])} fichier(s) obsolète(s)")
+        print(f"{p['type']:<28}{p['fichiers']:>9}{_duree(p['secondes_estimees']):>14}"
+              f"{p['octets_estimes'] / (1024 * 1024):>8.1f} Mo   {', '.join(remarques)}")
+    print("-" * 80)
+    print(f"{'TOTAL':<28}{plan['total_fichiers']:>9}{_duree(plan['secondes_estimees']):>14}"
+          f"{plan['octets_estimes'] / (1024 * 1024):>8.1f} Mo")
+
+    for p in plan['types']:
+        if p['doublons']:
+            print(f"\n⚠️  {p['type']} : SKU planifiés plusieurs fois (un fichier en écrase un autre) :")
+            for sku in p['doublons']:
+                print(f"   - {sku}")
+        if p['obsoletes']:
+            print(f"\n🗑️  {p['type']} : {len(p['obsoletes'])} fichier(s) existant(s) hors plan, "
+                  f"supprimés à la prochaine génération")
+    if plan['skus_multi_types']:
+        print(f"\n⚠️  SKU présents dans plusieurs types :")
+        for sku, types in plan['skus_multi_types'].items():
+            print(f"   - {sku} : {', '.join(types)}")
+
+    print(f"\n⏱️  Planification : {(time.perf_counter() - debut) * 1000:.0f} ms")
+    inconnues = [p['type'] for p in plan['types'] if p['secondes_estimees'] is None]
+    print(f"   Estimations : durée d'après {FICHIER_METRIQUES} de la dernière génération")
+    if inconnues:
+        print(f"   Durée inconnue (aucune génération mesurée) : {', '.join(inconnues)}")
+
+
+if __name__ == '__main__':
+    main()
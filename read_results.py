@@ -4,26 +4,22 @@
 Lit les résultats de tous les fichiers Excel dans le dossier résultats
 """
 
-import openpyxl
 import json
 import os
 import glob
 from datetime import datetime
 
+from catalogue import Catalogue, lister_fichiers
+from xlsx_brut import lire_sorties
+
 print("=" * 80)
 print("LECTURE DES RÉSULTATS")
 print("=" * 80)
 
-# Trouver tous les fichiers Excel dans le dossier résultats
+# Trouver tous les fichiers Excel dans le dossier résultats (d'après catalogue.json s'il existe)
 resultats_dir = 'résultats'
-fichiers = []
-if os.path.exists(resultats_dir):
-    for root, dirs, files in os.walk(resultats_dir):
-        for file in files:
-            if file.endswith('.xlsx') and not file.startswith('~'):
-                fichiers.append(os.path.join(root, file))
-
-fichiers = sorted(fichiers)
+catalogue = Catalogue.charger(resultats_dir)
+fichiers = [chemin for _, chemin in lister_fichiers(resultats_dir)]
 
 if not fichiers:
     print("❌ Aucun fichier Excel trouvé dans le dossier résultats")
@@ -37,35 +33,37 @@ for fichier in fichiers:
     print(f"📄 Lecture de {fichier}...")
     
     try:
-        wb = openpyxl.load_workbook(fichier, data_only=True)
-        ws_configure = wb['Configure']
-        ws_prc = wb['PRC import']
+        # Valeurs en cache des seules feuilles Configure et PRC import
+        sorties = lire_sorties(fichier, composants=False)
         
         # Lire la configuration
-        largeur = ws_configure.cell(1, 2).value
-        profondeur = ws_configure.cell(2, 1).value
-        treatment = ws_configure.cell(16, 2).value  # B16
-        version = ws_configure.cell(17, 2).value  # B17
+        largeur = sorties['largeur']
+        profondeur = sorties['profondeur']
+        treatment = sorties['treatment']  # B16
+        version = sorties['version']  # B17
         
         # Lire le prix
-        price_brut = ws_prc.cell(7, 8).value  # H7
-        price_remise = ws_prc.cell(8, 8).value  # H8
-        price_net = ws_prc.cell(9, 8).value  # H9
+        price_brut = sorties['prix_brut']  # H7
+        price_remise = sorties['remise']  # H8
+        price_net = sorties['prix_net']  # H9
         
-        # Déterminer le type (ouvert/fermé) depuis le nom du fichier
+        # Déterminer le type (ouvert/fermé) et la variante : catalogue, sinon nom du fichier
         fichier_basename = os.path.basename(fichier)
+        entree = catalogue.par_chemin(fichier) if catalogue else None
+        nom = entree['type'] if entree is not None else fichier_basename
         type_abri = 'inconnu'
-        if 'ouvert' in fichier_basename:
+        if 'ouvert' in nom:
             type_abri = 'ouvert'
-        elif 'ferme' in fichier_basename:
+        elif 'ferme' in nom:
             type_abri = 'ferme'
-        
-        # Déterminer la variante
-        variante = 'inconnu'
-        if 'normal' in fichier_basename:
-            variante = 'normal'
-        elif 'bosque' in fichier_basename:
-            variante = 'bosque'
+        if entree is not None:
+            variante = entree['parametres'].get('variante', 'inconnu')
+        else:
+            variante = 'inconnu'
+            if 'normal' in fichier_basename:
+                variante = 'normal'
+            elif 'bosque' in fichier_basename:
+                variante = 'bosque'
         
         resultat = {
             'fichier': fichier_basename,
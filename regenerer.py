@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Régénération ciblée : seuls les SKU correspondant aux filtres sont réécrits
+===========================================================================
+
+Les scripts generate_*.py vident résultats/<type>/ puis régénèrent tout le type.
+Quand seule une partie des prix change (ex. le thermolaqué de la version PLUS),
+ce script régénère uniquement les variants qui correspondent aux filtres ; les
+autres fichiers et les resume.json ne sont pas touchés.
+
+Filtres (combinables, chacun accepte plusieurs valeurs séparées par des virgules) :
+- --types : types d'abris (défaut : tous)
+- --largeur / --width : largeurs totales en m (ex. 6,7)
+- --profondeur / --depth : profondeurs totales en m (ex. 4,4.5)
+- --version : Standard / PLUS (ou N / P)
+- --traitement / --treatment : Galvanized / "Powder coated" (ou G / PT)
+- --sku : SKU explicites (ex. MET-F-7M-P-1000-PT)
+
+Utilisation :
+    python regenerer.py --types metallique_ferme --largeur 6,7 --version PLUS --traitement "Powder coated"
+    python regenerer.py --version P --traitement PT --lister     # affiche les SKU sans rien écrire
+    python regenerer.py --sku MET-F-7M-P-1000-PT BOS-F-4M-N-400-G
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from generation_commune import (RESULTATS_DIR, TYPES_ABRIS, SortieDossier, ajouter_options_pipeline,
+                                charger_generateur, generer_type, memoire_max_options)
+
+VERSIONS = {'standard': 'Standard', 'n': 'Standard', 'normal': 'Standard',
+            'plus': 'PLUS', 'p': 'PLUS'}
+TRAITEMENTS = {'galvanized': 'Galvanized', 'g': 'Galvanized', 'galvanise': 'Galvanized',
+               'powder coated': 'Powder coated', 'pt': 'Powder coated', 'thermolaque': 'Powder coated'}
+
+
+def _liste(texte):
+    """'6, 7' -> ['6', '7']"""
+    return [valeur.strip() for valeur in texte.split(',') if valeur.strip()]
+
+
+def _nombres(texte):
+    try:
+        return {float(valeur) for valeur in _liste(texte)}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"nombres attendus (ex. 6,7) : {texte}") from None
+
+
+def _valeurs(correspondances):
+    def analyser(texte):
+        valeurs = set()
+        for valeur in _liste(texte):
+            cle = valeur.lower().replace('é', 'e')
+            if cle not in correspondances:
+                choix = ', '.join(sorted(set(correspondances.values())))
+                raise argparse.ArgumentTypeError(f"valeur inconnue : {valeur} (choix : {choix})")
+            valeurs.add(correspondances[cle])
+        return valeurs
+    return analyser
+
+
+def filtre_variants(largeurs=None, profondeurs=None, versions=None, traitements=None, skus=None):
+    """Prédicat variant -> bool ; un critère à None n'est pas filtré"""
+    noms = None
+    if skus is not None:
+        noms = {os.path.basename(sku) if sku.endswith('.xlsx') else f'{os.path.basename(sku)}.xlsx'
+                for sku in skus}
+
+    def filtre(variant):
+        return ((largeurs is None or float(variant['largeur_totale']) in largeurs)
+                and (profondeurs is None or float(variant['profondeur_totale']) in profondeurs)
+                and (versions is None or variant['version'] in versions)
+                and (traitements is None or variant['treatment'] in traitements)
+                and (noms is None or variant['fichier'] in noms))
+    return filtre
+
+
+def selectionner(types_abris, filtre):
+    """[(generateur, variants retenus)] pour les types ayant au moins un variant retenu"""
+    selection = []
+    for type_abri in types_abris:
+        generateur = charger_generateur(type_abri)
+        variants = [variant for variant in generateur.planifier() if filtre(variant)]
+        if variants:
+            selection.append((generateur, variants))
+    return selection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Régénère uniquement les SKU correspondant aux filtres")
+    parser.add_argument('--types', '--type', nargs='+', choices=TYPES_ABRIS, default=TYPES_ABRIS)
+    parser.add_argument('--largeur', '--width', type=_nombres, help="Largeurs totales en m (ex. 6,7)")
+    parser.add_argument('--profondeur', '--depth', type=_nombres, help="Profondeurs totales en m (ex. 4,4.5)")
+    parser.add_argument('--version', type=_valeurs(VERSIONS), help="Standard, PLUS (ou N, P)")
+    parser.add_argument('--traitement', '--treatment', type=_valeurs(TRAITEMENTS),
+                        help='Galvanized, "Powder coated" (ou G, PT)')
+    parser.add_argument('--sku', nargs='+', help="SKU explicites (ex. MET-F-7M-P-1000-PT)")
+    parser.add_argument('--resultats', default=RESULTATS_DIR, help="Dossier des résultats (défaut : %(default)s)")
+    parser.add_argument('--lister', action='store_true', help="Afficher les SKU retenus sans rien écrire")
+    ajouter_options_pipeline(parser)
+    args = parser.parse_args()
+
+    if not any([args.largeur, args.profondeur, args.version, args.traitement, args.sku]) \
+            and args.types == TYPES_ABRIS:
+        parser.error("aucun filtre : utilisez les scripts generate_*.py pour tout régénérer")
+
+    filtre = filtre_variants(args.largeur, args.profondeur, args.version, args.traitement, args.sku)
+    selection = selectionner(args.types, filtre)
+    total = sum(len(variants) for _, variants in selection)
+    if not total:
+        print("❌ Aucun SKU ne correspond aux filtres")
+        sys.exit(1)
+
+    if args.lister:
+        for generateur, variants in selection:
+            print(f"\n📁 {generateur.TYPE_ABRI} ({len(variants)})")
+            for variant in variants:
+                print(f"   - {variant['fichier'][:-len('.xlsx')]}")
+        print(f"\n📊 {total} SKU retenus")
+        return
+
+    debut = time.perf_counter()
+    memoire_max = memoire_max_options(args)
+    erreurs = []
+    for generateur, _ in selection:
+        try:
+            generer_type(generateur, SortieDossier(args.resultats, nettoyer=False), filtre=filtre,
+                         memoire_max=memoire_max, taille_file=args.file)
+        except FileNotFoundError:
+            erreurs.append(generateur.TYPE_ABRI)
+
+    print(f"\n📊 {total} SKU régénérés dans {args.resultats}/ en {time.perf_counter() - debut:.1f} s "
+          f"({len(selection)} type(s))")
+    if erreurs:
+        print(f"❌ Fichier de base absent : {', '.join(erreurs)}")
+        sys.exit(1)
+    print(f"\n💡 Recalculez ensuite ces fichiers avec calculateur_prix_camflex.py")
+
+
+if __name__ == '__main__':
+    main()
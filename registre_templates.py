@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registre des templates de prix, indexés par empreinte de contenu
+=================================================================
+
+Plusieurs fichiers de base coexistent : nepastoucher.xlsx pour 14 scripts,
+fichier_de_prix_de_base.xlsx pour generate_carport.py, et un fichier par requête
+envoyé à l'API web. Pour chacun, le registre garde :
+- le template allégé et vérifié (alleger_template.py), prêt à être copié
+- la base préparée et découpée en parties (xlsx_brut.Base), prête à recevoir
+  des deltas (materialisation.py, pack_resultats.py)
+
+Les templates sont indexés par SHA-256 du fichier de base : un fichier déjà vu,
+quel que soit son chemin ou sa date de modification, n'est ni relu par openpyxl,
+ni allégé, ni vérifié une seconde fois. Deux niveaux de cache :
+- mémoire : LRU des NOMBRE_MAX_MEMOIRE derniers templates
+- disque : .cache_templates/<sha256>-<code>/ (template.xlsx, base.xlsx), LRU borné
+  en taille ; <code> : empreinte_preparation(), une correction d'alleger_template.py
+  ou de xlsx_brut.py ne relit donc jamais les templates préparés avant
+
+Le template allégé écrit à côté du fichier de base par alleger_template.py est
+utilisé directement s'il a été créé à partir du même contenu (source_sha256) et
+par le même code (code_sha256).
+
+Utilisation :
+    python registre_templates.py                           # templates des scripts generate_*.py
+    python registre_templates.py "fichier de base/client.xlsx"
+    python registre_templates.py --vider-cache
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from caches import CacheDisque
+from xlsx_brut import Base, preparer_base
+
+CACHE_DIR = '.cache_templates'
+NOMBRE_MAX_MEMOIRE = 8                  # templates gardés en mémoire
+TAILLE_MAX_DISQUE = 256 * 1024 * 1024   # 256 Mo
+# Modules dont dépendent le template allégé et la base préparée
+MODULES_PREPARATION = ('alleger_template.py', 'xlsx_brut.py')
+
+
+def empreinte_preparation():
+    """Empreinte du code qui allège et prépare les templates (MODULES_PREPARATION, version d'openpyxl)"""
+    import openpyxl
+    dossier = os.path.dirname(os.path.abspath(__file__))
+    empreinte = hashlib.sha256()
+    for module in MODULES_PREPARATION:
+        with open(os.path.join(dossier, module), 'rb') as f:
+            empreinte.update(hashlib.sha256(f.read()).hexdigest().encode('ascii'))
+    empreinte.update(openpyxl.__version__.encode('ascii'))
+    return empreinte.hexdigest()
+
+
+class Template:
+    """
+    Template d'un fichier de base.
+    empreinte : SHA-256 du fichier de base ; contenu : octets à copier pour chaque
+    variant (template allégé, ou fichier de base si l'allègement a échoué) ;
+    origine : d'où vient contenu (à côté du fichier de base, cache disque, allègement) ;
+    cle_disque : dossier du cache disque (empreinte + code de préparation)
+    """
+
+    def __init__(self, empreinte, contenu, allege, origine, cache_disque=None, cle_disque=None):
+        self.empreinte = empreinte
+        self.contenu = contenu
+        self.allege = allege
+        self.origine = origine
+        self.cache_disque = cache_disque
+        self.cle_disque = cle_disque or empreinte
+        self._contenu_base = None
+        self._base = None
+
+    def __repr__(self):
+        return f"Template({self.empreinte[:12]}, {'allégé' if self.allege else 'complet'}, {self.origine})"
+
+    def contenu_base(self):
+        """Octets de la base préparée (xlsx_brut.preparer_base), gardés en cache"""
+        if self._contenu_base is None:
+            cle = (self.cle_disque, 'base')
+            contenu = self.cache_disque.lire(cle) if self.cache_disque is not None else None
+            if contenu is None:
+                contenu = preparer_base(self.contenu)
+                if self.cache_disque is not None:
+                    self.cache_disque.ecrire(cle, contenu)
+            self._contenu_base = contenu
+        return self._contenu_base
+
+    def base(self):
+        """Base préparée découpée en parties (xlsx_brut.Base), construite une fois"""
+        if self._base is None:
+            self._base = Base(self.contenu_base())
+        return self._base
+
+
+def _template_allege_a_cote(source_file, empreinte, code):
+    """Octets du template allégé écrit par alleger_template.py pour ce contenu et ce code, ou None"""
+    from generation_commune import chemin_template_allege, fichier_infos_template
+    try:
+        with open(fichier_infos_template(source_file), 'r', encoding='utf-8') as f:
+            infos = json.load(f)
+        if infos.get('source_sha256') != empreinte or infos.get('code_sha256') != code:
+            return None
+        with open(chemin_template_allege(source_file), 'rb') as f:
+            return f.read()
+    except (OSError, ValueError):
+        return None
+
+
+def alleger_contenu(contenu):
+    """
+    (octets du template, allégé) : template allégé et vérifié (mêmes valeurs et
+    formules), ou le fichier de base lui-même si l'allègement a échoué.
+    """
+    from alleger_template import alleger_template, verifier_template
+    allege = io.BytesIO()
+    try:
+        alleger_template(io.BytesIO(contenu), allege)
+        if not verifier_template(io.BytesIO(contenu), io.BytesIO(allege.getvalue())):
+            return allege.getvalue(), True
+    except ValueError:
+        pass
+    return contenu, False
+
+
+class RegistreTemplates:
+    """
+    Templates indexés par SHA-256 du fichier de base : LRU en mémoire, puis
+    cache disque (cache_disque=None le désactive), puis allègement.
+    alleger=False : le fichier de base est utilisé tel quel s'il n'a pas de
+    template allégé à côté de lui (comportement de choisir_template).
+    """
+
+    def __init__(self, cache_disque=None, nombre_max=NOMBRE_MAX_MEMOIRE, alleger=True):
+        self.cache_disque = cache_disque
+        self.nombre_max = nombre_max
+        self.alleger = alleger
+        self.templates = OrderedDict()  # empreinte -> Template
+        self._empreintes = {}           # (chemin, taille, mtime) -> empreinte : fichier inchangé, pas relu
+        self.code = empreinte_preparation()
+
+    def _cle_disque(self, empreinte):
+        return f'{empreinte}-{self.code[:16]}'
+
+    def _template(self, empreinte, contenu, allege, origine):
+        return self._memoriser(Template(empreinte, contenu, allege, origine, self.cache_disque,
+                                        self._cle_disque(empreinte)))
+
+    def _memoriser(self, template):
+        self.templates[template.empreinte] = template
+        self.templates.move_to_end(template.empreinte)
+        while len(self.templates) > self.nombre_max:
+            self.templates.popitem(last=False)
+        return template
+
+    def empreinte_fichier(self, source_file):
+        """SHA-256 d'un fichier, recalculé seulement s'il a changé (taille, date)"""
+        infos = os.stat(source_file)
+        cle = (os.path.abspath(source_file), infos.st_size, infos.st_mtime_ns)
+        if cle not in self._empreintes:
+            with open(source_file, 'rb') as f:
+                self._empreintes[cle] = hashlib.sha256(f.read()).hexdigest()
+        return self._empreintes[cle]
+
+    def template(self, source_file):
+        """Template d'un fichier de base (FileNotFoundError s'il n'existe pas)"""
+        empreinte = self.empreinte_fichier(source_file)
+        if empreinte in self.templates:
+            self.templates.move_to_end(empreinte)
+            return self.templates[empreinte]
+        allege = _template_allege_a_cote(source_file, empreinte, self.code)
+        if allege is not None:
+            return self._template(empreinte, allege, True, 'template allégé')
+        with open(source_file, 'rb') as f:
+            return self.depuis_contenu(f.read(), empreinte)
+
+    def depuis_contenu(self, contenu, empreinte=None):
+        """Template d'un fichier de base reçu en mémoire (ex. envoyé à l'API web)"""
+        empreinte = empreinte or hashlib.sha256(contenu).hexdigest()
+        if empreinte in self.templates:
+            self.templates.move_to_end(empreinte)
+            return self.templates[empreinte]
+
+        cle_disque = self._cle_disque(empreinte)
+        if self.cache_disque is not None:
+            template = self.cache_disque.lire((cle_disque, 'template'))
+            if template is not None:
+                return self._template(empreinte, template, template != contenu, 'cache disque')
+        if not self.alleger:
+            return self._template(empreinte, contenu, False, 'fichier de base')
+
+        template, allege = alleger_contenu(contenu)
+        if self.cache_disque is not None:
+            self.cache_disque.ecrire((cle_disque, 'template'), template)
+        return self._template(empreinte, template, allege,
+                              'allègement' if allege else 'fichier de base (allègement refusé)')
+
+    def vider(self):
+        self.templates.clear()
+        self._empreintes.clear()
+
+
+_registre = None
+
+
+def registre_par_defaut():
+    """Registre partagé du processus (cache disque .cache_templates/)"""
+    global _registre
+    if _registre is None:
+        _registre = RegistreTemplates(CacheDisque(CACHE_DIR, TAILLE_MAX_DISQUE))
+    return _registre
+
+
+def main():
+    from generation_commune import TYPES_ABRIS, charger_generateur
+
+    parser = argparse.ArgumentParser(description="Registre des templates de prix (cache par empreinte)")
+    parser.add_argument('fichiers', nargs='*', help="Fichiers de base (défaut : ceux des scripts generate_*.py)")
+    parser.add_argument('--vider-cache', action='store_true', help="Vider le cache disque")
+    args = parser.parse_args()
+
+    registre = registre_par_defaut()
+    if args.vider_cache:
+        registre.cache_disque.vider()
+        print(f"🗑️  Cache {CACHE_DIR}/ vidé")
+        if not args.fichiers:
+            return
+
+    fichiers = args.fichiers or sorted({charger_generateur(t).source_file for t in TYPES_ABRIS})
+    erreurs = 0
+    for source_file in fichiers:
+        if not os.path.exists(source_file):
+            print(f"❌ {source_file} n'existe pas !")
+            erreurs += 1
+            continue
+        debut = time.perf_counter()
+        template = registre.template(source_file)
+        duree = time.perf_counter() - debut
+        template.base()
+        print(f"📄 {source_file}")
+        print(f"   {template.empreinte[:16]}  {len(template.contenu) / 1024:.0f} Ko "
+              f"{'allégé' if template.allege else 'complet'}  ({template.origine}, {duree * 1000:.0f} ms)")
+
+    print(f"💾 Cache {CACHE_DIR}/ : {registre.cache_disque.taille() / (1024 * 1024):.1f} Mo")
+    if erreurs:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,16 +4,71 @@ Peut être déployée séparément (Heroku, Railway, etc.)
 """
 from flask import Flask, request, send_file
 from flask_cors import CORS
+import io
 import os
 import shutil
-import subprocess
+import sys
 import tempfile
-import zipfile
 from pathlib import Path
 
 app = Flask(__name__)
 CORS(app)
 
+# Scripts de génération (dossier racine du projet)
+scripts_dir = Path(__file__).parent.parent
+if str(scripts_dir) not in sys.path:
+    sys.path.insert(0, str(scripts_dir))
+
+_materialiseur = None
+_registre = None
+
+
+def registre():
+    """Templates déjà vus (fichier par défaut ou envoyés), partagés entre les requêtes"""
+    global _registre
+    from caches import CacheDisque
+    from registre_templates import CACHE_DIR, TAILLE_MAX_DISQUE, RegistreTemplates
+    if _registre is None:
+        _registre = RegistreTemplates(CacheDisque(str(scripts_dir / CACHE_DIR), TAILLE_MAX_DISQUE))
+    return _registre
+
+
+@app.route('/variant/<sku>', methods=['GET'])
+def variant(sku):
+    """Construit un seul classeur à partir de son SKU (ex. MET-F-7M-P-1000-PT)"""
+    global _materialiseur
+    from caches import CacheDisque
+    from materialisation import CACHE_DIR, TAILLE_MAX_DISQUE, Materialiseur
+    if _materialiseur is None:
+        _materialiseur = Materialiseur(cache_disque=CacheDisque(str(scripts_dir / CACHE_DIR), TAILLE_MAX_DISQUE),
+                                       racine=str(scripts_dir), registre=registre())
+    try:
+        contenu = _materialiseur.materialiser(sku)
+    except (ValueError, KeyError) as e:
+        return {'error': e.args[0]}, 404
+    nom_fichier = sku if sku.endswith('.xlsx') else f'{sku}.xlsx'
+    return send_file(
+        io.BytesIO(contenu),
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=nom_fichier
+    )
+
+@app.route('/decomposition', methods=['GET'])
+def decomposition():
+    """Décompositions en segments (?largeur=7&profondeur=9&ouvert=1)"""
+    from decomposition import decomposer_largeur, decomposer_profondeur_ferme, decomposer_profondeur_ouvert
+    table_profondeur = decomposer_profondeur_ouvert if request.args.get('ouvert') else decomposer_profondeur_ferme
+    resultat = {}
+    try:
+        if 'largeur' in request.args:
+            resultat['largeur'] = decomposer_largeur(float(request.args['largeur']))
+        if 'profondeur' in request.args:
+            resultat['profondeur'] = table_profondeur(float(request.args['profondeur']))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return resultat
+
 @app.route('/generate', methods=['POST'])
 def generate():
     """Génère toutes les variantes et retourne un ZIP"""
@@ -23,9 +78,7 @@ def generate():
         
         # Créer la structure
         base_dir = Path(temp_dir) / 'fichier de base'
-        resultats_dir = Path(temp_dir) / 'résultats'
         base_dir.mkdir(parents=True, exist_ok=True)
-        resultats_dir.mkdir(parents=True, exist_ok=True)
         
         # Gérer le fichier uploadé
         if 'file' in request.files:
@@ -37,46 +90,43 @@ def generate():
             if default_file.exists():
                 shutil.copy(default_file, base_dir / 'nepastoucher.xlsx')
         
-        # Scripts à exécuter
-        scripts_dir = Path(__file__).parent.parent
-        scripts = [
-            'generate_bosquet_ouvert.py',
-            'generate_bosquet_ferme.py',
-            'generate_bosquet_ouvert_compact.py',
-            'generate_bosquet_ferme_compact.py',
-            'generate_domino_ouvert.py',
-            'generate_domino_ferme.py',
-            'generate_domino_ouvert_compact.py',
-            'generate_domino_ferme_compact.py',
-            'generate_metallique_ouvert.py',
-            'generate_metallique_ferme.py',
-            'generate_metallique_ouvert_compact.py',
-            'generate_metallique_ferme_compact.py',
-            'generate_neve_ouvert.py',
-            'generate_neve_ferme.py',
-            'generate_neve_ferme_compact.py'
+        # Scripts de génération (importés, exécutés dans ce processus)
+        from generation_commune import SortieZip, charger_generateur, generer_type
+        
+        # Template allégé (~100 Ko au lieu de ~1.7 Mo), retrouvé par empreinte : un
+        # fichier déjà envoyé n'est ni relu par openpyxl ni allégé une seconde fois
+        types_abris = [
+            'bosquet_ouvert',
+            'bosquet_ferme',
+            'bosquet_ouvert_compact',
+            'bosquet_ferme_compact',
+            'domino_ouvert',
+            'domino_ferme',
+            'domino_ouvert_compact',
+            'domino_ferme_compact',
+            'metallique_ouvert',
+            'metallique_ferme',
+            'metallique_ouvert_compact',
+            'metallique_ferme_compact',
+            'neve_ouvert',
+            'neve_ferme',
+            'neve_ferme_compact'
         ]
         
-        # Exécuter les scripts
-        for script in scripts:
-            script_path = scripts_dir / script
-            if script_path.exists():
+        # Chaque variante est ajoutée au ZIP dès qu'elle est construite (stockée
+        # sans recompression) : le catalogue n'est écrit qu'une fois sur disque
+        zip_path = Path(temp_dir) / 'resultats.zip'
+        sortie = SortieZip(zip_path)
+        try:
+            for type_abri in types_abris:
                 try:
-                    subprocess.run(
-                        ['python3', str(script_path)],
-                        cwd=temp_dir,
-                        check=True,
-                        capture_output=True
-                    )
-                except subprocess.CalledProcessError as e:
-                    print(f"Erreur avec {script}: {e}")
+                    generer_type(charger_generateur(type_abri), sortie,
+                                 source_file=str(base_dir / 'nepastoucher.xlsx'), registre=registre())
+                except Exception as e:
+                    print(f"Erreur avec generate_{type_abri}.py: {e}")
                     continue
-        
-        # Créer le ZIP
-        zip_path = Path(temp_dir) / 'resultats.zip'
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for excel_file in resultats_dir.rglob('*.xlsx'):
-                zipf.write(excel_file, excel_file.relative_to(resultats_dir))
+        finally:
+            sortie.fermer()
         
         # Retourner le ZIP
         return send_file(
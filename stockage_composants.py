@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage normalisé des composants (nomenclatures) extraits
+==========================================================
+
+Chaque SKU avait son composant/<type>/<SKU>.json : la grille A2:E110 de
+PRC import (109 lignes x 5 colonnes, indent=2, surtout des lignes vides), alors
+que les variants d'un même abri partagent presque toutes leurs lignes (G / PT,
+N / P ne diffèrent que de quelques articles).
+
+Les composants d'un SKU sont désormais creux et typés, en colonnes
+(composants_types) :
+    {'ligne': [3, 4, ...], 'code_import': [1, 3, ...], 'article': ['43.06.14.0043', ...],
+     'description': [...], 'quantite': [4, ...], 'unite': ['st', ...]}
+- seules les lignes renseignées sont gardées, avec leur numéro de ligne dans
+  PRC import ; l'en-tête (ligne 2), les lignes vides et les lignes de
+  remplissage [0, vide...] sont retirées
+- code_import et quantite sont des nombres (Excel écrit les quantités en texte :
+  '4' -> 4), article, description et unite du texte
+grille_composants() reconstruit l'ancienne grille de 109 x 5 (valeurs typées).
+
+Ils sont stockés une seule fois, dans trois fichiers JSON Lines (une ligne
+ajoutée par nouvel élément, pas de réécriture) :
+- composant/articles.jsonl : table des articles uniques (code_import, article,
+  description, unite) ; l'identifiant d'un article est l'empreinte (SHA-256) de
+  ses colonnes
+- composant/nomenclatures.jsonl : nomenclatures uniques, indexées par SHA-256,
+  en colonnes : numéros de ligne, identifiants d'article, quantités
+- composant/index.jsonl : une ligne par SKU (type, nomenclature, source, date),
+  ajoutée à chaque extraction ; la dernière ligne d'un SKU fait foi, l'index est
+  compacté (une ligne par SKU) à la fermeture
+
+Plusieurs processus peuvent écrire en même temps (extraction lancée par
+veille.py et tarification_directe.py, par exemple) : les identifiants ne
+dépendent que du contenu, un élément ajouté deux fois est simplement en double.
+Les ajouts à l'index et son compactage se font sous un verrou de fichier
+(composant/.verrou) ; le compactage relit l'index sur disque, entrées des autres
+processus comprises.
+
+Deux SKU de même nomenclature la partagent. Les anciens fichiers
+composant/<type>/<SKU>.json restent lus tant qu'ils n'ont pas été importés.
+Pour un traitement en masse, table_composants() met tous les SKU dans une
+seule table en colonnes (--table).
+
+Utilisation :
+    python stockage_composants.py                      # résumé du stockage
+    python stockage_composants.py MET-F-7M-P-1000-PT   # composants d'un SKU
+    python stockage_composants.py --importer           # importe les anciens fichiers par SKU
+    python stockage_composants.py --exporter DOSSIER   # écrit un fichier par SKU (ancien format)
+    python stockage_composants.py --table composants.json   # tous les SKU, une table en colonnes
+"""
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from threading import Lock
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+from generation_commune import ecrire_atomique, ecrire_json_atomique
+
+COMPOSANT_DIR = 'composant'
+FICHIER_ARTICLES = 'articles.jsonl'
+FICHIER_NOMENCLATURES = 'nomenclatures.jsonl'
+FICHIER_INDEX = 'index.jsonl'
+FICHIER_VERROU = '.verrou'
+
+# Colonnes A à E de PRC import
+COLONNES_COMPOSANTS = ('code_import', 'article', 'description', 'quantite', 'unite')
+COLONNES_ARTICLE = ('code_import', 'article', 'description', 'unite')
+PREMIERE_LIGNE = 2     # A2:E110
+NOMBRE_LIGNES = 109
+ENTETE = ['Import code', 'Article code', 'Description', 'Quantity', 'Unit']  # ligne 2
+LIGNE_VIDE = [0, None, None, None, None]
+
+
+def _json(valeur):
+    return json.dumps(valeur, ensure_ascii=False, separators=(',', ':'))
+
+
+def _sku(fichier):
+    nom = os.path.basename(fichier)
+    for extension in ('.xlsx', '.json'):
+        if nom.endswith(extension):
+            return nom[:-len(extension)]
+    return nom
+
+
+def _nombre(valeur):
+    """Nombre d'une cellule (texte '4' ou '2,5' compris) ; la valeur telle quelle si ce n'en est pas un"""
+    if valeur is None or isinstance(valeur, bool):
+        return valeur
+    if isinstance(valeur, (int, float)):
+        nombre = valeur
+    else:
+        try:
+            nombre = float(str(valeur).strip().replace(',', '.'))
+        except ValueError:
+            return valeur
+    return int(nombre) if isinstance(nombre, float) and nombre.is_integer() else nombre
+
+
+def _texte(valeur):
+    if valeur is None or isinstance(valeur, str):
+        return valeur
+    return str(_nombre(valeur))
+
+
+def composants_types(grille, premiere_ligne=PREMIERE_LIGNE):
+    """Composants creux et typés, en colonnes, d'une grille A2:E110 (lignes de 5 cellules)"""
+    composants = {'ligne': [], **{colonne: [] for colonne in COLONNES_COMPOSANTS}}
+    for numero, row in enumerate(grille or [], premiere_ligne):
+        row = (list(row) + [None] * len(COLONNES_COMPOSANTS))[:len(COLONNES_COMPOSANTS)]
+        if row == LIGNE_VIDE or row == ENTETE or all(cell is None for cell in row):
+            continue
+        code_import, article, description, quantite, unite = row
+        composants['ligne'].append(numero)
+        composants['code_import'].append(_nombre(code_import))
+        composants['article'].append(_texte(article))
+        composants['description'].append(_texte(description))
+        composants['quantite'].append(_nombre(quantite))
+        composants['unite'].append(_texte(unite))
+    return composants
+
+
+def grille_composants(composants, premiere_ligne=PREMIERE_LIGNE, nombre_lignes=NOMBRE_LIGNES):
+    """Ancienne grille A2:E110 (109 lignes de 5 cellules) de composants en colonnes"""
+    derniere = max(composants['ligne'], default=premiere_ligne)
+    grille = [list(LIGNE_VIDE) for _ in range(max(nombre_lignes, derniere - premiere_ligne + 1))]
+    grille[0] = list(ENTETE)
+    for i, numero in enumerate(composants['ligne']):
+        grille[numero - premiere_ligne] = [composants[colonne][i] for colonne in COLONNES_COMPOSANTS]
+    return grille
+
+
+def composants_valides(composants):
+    """Composants non vides (au moins un article) ; accepte aussi une ancienne grille"""
+    if isinstance(composants, dict):
+        return any(valeur is not None for colonne in ('article', 'description', 'quantite', 'unite')
+                   for valeur in composants[colonne])
+    return bool(composants) and any(
+        any(cell is not None and cell != '' for cell in row)
+        for row in composants
+    )
+
+
+def _lire_lignes_json(chemin):
+    """
+    Lignes JSON d'un fichier .jsonl. Une dernière ligne incomplète (arrêt pendant
+    l'écriture) est retirée du fichier : la prochaine ligne ajoutée ne s'y colle pas.
+    """
+    if not os.path.exists(chemin):
+        return []
+    with open(chemin, 'rb') as f:
+        contenu = f.read()
+    complet = contenu[:contenu.rfind(b'\n') + 1]
+    if len(complet) != len(contenu):
+        with open(chemin, 'r+b') as f:
+            f.truncate(len(complet))
+    return [json.loads(ligne) for ligne in complet.decode('utf-8').splitlines()]
+
+
+@contextlib.contextmanager
+def _verrou_fichier(dossier):
+    """Verrou exclusif entre processus sur dossier, le temps d'une écriture"""
+    os.makedirs(dossier, exist_ok=True)
+    with open(os.path.join(dossier, FICHIER_VERROU), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _meme_fichier(fichier, chemin):
+    """fichier (ouvert) est-il toujours celui de chemin ?"""
+    try:
+        return os.fstat(fichier.fileno()).st_ino == os.stat(chemin).st_ino
+    except FileNotFoundError:
+        return False
+
+
+class StockageComposants:
+    """
+    Nomenclatures par SKU, articles et nomenclatures dédoublonnés.
+    Utilisable depuis plusieurs threads (écritures protégées par un verrou).
+    """
+
+    def __init__(self, dossier=COMPOSANT_DIR):
+        self.dossier = dossier
+        self.lock = Lock()
+        self.articles = {a['id']: a['colonnes']  # identifiant -> colonnes
+                         for a in _lire_lignes_json(os.path.join(dossier, FICHIER_ARTICLES))}
+        self.nomenclatures = {n.pop('id'): n
+                              for n in _lire_lignes_json(os.path.join(dossier, FICHIER_NOMENCLATURES))}
+        self.index = {}
+        for entree in _lire_lignes_json(os.path.join(dossier, FICHIER_INDEX)):
+            self.index[entree['sku']] = entree
+        self._composants = {}  # empreinte -> composants en colonnes
+        self._fichiers = {}    # nom -> fichier ouvert en ajout
+
+    def _ajouter(self, nom, enregistrement):
+        chemin = os.path.join(self.dossier, nom)
+        with _verrou_fichier(self.dossier):
+            fichier = self._fichiers.get(nom)
+            if fichier is not None and not _meme_fichier(fichier, chemin):
+                # Index compacté (remplacé) par un autre processus
+                fichier.close()
+                fichier = None
+            if fichier is None:
+                fichier = self._fichiers[nom] = open(chemin, 'a', encoding='utf-8')
+            fichier.write(_json(enregistrement) + '\n')
+            fichier.flush()
+
+    def _article(self, colonnes):
+        """Identifiant (empreinte) d'un article, ajouté à la table s'il est nouveau"""
+        identifiant = hashlib.sha256(_json(colonnes).encode('utf-8')).hexdigest()[:16]
+        if identifiant not in self.articles:
+            self.articles[identifiant] = colonnes
+            self._ajouter(FICHIER_ARTICLES, {'id': identifiant, 'colonnes': colonnes})
+        return identifiant
+
+    def _enregistrer_nomenclature(self, composants):
+        """Empreinte de la nomenclature de composants en colonnes (ajoutée si elle est nouvelle)"""
+        nomenclature = {
+            'ligne': list(composants['ligne']),
+            'article': [self._article([composants[colonne][i] for colonne in COLONNES_ARTICLE])
+                        for i in range(len(composants['ligne']))],
+            'quantite': list(composants['quantite']),
+        }
+        empreinte = hashlib.sha256(_json(nomenclature).encode('utf-8')).hexdigest()
+        if empreinte not in self.nomenclatures:
+            self.nomenclatures[empreinte] = nomenclature
+            self._ajouter(FICHIER_NOMENCLATURES, {'id': empreinte, **nomenclature})
+        return empreinte
+
+    def enregistrer(self, type_abri, fichier_source, chemin_source, composants, date=None):
+        """
+        Enregistre les composants d'un fichier : en colonnes (composants_types), ou
+        ancienne grille A2:E110. Des composants vides ne remplacent pas une
+        nomenclature déjà extraite (seule la date est mise à jour). Retourne
+        l'entrée d'index du SKU.
+        """
+        if not isinstance(composants, dict):
+            composants = composants_types(composants)
+        sku = _sku(fichier_source)
+        with self.lock:
+            ancienne = self.index.get(sku)
+            entree = {
+                'sku': sku,
+                'type': type_abri,
+                'fichier_source': fichier_source,
+                'chemin_source': chemin_source,
+                'date_extraction': date or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            if composants_valides(composants) or ancienne is None:
+                entree['nomenclature'] = self._enregistrer_nomenclature(composants)
+            else:
+                # Si les nouveaux composants sont vides mais qu'il y a un ancien, on garde l'ancien
+                entree['nomenclature'] = ancienne['nomenclature']
+                entree['note'] = 'Composants conservés (nouvelle extraction vide)'
+            self.index[sku] = entree
+            self._ajouter(FICHIER_INDEX, entree)
+        return entree
+
+    def entree(self, sku):
+        return self.index.get(_sku(sku))
+
+    def skus(self):
+        return sorted(self.index)
+
+    def composants(self, sku):
+        """
+        Composants d'un SKU en colonnes (voir composants_types), ou None. Les SKU
+        de même nomenclature reçoivent les mêmes listes : ne pas les modifier.
+        """
+        entree = self.entree(sku)
+        if entree is None:
+            return None
+        empreinte = entree['nomenclature']
+        if empreinte not in self._composants:
+            nomenclature = self.nomenclatures[empreinte]
+            articles = [self.articles[identifiant] for identifiant in nomenclature['article']]
+            composants = {'ligne': nomenclature['ligne']}
+            for position, colonne in enumerate(COLONNES_ARTICLE):
+                composants[colonne] = [article[position] for article in articles]
+            composants['quantite'] = nomenclature['quantite']
+            self._composants[empreinte] = {colonne: composants[colonne]
+                                           for colonne in ('ligne',) + COLONNES_COMPOSANTS}
+        return self._composants[empreinte]
+
+    def grille(self, sku):
+        """Ancienne grille A2:E110 d'un SKU (grille_composants), ou None"""
+        composants = self.composants(sku)
+        return grille_composants(composants) if composants is not None else None
+
+    def compacter(self):
+        """
+        Réécrit l'index avec une ligne par SKU (écriture atomique), d'après l'index
+        sur disque : les entrées ajoutées par d'autres processus sont gardées
+        """
+        if not self.index:
+            return
+        with self.lock, _verrou_fichier(self.dossier):
+            fichier = self._fichiers.pop(FICHIER_INDEX, None)
+            if fichier is not None:
+                fichier.close()
+            for entree in _lire_lignes_json(os.path.join(self.dossier, FICHIER_INDEX)):
+                self.index[entree['sku']] = entree
+            contenu = ''.join(_json(self.index[sku]) + '\n' for sku in sorted(self.index))
+            ecrire_atomique(os.path.join(self.dossier, FICHIER_INDEX), contenu.encode('utf-8'))
+
+    def fermer(self):
+        self.compacter()
+        with self.lock:
+            for fichier in self._fichiers.values():
+                fichier.close()
+            self._fichiers.clear()
+
+
+def fichiers_par_sku(dossier=COMPOSANT_DIR):
+    """Anciens fichiers composant/<type>/<SKU>.json : {sku: (type, chemin)}"""
+    return {_sku(chemin): (os.path.basename(os.path.dirname(chemin)), chemin)
+            for chemin in sorted(glob.glob(os.path.join(dossier, '*', '*.json')))}
+
+
+def charger_composants(dossier=COMPOSANT_DIR):
+    """{sku: composants en colonnes} de tous les SKU : stockage normalisé, puis anciens fichiers non importés"""
+    stockage = StockageComposants(dossier)
+    composants = {sku: stockage.composants(sku) for sku in stockage.skus()}
+    for sku, (_, chemin) in fichiers_par_sku(dossier).items():
+        if sku not in composants:
+            with open(chemin, 'r', encoding='utf-8') as f:
+                grille = json.load(f).get('composants')
+            composants[sku] = composants_types(grille) if grille else None
+    return composants
+
+
+def table_composants(stockage, skus=None):
+    """
+    Composants de plusieurs SKU (défaut : tous) dans une seule table en colonnes,
+    une entrée par ligne de composant : {'sku': [...], 'ligne': [...], 'code_import': [...], ...}
+    """
+    table = {'sku': [], 'ligne': [], **{colonne: [] for colonne in COLONNES_COMPOSANTS}}
+    for sku in stockage.skus() if skus is None else skus:
+        composants = stockage.composants(sku)
+        if composants is None:
+            continue
+        table['sku'].extend([_sku(sku)] * len(composants['ligne']))
+        for colonne in ('ligne',) + COLONNES_COMPOSANTS:
+            table[colonne].extend(composants[colonne])
+    return table
+
+
+def importer(stockage):
+    """Importe les anciens fichiers par SKU (non supprimés). Retourne le nombre de SKU importés"""
+    importes = 0
+    for sku, (type_abri, chemin) in fichiers_par_sku(stockage.dossier).items():
+        with open(chemin, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        stockage.enregistrer(type_abri, data.get('fichier_source') or f'{sku}.xlsx', data.get('chemin_source'),
+                             data.get('composants'), data.get('date_extraction'))
+        importes += 1
+    return importes
+
+
+def exporter(stockage, destination):
+    """Écrit destination/<type>/<SKU>.json (ancien format). Retourne le nombre de fichiers"""
+    for sku in stockage.skus():
+        entree = stockage.entree(sku)
+        data = {
+            'fichier_source': entree['fichier_source'],
+            'chemin_source': entree['chemin_source'],
+            'date_extraction': entree['date_extraction'],
+            'composants': stockage.grille(sku),
+        }
+        if 'note' in entree:
+            data['note'] = entree['note']
+        os.makedirs(os.path.join(destination, entree['type']), exist_ok=True)
+        ecrire_json_atomique(os.path.join(destination, entree['type'], f'{sku}.json'), data)
+    return len(stockage.index)
+
+
+def _taille(dossier):
+    """Taille des fichiers du stockage normalisé (octets)"""
+    return sum(os.path.getsize(os.path.join(dossier, nom))
+               for nom in (FICHIER_ARTICLES, FICHIER_NOMENCLATURES, FICHIER_INDEX)
+               if os.path.exists(os.path.join(dossier, nom)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stockage normalisé des composants extraits")
+    parser.add_argument('skus', nargs='*', help="SKU à afficher (ex. MET-F-7M-P-1000-PT)")
+    parser.add_argument('--dossier', default=COMPOSANT_DIR, help="Dossier des composants (défaut : %(default)s)")
+    parser.add_argument('--importer', action='store_true', help="Importer les anciens fichiers <type>/<SKU>.json")
+    parser.add_argument('--exporter', metavar='DOSSIER', help="Écrire un fichier <type>/<SKU>.json par SKU")
+    parser.add_argument('--table', metavar='FICHIER',
+                        help="Écrire les composants de tous les SKU dans une table JSON en colonnes")
+    args = parser.parse_args()
+
+    stockage = StockageComposants(args.dossier)
+    try:
+        if args.importer:
+            print(f"📥 {importer(stockage)} SKU importés dans {args.dossier}/ "
+                  f"(les anciens fichiers peuvent être supprimés)")
+        if args.exporter:
+            print(f"📤 {exporter(stockage, args.exporter)} fichiers écrits dans {args.exporter}/")
+        if args.table:
+            table = table_composants(stockage)
+            ecrire_atomique(args.table, _json(table).encode('utf-8'))
+            print(f"📤 {len(table['sku'])} lignes de composants ({len(stockage.index)} SKU) écrites dans {args.table}")
+        erreurs = 0
+        for sku in args.skus:
+            composants = stockage.composants(sku)
+            if composants is None:
+                print(f"❌ {sku} absent du stockage")
+                erreurs += 1
+                continue
+            for i, numero in enumerate(composants['ligne']):
+                print(f'   {numero:>3} ' + ' | '.join('' if composants[colonne][i] is None else str(composants[colonne][i])
+                                                  for colonne in COLONNES_COMPOSANTS))
+        if erreurs:
+            sys.exit(1)
+        if not args.skus:
+            print(f"🧩 {args.dossier}/ : {len(stockage.index)} SKU, {len(stockage.nomenclatures)} nomenclatures "
+                  f"distinctes, {len(stockage.articles)} articles, {_taille(args.dossier) / 1024:.0f} Ko")
+    finally:
+        stockage.fermer()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage des résultats d'extraction (prix par fichier)
+======================================================
+
+resultats_tous.json était trié et réécrit en entier (indent=2) après chaque
+fichier extrait, et chaque mise à jour cherchait l'entrée par parcours de la
+liste : O(n²) sur une extraction complète. Deux stockages, même interface
+(enregistrer, resultats, retirer, exporter, fermer) :
+- BaseResultats (défaut) : base SQLite (resultats.sqlite, mode WAL), une ligne
+  par fichier, clé : chemin du classeur ; index sur le SKU
+- JournalResultats (plus léger) : une ligne JSON ajoutée par fichier extrait à
+  resultats_tous.journal.jsonl ; au démarrage, resultats_tous.json puis le
+  journal sont rejoués dans un dict ; un compactage (réécriture de
+  resultats_tous.json, journal vidé) a lieu toutes les INTERVALLE_COMPACTION
+  secondes en arrière-plan et à la fermeture
+
+Dans les deux cas, une mise à jour par fichier extrait (fusion des champs comme
+avant), et resultats_tous.json est écrit en une passe ; les lecteurs
+(pack_resultats.py, calculateur_prix_camflex.py...) continuent de le lire.
+resultats_tous.json sert aussi d'échange entre les deux stockages : la base
+réimporte un resultats_tous.json exporté par le journal.
+
+Utilisation :
+    python stockage_resultats.py             # résumé des résultats
+    python stockage_resultats.py --exporter  # réécrit resultats_tous.json
+    python stockage_resultats.py --stockage journal --exporter
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+from generation_commune import ecrire_json_atomique
+
+RESULTATS_JSON = 'resultats_tous.json'
+FICHIER_BASE = 'resultats.sqlite'
+FICHIER_JOURNAL = 'resultats_tous.journal.jsonl'
+INTERVALLE_COMPACTION = 300  # s entre deux compactages du journal
+STOCKAGES = ('sqlite', 'journal')
+
+
+def _maintenant():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _charger_json(resultats_json):
+    """Contenu de resultats_tous.json, ou {} s'il n'existe pas (ou est illisible)"""
+    if not os.path.exists(resultats_json):
+        return {}
+    try:
+        with open(resultats_json, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Erreur lors du chargement de {resultats_json}: {e}")
+        return {}
+
+
+def _exporter_json(resultats_json, date, resultats):
+    """Écrit resultats_tous.json (écriture atomique). Retourne sa date_derniere_maj"""
+    date_maj = _maintenant()
+    ecrire_json_atomique(resultats_json, {
+        'date': date,
+        'resultats': resultats,
+        'date_derniere_maj': date_maj,
+        'total': len(resultats),
+    })
+    return date_maj
+
+
+def _sku(result):
+    nom = result.get('fichier') or os.path.basename(result['chemin_complet'])
+    return nom[:-len('.xlsx')] if nom.endswith('.xlsx') else nom
+
+
+class BaseResultats:
+    """
+    Résultats indexés par chemin (chemin_complet) dans une base SQLite.
+    Utilisable depuis plusieurs threads (une connexion, protégée par un verrou).
+    """
+
+    def __init__(self, chemin=FICHIER_BASE, resultats_json=RESULTATS_JSON):
+        self.chemin = chemin
+        self.resultats_json = resultats_json
+        self.lock = Lock()
+        self.connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self.connexion.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL : une transaction validée survit à un arrêt du processus
+        # (pas forcément à une coupure de courant), sans fsync à chaque fichier
+        self.connexion.execute('PRAGMA synchronous=NORMAL')
+        with self.connexion:
+            self.connexion.execute('''
+                CREATE TABLE IF NOT EXISTS resultats (
+                    chemin TEXT PRIMARY KEY,
+                    sku TEXT NOT NULL,
+                    type_abri TEXT,
+                    prix_avant_reduction REAL,
+                    prix_apres_reduction REAL,
+                    date_extraction TEXT,
+                    donnees TEXT NOT NULL
+                )''')
+            self.connexion.execute('CREATE INDEX IF NOT EXISTS resultats_sku ON resultats (sku)')
+            self.connexion.execute('CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT)')
+        data = _charger_json(resultats_json)
+        # Base neuve, ou resultats_tous.json exporté depuis par un autre stockage (journal)
+        if self._meta('date') is None or \
+                data.get('date_derniere_maj') not in (None, self._meta('date_derniere_maj')):
+            self.importer_json(data)
+
+    def _meta(self, cle):
+        ligne = self.connexion.execute('SELECT valeur FROM meta WHERE cle = ?', (cle,)).fetchone()
+        return ligne[0] if ligne else None
+
+    def _ecrire_meta(self, cle, valeur):
+        self.connexion.execute('INSERT OR REPLACE INTO meta (cle, valeur) VALUES (?, ?)', (cle, valeur))
+
+    def importer_json(self, data=None):
+        """
+        Remplace le contenu de la base par resultats_tous.json (data : son contenu
+        déjà lu). Retourne le nombre de résultats importés.
+        """
+        data = _charger_json(self.resultats_json) if data is None else data
+        resultats = [r for r in data.get('resultats', []) if r.get('chemin_complet')]
+        with self.lock, self.connexion:
+            self.connexion.execute('DELETE FROM resultats')
+            for result in resultats:
+                self._upsert(result)
+            self._ecrire_meta('date', data.get('date') or _maintenant())
+            self._ecrire_meta('date_derniere_maj', data.get('date_derniere_maj'))
+        return len(resultats)
+
+    def _upsert(self, result):
+        chemin = result['chemin_complet']
+        ligne = self.connexion.execute('SELECT donnees FROM resultats WHERE chemin = ?', (chemin,)).fetchone()
+        donnees = json.loads(ligne[0]) if ligne else {}
+        donnees.update(result)
+        self.connexion.execute(
+            'INSERT OR REPLACE INTO resultats (chemin, sku, type_abri, prix_avant_reduction, prix_apres_reduction, '
+            'date_extraction, donnees) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (chemin, _sku(donnees), donnees.get('type_abri'), donnees.get('prix_avant_reduction'),
+             donnees.get('prix_apres_reduction'), donnees.get('date_extraction'),
+             json.dumps(donnees, ensure_ascii=False)))
+
+    def enregistrer(self, result):
+        """
+        Ajoute ou met à jour le résultat d'un fichier (clé : chemin_complet). Les
+        champs de result remplacent ceux de l'entrée existante, les autres sont gardés.
+        """
+        with self.lock, self.connexion:
+            self._upsert(result)
+
+    def resultat(self, chemin):
+        with self.lock:
+            ligne = self.connexion.execute('SELECT donnees FROM resultats WHERE chemin = ?', (chemin,)).fetchone()
+        return json.loads(ligne[0]) if ligne else None
+
+    def par_sku(self, sku):
+        """Résultats d'un SKU (un par chemin)"""
+        with self.lock:
+            lignes = self.connexion.execute('SELECT donnees FROM resultats WHERE sku = ? ORDER BY chemin',
+                                            (sku,)).fetchall()
+        return [json.loads(donnees) for donnees, in lignes]
+
+    def resultats(self):
+        """{chemin: résultat}, triés par chemin"""
+        with self.lock:
+            lignes = self.connexion.execute('SELECT chemin, donnees FROM resultats ORDER BY chemin').fetchall()
+        return {chemin: json.loads(donnees) for chemin, donnees in lignes}
+
+    def __len__(self):
+        with self.lock:
+            return self.connexion.execute('SELECT COUNT(*) FROM resultats').fetchone()[0]
+
+    def retirer(self, chemins):
+        """Retire les résultats de ces fichiers. Retourne le nombre de résultats retirés"""
+        with self.lock, self.connexion:
+            return sum(self.connexion.execute('DELETE FROM resultats WHERE chemin = ?', (chemin,)).rowcount
+                       for chemin in set(chemins))
+
+    def exporter(self, resultats_json=None):
+        """Écrit resultats_tous.json (écriture atomique), en une passe, trié par chemin"""
+        resultats = list(self.resultats().values())
+        with self.lock:
+            date = self._meta('date')
+        date_maj = _exporter_json(resultats_json or self.resultats_json, date, resultats)
+        if resultats_json in (None, self.resultats_json):
+            with self.lock, self.connexion:
+                self._ecrire_meta('date_derniere_maj', date_maj)
+        return len(resultats)
+
+    def fermer(self):
+        with self.lock:
+            self.connexion.close()
+
+
+class JournalResultats:
+    """
+    Résultats gardés dans un dict {chemin: résultat}, chaque mise à jour étant
+    ajoutée au journal (une ligne JSON, vidée vers le système à chaque écriture :
+    un arrêt brutal perd au plus l'enregistrement en cours). resultats_tous.json
+    n'est réécrit qu'au compactage (intervalle_compaction secondes, en
+    arrière-plan ; None : seulement à la fermeture ou par exporter()).
+    """
+
+    def __init__(self, chemin=FICHIER_JOURNAL, resultats_json=RESULTATS_JSON,
+                 intervalle_compaction=INTERVALLE_COMPACTION):
+        self.chemin = chemin
+        self.resultats_json = resultats_json
+        self.lock = Lock()
+        data = _charger_json(resultats_json)
+        self.date = data.get('date') or _maintenant()
+        self._resultats = {r['chemin_complet']: r for r in data.get('resultats', []) if r.get('chemin_complet')}
+        self.rejoues = self._rejouer()
+        self.fichier = open(chemin, 'a', encoding='utf-8')
+        self._arret = Event()
+        self._compacteur = None
+        if intervalle_compaction:
+            self._compacteur = Thread(target=self._compacter_periodiquement, args=(intervalle_compaction,),
+                                      daemon=True)
+            self._compacteur.start()
+
+    def _appliquer(self, enregistrement):
+        chemin = enregistrement['chemin_complet']
+        if enregistrement.get('retire'):
+            return self._resultats.pop(chemin, None) is not None
+        self._resultats.setdefault(chemin, {}).update(enregistrement)
+        return True
+
+    def _rejouer(self):
+        """
+        Applique les enregistrements du journal (écrits depuis le dernier compactage).
+        Une dernière ligne incomplète (arrêt pendant l'écriture) est retirée du
+        fichier : le prochain enregistrement ne s'y colle pas.
+        """
+        rejoues = 0
+        if not os.path.exists(self.chemin):
+            return rejoues
+        with open(self.chemin, 'rb') as f:
+            contenu = f.read()
+        complet = contenu[:contenu.rfind(b'\n') + 1]
+        if len(complet) != len(contenu):
+            with open(self.chemin, 'r+b') as f:
+                f.truncate(len(complet))
+        for ligne in complet.decode('utf-8').splitlines():
+            try:
+                enregistrement = json.loads(ligne)
+            except ValueError:
+                continue
+            self._appliquer(enregistrement)
+            rejoues += 1
+        return rejoues
+
+    def _ajouter(self, enregistrement):
+        self.fichier.write(json.dumps(enregistrement, ensure_ascii=False) + '\n')
+        self.fichier.flush()
+
+    def enregistrer(self, result):
+        """
+        Ajoute ou met à jour le résultat d'un fichier (clé : chemin_complet). Les
+        champs de result remplacent ceux de l'entrée existante, les autres sont gardés.
+        """
+        with self.lock:
+            self._appliquer(result)
+            self._ajouter(result)
+
+    def resultat(self, chemin):
+        with self.lock:
+            result = self._resultats.get(chemin)
+            return dict(result) if result is not None else None
+
+    def par_sku(self, sku):
+        """Résultats d'un SKU (un par chemin)"""
+        return [r for r in self.resultats().values() if _sku(r) == sku]
+
+    def resultats(self):
+        """{chemin: résultat}, triés par chemin"""
+        with self.lock:
+            return {chemin: dict(self._resultats[chemin]) for chemin in sorted(self._resultats)}
+
+    def __len__(self):
+        return len(self._resultats)
+
+    def retirer(self, chemins):
+        """Retire les résultats de ces fichiers. Retourne le nombre de résultats retirés"""
+        retires = 0
+        with self.lock:
+            for chemin in set(chemins):
+                if chemin in self._resultats:
+                    self._appliquer({'chemin_complet': chemin, 'retire': True})
+                    self._ajouter({'chemin_complet': chemin, 'retire': True})
+                    retires += 1
+        return retires
+
+    def exporter(self, resultats_json=None):
+        """
+        Compactage : écrit resultats_tous.json (écriture atomique, en une passe,
+        trié par chemin) puis vide le journal. Un arrêt entre les deux est sans
+        conséquence : rejouer le journal sur le nouveau fichier ne change rien.
+        """
+        with self.lock:
+            resultats = [dict(self._resultats[chemin]) for chemin in sorted(self._resultats)]
+            _exporter_json(resultats_json or self.resultats_json, self.date, resultats)
+            if resultats_json in (None, self.resultats_json):
+                self.fichier.truncate(0)
+        return len(resultats)
+
+    def _compacter_periodiquement(self, intervalle):
+        while not self._arret.wait(intervalle):
+            try:
+                self.exporter()
+            except Exception as e:
+                print(f"❌ Erreur lors du compactage de {self.chemin}: {e}")
+
+    def fermer(self):
+        """Arrête le compactage périodique et compacte une dernière fois"""
+        self._arret.set()
+        if self._compacteur is not None:
+            self._compacteur.join()
+        self.exporter()
+        self.fichier.close()
+
+
+def ouvrir_stockage(stockage=None, resultats_json=RESULTATS_JSON, intervalle_compaction=INTERVALLE_COMPACTION):
+    """
+    Stockage des résultats : 'sqlite' (BaseResultats) ou 'journal'
+    (JournalResultats, compacté toutes les intervalle_compaction secondes).
+    None : celui déjà utilisé (journal s'il existe un journal et pas de base),
+    sinon la base SQLite.
+    """
+    if stockage is None:
+        stockage = 'journal' if os.path.exists(FICHIER_JOURNAL) and not os.path.exists(FICHIER_BASE) else 'sqlite'
+    if stockage == 'journal':
+        return JournalResultats(FICHIER_JOURNAL, resultats_json, intervalle_compaction)
+    if stockage == 'sqlite':
+        return BaseResultats(FICHIER_BASE, resultats_json)
+    raise ValueError(f"Stockage inconnu : {stockage} (choix : {', '.join(STOCKAGES)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Base des résultats d'extraction (prix par fichier)")
+    parser.add_argument('--stockage', choices=STOCKAGES,
+                        help="Stockage à lire (défaut : celui déjà utilisé)")
+    parser.add_argument('--exporter', action='store_true', help=f"Réécrire {RESULTATS_JSON} depuis le stockage")
+    args = parser.parse_args()
+
+    if not any(os.path.exists(f) for f in (FICHIER_BASE, FICHIER_JOURNAL, RESULTATS_JSON)):
+        print(f"❌ Ni {FICHIER_BASE}, ni {FICHIER_JOURNAL}, ni {RESULTATS_JSON} : "
+              f"lancez d'abord extract_prices_and_components.py")
+        sys.exit(1)
+
+    base = ouvrir_stockage(args.stockage, intervalle_compaction=None)
+    try:
+        if args.exporter:
+            total = base.exporter()
+            print(f"💾 {total} résultats exportés dans {base.resultats_json}")
+            return
+        resultats = base.resultats().values()
+        avec_prix = sum(1 for r in resultats
+                        if r.get('prix_avant_reduction') and r.get('prix_apres_reduction'))
+        print(f"🗄️  {base.chemin} : {len(resultats)} résultats, {avec_prix} avec prix complets")
+    finally:
+        base.fermer()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Génération et calcul des prix en une passe, sans classeurs intermédiaires
+==========================================================================
+
+Chemin historique : les scripts generate_*.py écrivent ~1 100 classeurs, puis
+extract_prices_and_components.py rouvre chacun dans Excel (recalcul,
+enregistrement) et le relit encore pour en tirer H7:H9 et A2:E110 : deux
+analyses complètes de chaque classeur, en plus de son écriture.
+
+Ici, chaque variant va directement au moteur de prix :
+- son delta (cellules de Configure écrites par configurer(ws, variant), voir
+  xlsx_brut.Base.enregistrer) est appliqué au classeur de base, ouvert une seule
+  fois dans Excel (MoteurExcel) ; les cellules du variant précédent reprennent
+  leur valeur de base et les plages défusionnées sont refusionnées
+- Excel recalcule ; les prix (PRC import H7:H9) et les composants (A2:E110)
+  sont relus dans le même appel AppleScript
+- le résultat va directement dans la base des résultats (stockage_resultats)
+  et le stockage des composants (stockage_composants)
+
+Les fichiers .xlsx deviennent une sortie facultative (--classeurs), écrite dans
+un thread à part pendant qu'Excel calcule les variants suivants : chaque
+classeur est construit à partir du delta (xlsx_brut), inscrit dans
+catalogue.json, et son manifeste est enregistré avec le résultat (l'extraction
+ne le retraite donc pas).
+
+Utilisation :
+    python tarification_directe.py                                # tous les types
+    python tarification_directe.py carport metallique_ferme --classeurs
+"""
+
+import argparse
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from generation_commune import RESULTATS_DIR, TAILLE_FILE, TYPES_ABRIS, SortieDossier, charger_generateur
+from xlsx_brut import CELLULES_PRIX, LIGNES_COMPOSANTS, NOM_FEUILLE_CONFIGURE, NOM_FEUILLE_PRC, decouper_ref
+
+COMPOSANT_DIR = 'composant'
+RESULTATS_JSON = 'resultats_tous.json'
+DELAI_OUVERTURE = 0.8  # secondes laissées à Excel après l'ouverture du classeur de base
+DELAI_CALCUL = 0.2     # après calculate (seules les cellules du variant ont changé)
+TIMEOUT_VARIANT = 45
+
+ORDRE_PRIX = sorted(CELLULES_PRIX, key=lambda cle: decouper_ref(CELLULES_PRIX[cle]))  # cellules consécutives
+PLAGE_PRIX = f"{CELLULES_PRIX[ORDRE_PRIX[0]]}:{CELLULES_PRIX[ORDRE_PRIX[-1]]}"         # H7:H9
+PLAGE_COMPOSANTS = f"A{LIGNES_COMPOSANTS[0]}:E{LIGNES_COMPOSANTS[-1]}"     # A2:E110
+
+RE_JETON = re.compile(r'\s*(?:(?P<chaine>"(?:[^"\\]|\\.)*")|(?P<nombre>-?\d+(?:\.\d+)?(?:E[+-]?\d+)?)'
+                      r'|(?P<mot>missing value|true|false)|(?P<signe>[{},]))', re.S)
+ECHAPPEMENTS = {'n': '\n', 't': '\t', 'r': '\r'}
+
+
+def _chaine_applescript(texte):
+    return '"' + texte.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _litteral_applescript(valeur):
+    if isinstance(valeur, bool):
+        return 'true' if valeur else 'false'
+    if isinstance(valeur, (int, float)):
+        return repr(valeur)
+    return _chaine_applescript(str(valeur))
+
+
+def lire_resultat_applescript(texte):
+    """
+    Valeur Python d'un résultat affiché par osascript -s s (listes AppleScript ->
+    listes). Comme les valeurs en cache lues par xlsx_brut : cellule vide ("") ou
+    missing value -> None, réel entier -> int.
+    """
+    pile = [[]]
+    position = 0
+    texte = texte.strip()
+    while position < len(texte):
+        m = RE_JETON.match(texte, position)
+        if m is None:
+            raise ValueError(f"Résultat AppleScript illisible : {texte[position:position + 40]!r}")
+        position = m.end()
+        if m.group('signe') == '{':
+            pile.append([])
+        elif m.group('signe') == '}':
+            liste = pile.pop()
+            pile[-1].append(liste)
+        elif m.group('chaine') is not None:
+            chaine = re.sub(r'\\(.)', lambda e: ECHAPPEMENTS.get(e.group(1), e.group(1)),
+                            m.group('chaine')[1:-1], flags=re.S)
+            pile[-1].append(chaine if chaine != '' else None)
+        elif m.group('nombre') is not None:
+            nombre = float(m.group('nombre'))
+            pile[-1].append(int(nombre) if nombre.is_integer() else nombre)
+        elif m.group('mot') is not None:
+            pile[-1].append({'missing value': None, 'true': True, 'false': False}[m.group('mot')])
+    if len(pile) != 1 or len(pile[0]) != 1:
+        raise ValueError(f"Résultat AppleScript incomplet : {texte[:40]!r}")
+    return pile[0][0]
+
+
+def executer_applescript(script, timeout=TIMEOUT_VARIANT):
+    """Résultat d'un script AppleScript (osascript -s s) ; RuntimeError en cas d'échec"""
+    try:
+        result = subprocess.run(['osascript', '-s', 's', '-e', script],
+                                capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RuntimeError("Timeout: Excel a pris trop de temps") from None
+    except OSError as e:
+        raise RuntimeError(str(e)) from None
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or "Erreur inconnue")
+    return result.stdout
+
+
+class MoteurExcel:
+    """
+    Classeur de base (xlsx_brut.preparer_base) ouvert une fois dans Excel (macOS,
+    AppleScript) et recalculé pour chaque variant. calculer(delta) retourne les
+    sorties, comme xlsx_brut.lire_sorties : prix_brut, remise, prix_net, composants.
+    """
+
+    def __init__(self, template):
+        self.base = template.base()
+        self.dossier = tempfile.mkdtemp(prefix='tarification-')
+        self.nom = f'base-{template.empreinte[:12]}.xlsx'
+        self.chemin = os.path.join(self.dossier, self.nom)
+        with open(self.chemin, 'wb') as f:
+            f.write(template.contenu_base())
+        self.modifiees = set()       # cellules écrites par le variant précédent
+        self.defusionnees = set()    # plages défusionnées par le variant précédent
+        executer_applescript(f'''
+        tell application "Microsoft Excel"
+            set display alerts to false
+            open POSIX file {_chaine_applescript(self.chemin)}
+            delay {DELAI_OUVERTURE}
+        end tell
+        ''')
+
+    def _instructions(self, delta):
+        """Lignes AppleScript : annuler le variant précédent, appliquer delta"""
+        cellules = dict(delta['cellules'])
+        valeurs_base = self.base.valeurs()
+        for ref in sorted(self.modifiees - set(cellules)):
+            cellules[ref] = valeurs_base.get(ref)
+        lignes = [f'merge range "{plage}" of feuille'
+                  for plage in sorted(self.defusionnees - set(delta['defusions']))]
+        lignes += [f'unmerge range "{plage}" of feuille'
+                   for plage in delta['defusions'] if plage not in self.defusionnees]
+        for ref, valeur in cellules.items():
+            if valeur is None:
+                lignes.append(f'clear contents range "{ref}" of feuille')
+            elif isinstance(valeur, str) and valeur.startswith('='):
+                lignes.append(f'set formula of range "{ref}" of feuille to {_chaine_applescript(valeur)}')
+            else:
+                lignes.append(f'set value of range "{ref}" of feuille to {_litteral_applescript(valeur)}')
+        return lignes
+
+    def calculer(self, delta):
+        """Sorties calculées par Excel pour un delta de Configure ; RuntimeError si Excel échoue"""
+        lignes = self._instructions(delta)
+        # En cas d'échec, l'état du classeur est incertain : tout sera remis à la base au prochain appel
+        self.modifiees |= set(delta['cellules'])
+        self.defusionnees |= set(delta['defusions'])
+        instructions = '\n            '.join(lignes)
+        sortie = executer_applescript(f'''
+        tell application "Microsoft Excel"
+            set classeur to workbook {_chaine_applescript(self.nom)}
+            set feuille to worksheet {_chaine_applescript(NOM_FEUILLE_CONFIGURE)} of classeur
+            {instructions}
+            calculate
+            delay {DELAI_CALCUL}
+            set prc to worksheet {_chaine_applescript(NOM_FEUILLE_PRC)} of classeur
+            return {{value of range "{PLAGE_PRIX}" of prc, value of range "{PLAGE_COMPOSANTS}" of prc}}
+        end tell
+        ''')
+        self.modifiees = set(delta['cellules'])
+        self.defusionnees = set(delta['defusions'])
+        prix, composants = lire_resultat_applescript(sortie)
+        sorties = {cle: ligne[0] for cle, ligne in zip(ORDRE_PRIX, prix)}
+        sorties['composants'] = composants
+        return sorties
+
+    def fermer(self):
+        try:
+            executer_applescript(f'''
+            tell application "Microsoft Excel"
+                close workbook {_chaine_applescript(self.nom)} saving no
+            end tell
+            ''')
+        except RuntimeError:
+            pass
+        shutil.rmtree(self.dossier, ignore_errors=True)
+
+
+class EcritureClasseurs:
+    """
+    Sortie facultative : classeurs .xlsx construits à partir du delta et écrits
+    dans résultats/<type>/ par un thread à part (file bornée), pendant qu'Excel
+    calcule les variants suivants. Le manifeste de chaque fichier écrit est
+    enregistré avec son résultat ; catalogue.json est mis à jour à la fermeture.
+    """
+
+    def __init__(self, base_resultats, resultats_dir=RESULTATS_DIR, taille_file=TAILLE_FILE):
+        self.base_resultats = base_resultats
+        self.sortie = SortieDossier(resultats_dir, nettoyer=False)
+        self.file = queue.Queue(taille_file)
+        self.entrees = {}  # type d'abri -> entrées du catalogue
+        self.erreur = None
+        self.thread = threading.Thread(target=self._ecrire_tous, daemon=True)
+        self.thread.start()
+
+    def ajouter(self, type_abri, variant, base, delta):
+        if self.erreur is not None:
+            raise self.erreur
+        self.file.put((type_abri, variant, base, delta))
+
+    def _ecrire_tous(self):
+        from catalogue import entree_catalogue
+        from extract_prices_and_components import manifeste_fichier
+        while True:
+            element = self.file.get()
+            if element is None:
+                return
+            if self.erreur is not None:
+                continue
+            type_abri, variant, base, delta = element
+            try:
+                contenu = base.materialiser(delta['cellules'], delta['defusions'])
+                if type_abri not in self.entrees:
+                    self.sortie.ouvrir_type(type_abri)
+                    self.entrees[type_abri] = []
+                self.sortie.ecrire(type_abri, variant['fichier'], contenu)
+                chemin = os.path.join(self.sortie.dossier(type_abri), variant['fichier'])
+                self.entrees[type_abri].append(entree_catalogue(type_abri, variant, chemin, contenu))
+                self.base_resultats.enregistrer({'chemin_complet': chemin,
+                                                 'manifeste': manifeste_fichier(os.stat(chemin), contenu)})
+            except Exception as e:
+                self.erreur = e
+
+    def fermer(self):
+        self.file.put(None)
+        self.thread.join()
+        for type_abri, entrees in self.entrees.items():
+            self.sortie.ecrire_catalogue(type_abri, entrees, remplacer=False)
+        if self.erreur is not None:
+            raise self.erreur
+
+
+def tarifer_type(generateur, moteurs, base_resultats, composants, classeurs=None, registre=None,
+                 resultats_dir=RESULTATS_DIR):
+    """
+    Calcule les prix et composants de tous les variants d'un type d'abri (module
+    generate_*.py), sans passer par des fichiers. moteurs : {empreinte du template:
+    MoteurExcel}, complété au besoin. Retourne (succès, SKU sans prix).
+    """
+    from extract_prices_and_components import _type_abri_fichier, extract_components, is_valid_price
+    from registre_templates import registre_par_defaut
+
+    type_abri = generateur.TYPE_ABRI
+    template = (registre or registre_par_defaut()).template(generateur.source_file)
+    if template.empreinte not in moteurs:
+        moteurs[template.empreinte] = MoteurExcel(template)
+    moteur = moteurs[template.empreinte]
+    base = template.base()
+
+    print(f"\n{'─' * 80}")
+    print(f"  {generateur.TITRE}")
+    print(f"{'─' * 80}")
+    succes = 0
+    sans_prix = []
+    for compteur, variant in enumerate(generateur.planifier(), 1):
+        delta = base.enregistrer(generateur.configurer, variant)
+        chemin = os.path.join(resultats_dir, type_abri, variant['fichier'])
+        try:
+            sorties, erreur = moteur.calculer(delta), None
+        except (RuntimeError, ValueError) as e:
+            sorties, erreur = {}, f"Erreur Excel: {e}"
+
+        prix_avant = sorties.get('prix_brut')
+        prix_apres = sorties.get('prix_net')
+        result = {
+            'fichier': variant['fichier'],
+            'chemin_complet': chemin,
+            'type_abri': _type_abri_fichier(chemin),
+            'prix_avant_reduction': prix_avant if is_valid_price(prix_avant) else None,
+            'prix_apres_reduction': prix_apres if is_valid_price(prix_apres) else None,
+            'date_extraction': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'tentative': 1,
+            'perime': False,
+            'erreur': None,
+        }
+        valides = result['prix_avant_reduction'] is not None and result['prix_apres_reduction'] is not None
+        if not valides:
+            result['erreur'] = erreur or 'Prix non valides'
+        if valides or base_resultats.resultat(chemin) is None:
+            base_resultats.enregistrer(result)
+        else:
+            # Comme extract_prices_and_components.py : les prix déjà extraits sont gardés,
+            # mais périmés (le classeur écrit par --classeurs est celui du nouveau variant)
+            base_resultats.enregistrer({'chemin_complet': chemin, 'tentative': 1, 'perime': True,
+                                        'erreur': result['erreur']})
+        if 'composants' in sorties:
+            composants.enregistrer(result['type_abri'], result['fichier'], chemin,
+                                   extract_components(sorties['composants']))
+        if classeurs is not None:
+            classeurs.ajouter(type_abri, variant, base, delta)
+
+        sku = variant['fichier'][:-len('.xlsx')]
+        if valides:
+            succes += 1
+            print(f"[{compteur}] ✅ {sku} | Avant: {result['prix_avant_reduction']:.2f} € | "
+                  f"Après: {result['prix_apres_reduction']:.2f} €")
+        else:
+            sans_prix.append(sku)
+            print(f"[{compteur}] ❌ {sku} | {erreur or 'Prix non valides'}")
+    return succes, sans_prix
+
+
+def main():
+    from stockage_composants import StockageComposants
+    from stockage_resultats import STOCKAGES, ouvrir_stockage
+
+    parser = argparse.ArgumentParser(description="Calcule les prix et composants de chaque variant dans Excel, "
+                                                 "sans écrire ni relire de classeurs")
+    parser.add_argument('types', nargs='*', choices=TYPES_ABRIS, metavar='TYPE',
+                        help="Types d'abris (défaut : tous)")
+    parser.add_argument('--classeurs', action='store_true',
+                        help="Écrire aussi les classeurs .xlsx dans résultats/ (thread à part)")
+    parser.add_argument('--stockage', choices=STOCKAGES,
+                        help="Stockage des résultats (voir extract_prices_and_components.py)")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("CALCUL DIRECT DES PRIX (SANS CLASSEURS INTERMÉDIAIRES)")
+    print("=" * 80)
+
+    base_resultats = ouvrir_stockage(args.stockage, RESULTATS_JSON)
+    composants = StockageComposants(COMPOSANT_DIR)
+    classeurs = EcritureClasseurs(base_resultats) if args.classeurs else None
+    moteurs = {}
+
+    print("🔧 Activation d'Excel...")
+    subprocess.run(['osascript', '-e', 'tell application "Microsoft Excel" to activate'], capture_output=True)
+    time.sleep(1)
+
+    succes = 0
+    sans_prix = []
+    start_time = time.time()
+    try:
+        for type_abri in args.types or TYPES_ABRIS:
+            succes_type, sans_prix_type = tarifer_type(charger_generateur(type_abri), moteurs,
+                                                       base_resultats, composants, classeurs)
+            succes += succes_type
+            sans_prix += sans_prix_type
+    except FileNotFoundError as e:
+        print(f"❌ Erreur: {e} n'existe pas !")
+        sys.exit(1)
+    finally:
+        for moteur in moteurs.values():
+            moteur.fermer()
+        if classeurs is not None:
+            classeurs.fermer()
+        base_resultats.exporter()
+        base_resultats.fermer()
+        composants.fermer()
+    elapsed_time = time.time() - start_time
+
+    total = succes + len(sans_prix)
+    print(f"\n" + "=" * 80)
+    print("RÉSUMÉ")
+    print("=" * 80)
+    print(f"✅ Succès (avec prix): {succes}")
+    if sans_prix:
+        print(f"❌ Sans prix calculé: {len(sans_prix)}")
+        for sku in sans_prix[:20]:
+            print(f"   - {sku}")
+        if len(sans_prix) > 20:
+            print(f"   ... et {len(sans_prix) - 20} autres")
+    print(f"⏱️  Temps total: {elapsed_time:.1f} secondes ({total / max(elapsed_time, 1e-6):.1f} variants/s)")
+    print(f"\n💾 Résultats sauvegardés dans: {base_resultats.chemin} (exportés dans {RESULTATS_JSON})")
+    print(f"💾 Composants sauvegardés dans: {COMPOSANT_DIR}/")
+    if classeurs is not None:
+        print(f"💾 Classeurs écrits dans: {RESULTATS_DIR}/ (catalogue.json mis à jour)")
+    if sans_prix:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Télémétrie de l'extraction : débit, échecs, latence par étape, ETA
+===================================================================
+
+Une extraction dure plusieurs heures ; extract_prices_and_components.py
+n'affichait qu'une ligne par fichier et un temps moyen à la fin.
+TelemetrieExtraction suit en continu :
+- le débit glissant (fichiers terminés pendant les FENETRE_DEBIT dernières
+  secondes) et le débit moyen, en fichiers par minute
+- les succès, les échecs (taux), les tentatives, les fichiers à retenter au
+  prochain tour, en attente (file) et en cours
+- la durée de chaque étape (ouverture dans Excel, recalcul, lecture, écriture
+  des composants) : p50 / p95 / max et histogramme
+- l'ETA, d'après le débit glissant
+Toutes les INTERVALLE secondes, une ligne d'état est affichée et
+extraction_metriques.json est réécrit (écriture atomique) : d'autres outils
+peuvent le surveiller pendant l'extraction.
+
+Utilisation :
+    python telemetrie.py              # état de l'extraction en cours (ou de la dernière)
+    python telemetrie.py --suivre     # rafraîchi toutes les 5 s jusqu'à la fin
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+from generation_commune import Chronometre, afficher_metriques, ecrire_json_atomique
+
+FICHIER_METRIQUES_EXTRACTION = 'extraction_metriques.json'
+INTERVALLE = 15         # secondes entre deux lignes d'état / écritures du fichier
+FENETRE_DEBIT = 300     # secondes prises en compte pour le débit glissant
+ETAPES = ['ouverture', 'recalcul', 'lecture', 'composants']
+BORNES_HISTOGRAMME_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+def histogramme(durees, bornes_ms=BORNES_HISTOGRAMME_MS):
+    """Nombre de durées (secondes) par tranche : {'<=50ms': n, ..., '>30000ms': n}"""
+    tranches = {f'<={borne}ms': 0 for borne in bornes_ms}
+    tranches[f'>{bornes_ms[-1]}ms'] = 0
+    for duree in durees:
+        ms = duree * 1000
+        borne = next((b for b in bornes_ms if ms <= b), None)
+        tranches[f'<={borne}ms' if borne is not None else f'>{bornes_ms[-1]}ms'] += 1
+    return tranches
+
+
+def _duree(secondes):
+    if secondes is None:
+        return '?'
+    heures, reste = divmod(int(round(secondes)), 3600)
+    minutes, secondes = divmod(reste, 60)
+    if heures:
+        return f'{heures} h {minutes:02d}'
+    return f'{minutes} min {secondes:02d} s' if minutes else f'{secondes} s'
+
+
+def ligne_etat(metriques):
+    """Ligne d'état affichée pendant l'extraction"""
+    echecs = metriques['echecs']
+    taux = f" ({100 * metriques['taux_echec']:.1f} %)" if metriques['termines'] else ''
+    return (f"📈 [{metriques['termines']}/{metriques['total']}] "
+            f"{metriques['debit_glissant_par_min']:.1f} fichiers/min "
+            f"(moy. {metriques['debit_moyen_par_min']:.1f}) | échecs {echecs}{taux} | "
+            f"à retenter {metriques['a_retenter']} | en attente {metriques['en_attente']} | "
+            f"en cours {metriques['en_cours']} | ETA {_duree(metriques['eta_secondes'])}")
+
+
+class TelemetrieExtraction:
+    """
+    Compteurs et durées d'une extraction, partagés entre threads. mesurer(etape)
+    chronomètre une étape ; tentative_commencee() / tentative_terminee(etat)
+    encadrent le traitement d'un fichier (etat : 'succes', 'echec' ou 'retry').
+    """
+
+    def __init__(self, total, mode, chemin=FICHIER_METRIQUES_EXTRACTION, intervalle=INTERVALLE,
+                 fenetre=FENETRE_DEBIT):
+        self.total = total
+        self.mode = mode
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self.fenetre = fenetre
+        self.lock = Lock()
+        self.chrono = Chronometre()
+        self.debut = time.time()
+        self.succes = 0
+        self.echecs = 0
+        self.tentatives = 0
+        self.a_retenter = 0
+        self.en_cours = 0
+        self.fins = deque()  # instants où un fichier a été terminé, pour le débit glissant
+        self._arret = Event()
+        self._thread = None
+
+    def demarrer(self):
+        """Ligne d'état et fichier de métriques toutes les intervalle secondes"""
+        self.ecrire()
+        self._thread = Thread(target=self._rafraichir, daemon=True)
+        self._thread.start()
+
+    def _rafraichir(self):
+        while not self._arret.wait(self.intervalle):
+            metriques = self.ecrire()
+            print(ligne_etat(metriques), flush=True)
+
+    def mesurer(self, etape):
+        return self.chrono.mesurer(etape)
+
+    def ajouter_duree(self, etape, secondes):
+        """Durée mesurée ailleurs (processus de lecture de --sans-excel)"""
+        self.chrono.durees.setdefault(etape, []).append(secondes)
+
+    def tentative_commencee(self):
+        with self.lock:
+            self.tentatives += 1
+            self.en_cours += 1
+
+    def tentative_terminee(self, etat):
+        with self.lock:
+            self.en_cours -= 1
+            if etat == 'retry':
+                self.a_retenter += 1
+                return
+            if etat == 'succes':
+                self.succes += 1
+            else:
+                self.echecs += 1
+            maintenant = time.time()
+            self.fins.append(maintenant)
+            while self.fins and self.fins[0] < maintenant - self.fenetre:
+                self.fins.popleft()
+
+    def nouveau_tour(self):
+        """Début d'un tour de nouvelles tentatives : les fichiers à retenter repassent en attente"""
+        with self.lock:
+            self.a_retenter = 0
+
+    def metriques(self):
+        maintenant = time.time()
+        with self.lock:
+            while self.fins and self.fins[0] < maintenant - self.fenetre:
+                self.fins.popleft()
+            ecoule = maintenant - self.debut
+            termines = self.succes + self.echecs
+            fenetre = min(self.fenetre, ecoule)
+            debit_glissant = len(self.fins) / fenetre if fenetre > 0 else 0.0
+            restants = self.total - termines
+            metriques = {
+                'mode': self.mode,
+                'debut': datetime.fromtimestamp(self.debut).strftime("%Y-%m-%d %H:%M:%S"),
+                'maintenant': datetime.fromtimestamp(maintenant).strftime("%Y-%m-%d %H:%M:%S"),
+                'ecoule_secondes': round(ecoule, 1),
+                'total': self.total,
+                'termines': termines,
+                'succes': self.succes,
+                'echecs': self.echecs,
+                'taux_echec': round(self.echecs / termines, 4) if termines else 0.0,
+                'tentatives': self.tentatives,
+                'a_retenter': self.a_retenter,
+                'en_cours': self.en_cours,
+                'en_attente': max(0, restants - self.en_cours - self.a_retenter),
+                'debit_glissant_par_min': round(60 * debit_glissant, 2),
+                'debit_moyen_par_min': round(60 * termines / ecoule, 2) if ecoule > 0 else 0.0,
+                'eta_secondes': round(restants / debit_glissant) if debit_glissant > 0 else None,
+                'termine': self._arret.is_set(),
+            }
+        statistiques_etapes = self.chrono.statistiques()
+        metriques['etapes'] = {etape: statistiques_etapes[etape]
+                               for etape in ETAPES + sorted(set(statistiques_etapes) - set(ETAPES))
+                               if etape in statistiques_etapes}
+        for etape, statistiques in metriques['etapes'].items():
+            statistiques['histogramme'] = histogramme(self.chrono.durees[etape])
+        return metriques
+
+    def ecrire(self):
+        metriques = self.metriques()
+        try:
+            ecrire_json_atomique(self.chemin, metriques)
+        except OSError as e:
+            print(f"⚠️  Métriques non écrites ({self.chemin}) : {e}")
+        return metriques
+
+    def fermer(self):
+        """Arrête le rafraîchissement, écrit les métriques finales et affiche les durées par étape"""
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+        metriques = self.ecrire()
+        if metriques['etapes']:
+            afficher_metriques(metriques['etapes'], titre="Durées par fichier et par étape (ms)")
+        return metriques
+
+
+def afficher(metriques):
+    print(ligne_etat(metriques))
+    print(f"   Mode : {metriques['mode']} | début : {metriques['debut']} | "
+          f"dernière mise à jour : {metriques['maintenant']}{' (terminée)' if metriques['termine'] else ''}")
+    for etape, statistiques in metriques['etapes'].items():
+        tranches = ' '.join(f'{tranche}:{n}' for tranche, n in statistiques['histogramme'].items() if n)
+        print(f"   {etape:<12} p50 {statistiques['p50_ms']:>8.1f} ms  p95 {statistiques['p95_ms']:>8.1f} ms  "
+              f"max {statistiques['max_ms']:>8.1f} ms  | {tranches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="État de l'extraction en cours (extraction_metriques.json)")
+    parser.add_argument('--fichier', default=FICHIER_METRIQUES_EXTRACTION,
+                        help="Fichier de métriques (défaut : %(default)s)")
+    parser.add_argument('--suivre', action='store_true', help="Rafraîchir jusqu'à la fin de l'extraction")
+    parser.add_argument('--intervalle', type=float, default=5, help="--suivre : secondes entre deux lectures")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            with open(args.fichier, 'r', encoding='utf-8') as f:
+                metriques = json.load(f)
+        except (OSError, ValueError):
+            print(f"❌ Pas de métriques d'extraction ({args.fichier})")
+            sys.exit(1)
+        afficher(metriques)
+        if not args.suivre or metriques['termine']:
+            return
+        time.sleep(args.intervalle)
+        print()
+
+
+if __name__ == '__main__':
+    main()
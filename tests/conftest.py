@@ -0,0 +1,22 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# Les scripts sont à la racine du dépôt (pas de paquet)
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+@pytest.fixture
+def module_corrige(tmp_path):
+    """Copie d'un module de la racine avec une ligne ajoutée (simule une correction du code)"""
+    def copier(nom):
+        copie = tmp_path / 'corrige' / nom
+        copie.parent.mkdir(exist_ok=True)
+        shutil.copy(os.path.join(RACINE, nom), copie)
+        with open(copie, 'a', encoding='utf-8') as f:
+            f.write('\n# correction\n')
+        return str(copie)
+    return copier
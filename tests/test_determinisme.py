@@ -0,0 +1,27 @@
+"""Génération déterministe (generation_commune.construire_classeur)"""
+
+import hashlib
+import time
+
+from conftest import RACINE
+from generation_commune import charger_generateur, choisir_template, construire_classeur
+
+
+def test_meme_variant_memes_octets(monkeypatch):
+    monkeypatch.chdir(RACINE)
+    generateur = charger_generateur('metallique_ouvert_compact')
+    with open(choisir_template(generateur.source_file), 'rb') as f:
+        template = f.read()
+    variant = generateur.planifier()[0]
+
+    premier = construire_classeur(template, generateur.configurer, variant)
+    # Autre fuseau horaire, une seconde plus tard : les dates du zip sont fixées
+    monkeypatch.setenv('TZ', 'Pacific/Auckland')
+    time.tzset()
+    time.sleep(1)
+    try:
+        second = construire_classeur(template, generateur.configurer, variant)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    assert hashlib.sha256(second).hexdigest() == hashlib.sha256(premier).hexdigest()
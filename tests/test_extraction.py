@@ -0,0 +1,30 @@
+"""Extraction sans Excel (extract_prices_and_components.extraire_en_processus)"""
+
+import extract_prices_and_components as extraction
+from stockage_resultats import BaseResultats
+from telemetrie import TelemetrieExtraction
+
+
+def test_echec_de_lecture_garde_les_prix_extraits(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, '_catalogue', False)
+    monkeypatch.setattr(extraction, '_telemetrie',
+                        TelemetrieExtraction(2, 'sans_excel', chemin=str(tmp_path / 'metriques.json')))
+    ancien = str(tmp_path / 'MET-F-4M-N-400-G.xlsx')
+    nouveau = str(tmp_path / 'MET-F-5M-N-400-G.xlsx')
+    for chemin in (ancien, nouveau):
+        with open(chemin, 'wb') as f:
+            f.write(b'pas un classeur')
+    base = BaseResultats(str(tmp_path / 'resultats.sqlite'), str(tmp_path / 'resultats_tous.json'))
+    base.enregistrer({'chemin_complet': ancien, 'fichier': 'MET-F-4M-N-400-G.xlsx',
+                      'prix_avant_reduction': 4308.33, 'prix_apres_reduction': 2800.41,
+                      'date_extraction': '2026-01-01 00:00:00'})
+
+    succes, sans_prix = extraction.extraire_en_processus([ancien, nouveau], base, 1)
+    assert succes == 0 and sorted(sans_prix) == [ancien, nouveau]
+    resultat = base.resultat(ancien)
+    assert (resultat['prix_avant_reduction'], resultat['prix_apres_reduction']) == (4308.33, 2800.41)
+    assert resultat['date_extraction'] == '2026-01-01 00:00:00'
+    assert resultat['erreur']
+    # Fichier sans résultat antérieur : enregistré sans prix
+    assert base.resultat(nouveau)['prix_avant_reduction'] is None
+    base.fermer()
@@ -0,0 +1,18 @@
+"""Empreinte du code de génération (generation_commune.empreinte_code)"""
+
+import pytest
+
+import generation_commune
+from generation_commune import charger_generateur, empreinte_code
+
+
+@pytest.mark.parametrize('module', generation_commune.MODULES_GENERATION)
+def test_empreinte_code_suit_les_modules_partages(module_corrige, monkeypatch, module):
+    generateur = charger_generateur('metallique_ouvert_compact')
+    empreinte = empreinte_code(generateur)
+    assert empreinte_code(generateur) == empreinte
+
+    modules = tuple(module_corrige(nom) if nom == module else nom
+                    for nom in generation_commune.MODULES_GENERATION)
+    monkeypatch.setattr(generation_commune, 'MODULES_GENERATION', modules)
+    assert empreinte_code(generateur) != empreinte
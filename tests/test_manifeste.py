@@ -0,0 +1,79 @@
+"""Détection des classeurs modifiés depuis leur extraction (etat_fichier)"""
+
+import os
+import time
+
+from extract_prices_and_components import etat_fichier, manifeste_fichier
+from stockage_resultats import BaseResultats
+
+AVANT = 1_600_000_000  # date de modification antérieure à l'extraction
+
+
+def _classeur(tmp_path, contenu=b'classeur', mtime=None):
+    chemin = str(tmp_path / 'MET-F-4M-N-400-G.xlsx')
+    with open(chemin, 'wb') as f:
+        f.write(contenu)
+    if mtime is not None:
+        os.utime(chemin, (mtime, mtime))
+    return chemin
+
+
+def _resultat(chemin, **champs):
+    resultat = {'chemin_complet': chemin, 'fichier': os.path.basename(chemin),
+                'prix_avant_reduction': 4308.33, 'prix_apres_reduction': 2800.41,
+                'date_extraction': '2021-01-01 00:00:00'}
+    resultat.update(champs)
+    return resultat
+
+
+def test_nouveau_et_inchange_avec_manifeste(tmp_path):
+    chemin = _classeur(tmp_path)
+    assert etat_fichier(chemin, None) == ('nouveau', None)
+    with open(chemin, 'rb') as f:
+        manifeste = manifeste_fichier(os.stat(chemin), f.read())
+    assert etat_fichier(chemin, _resultat(chemin, manifeste=manifeste)) == ('inchange', None)
+
+
+def test_contenu_modifie(tmp_path):
+    chemin = _classeur(tmp_path)
+    with open(chemin, 'rb') as f:
+        manifeste = manifeste_fichier(os.stat(chemin), f.read())
+    _classeur(tmp_path, b'classeur regenere')
+    assert etat_fichier(chemin, _resultat(chemin, manifeste=manifeste))[0] == 'modifie'
+
+
+def test_date_seule_modifiee_renouvelle_le_manifeste(tmp_path):
+    chemin = _classeur(tmp_path)
+    with open(chemin, 'rb') as f:
+        manifeste = manifeste_fichier(os.stat(chemin), f.read())
+    os.utime(chemin, (time.time() + 10, time.time() + 10))
+    etat, nouveau = etat_fichier(chemin, _resultat(chemin, manifeste=manifeste))
+    assert etat == 'inchange'
+    assert nouveau['sha256'] == manifeste['sha256'] and nouveau['mtime_ns'] != manifeste['mtime_ns']
+
+
+def test_resultat_sans_manifeste(tmp_path):
+    chemin = _classeur(tmp_path, mtime=AVANT)
+    etat, nouveau = etat_fichier(chemin, _resultat(chemin))
+    assert etat == 'inchange' and nouveau is not None
+    _classeur(tmp_path, b'classeur regenere')
+    assert etat_fichier(chemin, _resultat(chemin))[0] == 'modifie'
+
+
+def test_perime_reste_modifie_apres_un_echec(tmp_path, monkeypatch):
+    """Réextraction échouée : les anciens prix ne redeviennent pas à jour"""
+    monkeypatch.chdir(tmp_path)
+    chemin = _classeur(tmp_path)  # régénéré après l'extraction du 2021-01-01
+    base = BaseResultats(str(tmp_path / 'resultats.sqlite'), str(tmp_path / 'resultats_tous.json'))
+    base.enregistrer(_resultat(chemin))
+    assert etat_fichier(chemin, base.resultat(chemin))[0] == 'modifie'
+    base.enregistrer({'chemin_complet': chemin, 'perime': True})
+    # Échec de la réextraction dans Excel (voir main) : seule l'erreur est enregistrée
+    base.enregistrer({'chemin_complet': chemin, 'tentative': 2, 'erreur': 'Timeout'})
+    resultat = base.resultat(chemin)
+    assert resultat['date_extraction'] == '2021-01-01 00:00:00'
+    assert etat_fichier(chemin, resultat) == ('modifie', None)
+    # Date d'extraction rafraîchie par un run antérieur : le marqueur suffit
+    base.enregistrer({'chemin_complet': chemin, 'date_extraction': '2099-01-01 00:00:00'})
+    assert etat_fichier(chemin, base.resultat(chemin)) == ('modifie', None)
+    base.fermer()
@@ -0,0 +1,28 @@
+"""Cache des classeurs construits à la demande (materialisation.py)"""
+
+import os
+
+import materialisation
+from caches import CacheDisque
+from conftest import RACINE
+from materialisation import TAILLE_MAX_DISQUE, Materialiseur
+from registre_templates import RegistreTemplates
+
+SKU = 'MET-F-7M-P-1000-PT'
+
+
+def _materialiseur(dossier_cache):
+    return Materialiseur(cache_disque=CacheDisque(str(dossier_cache), TAILLE_MAX_DISQUE), racine=RACINE,
+                         registre=RegistreTemplates(None))
+
+
+def test_cache_invalide_par_le_code_de_generation(tmp_path, monkeypatch):
+    cache = tmp_path / 'cache'
+    contenu = _materialiseur(cache).materialiser(SKU)
+    assert _materialiseur(cache).materialiser(SKU) == contenu
+    assert len(os.listdir(cache)) == 1
+
+    # Autre code de génération (voir empreinte_code) : nouvelle entrée de cache
+    monkeypatch.setattr(materialisation, 'empreinte_code', lambda generateur: 'c' * 64)
+    assert _materialiseur(cache).materialiser(SKU) == contenu
+    assert len(os.listdir(cache)) == 2
@@ -0,0 +1,37 @@
+"""planifier() peut être un générateur : les étapes qui comptent ou indexent le plan le développent"""
+
+import planifier_generation
+import verifier_determinisme
+from conftest import RACINE
+from generation_commune import charger_generateur
+
+TYPE_ABRI = 'metallique_ouvert_compact'
+
+
+class PlanEnGenerateur:
+    """Script generate_*.py dont planifier() est un générateur"""
+
+    def __init__(self, generateur):
+        self.generateur = generateur
+
+    def __getattr__(self, nom):
+        return getattr(self.generateur, nom)
+
+    def planifier(self):
+        yield from self.generateur.planifier()
+
+
+def _charger(type_abri):
+    return PlanEnGenerateur(charger_generateur(type_abri))
+
+
+def test_planifier_generation(tmp_path, monkeypatch):
+    monkeypatch.setattr(planifier_generation, 'charger_generateur', _charger)
+    plan = planifier_generation.planifier_type(TYPE_ABRI, str(tmp_path))
+    assert plan['variants_planifies'] == len(charger_generateur(TYPE_ABRI).planifier())
+
+
+def test_verifier_determinisme(monkeypatch):
+    monkeypatch.chdir(RACINE)
+    monkeypatch.setattr(verifier_determinisme, 'charger_generateur', _charger)
+    assert len(verifier_determinisme.empreintes([TYPE_ABRI], nombre=2)['classeurs']) == 2
@@ -0,0 +1,31 @@
+"""Estimations de planifier_generation.py"""
+
+import json
+import os
+
+from generation_commune import FICHIER_METRIQUES
+from planifier_generation import planifier_generation, planifier_type
+
+TYPE_ABRI = 'metallique_ouvert_compact'
+
+
+def test_duree_inconnue_sans_metriques(tmp_path):
+    # Classeurs écrits au même instant (checkout git) : aucune durée n'en est déduite
+    dossier = tmp_path / TYPE_ABRI
+    dossier.mkdir()
+    for nom in ('MET-COMPACT-2M-N-250-G.xlsx', 'MET-COMPACT-3M-N-250-G.xlsx'):
+        (dossier / nom).write_bytes(b'classeur')
+        os.utime(dossier / nom, (1_600_000_000, 1_600_000_000))
+    plan = planifier_type(TYPE_ABRI, str(tmp_path))
+    assert plan['secondes_estimees'] is None and plan['source_duree'] == 'inconnue'
+    assert planifier_generation([TYPE_ABRI], str(tmp_path))['secondes_estimees'] is None
+
+
+def test_duree_d_apres_metriques(tmp_path):
+    dossier = tmp_path / TYPE_ABRI
+    dossier.mkdir()
+    with open(dossier / FICHIER_METRIQUES, 'w', encoding='utf-8') as f:
+        json.dump({'variants': 20, 'duree_secondes': 10.0}, f)
+    plan = planifier_type(TYPE_ABRI, str(tmp_path))
+    assert plan['secondes_estimees'] == round(plan['fichiers'] * 0.5, 1)
+    assert plan['source_duree'] == FICHIER_METRIQUES
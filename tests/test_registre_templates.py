@@ -0,0 +1,28 @@
+"""Cache disque des templates (registre_templates.py)"""
+
+import os
+
+import registre_templates
+from caches import CacheDisque
+from conftest import RACINE
+from registre_templates import TAILLE_MAX_DISQUE, RegistreTemplates
+
+
+def test_cache_invalide_par_le_code_de_preparation(tmp_path, module_corrige, monkeypatch):
+    cache = tmp_path / 'cache'
+    with open(os.path.join(RACINE, 'fichier de base', 'nepastoucher.xlsx'), 'rb') as f:
+        contenu = f.read()
+
+    def contenu_base():
+        registre = RegistreTemplates(CacheDisque(str(cache), TAILLE_MAX_DISQUE), alleger=False)
+        return registre.depuis_contenu(contenu).contenu_base()
+
+    base = contenu_base()
+    assert contenu_base() == base
+    assert len(os.listdir(cache)) == 1
+
+    # Correction de xlsx_brut.py : la base préparée n'est pas relue du cache
+    monkeypatch.setattr(registre_templates, 'MODULES_PREPARATION',
+                        ('alleger_template.py', module_corrige('xlsx_brut.py')))
+    assert contenu_base() == base
+    assert len(os.listdir(cache)) == 2
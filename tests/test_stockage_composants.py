@@ -0,0 +1,50 @@
+"""Stockage normalisé des composants (stockage_composants.py)"""
+
+from stockage_composants import (ENTETE, LIGNE_VIDE, StockageComposants, composants_types,
+                                 grille_composants)
+
+
+def _grille(*articles):
+    """Grille A2:E110 : en-tête, articles (code, article, description, quantité, unité), remplissage"""
+    grille = [list(ENTETE)] + [list(article) for article in articles]
+    return grille + [list(LIGNE_VIDE)] * (109 - len(grille))
+
+
+GRILLE_A = _grille([1, '43.06.14.0043', 'Poteau', '4', 'st'], [3, '43.06.20.0001', 'Toit', '1', 'st'])
+GRILLE_B = _grille([1, '43.06.14.0043', 'Poteau', '6', 'st'], [2, '43.07.00.0100', 'Bardage', '12', 'm'])
+
+
+def test_composants_types_et_grille():
+    composants = composants_types(GRILLE_A)
+    assert composants['ligne'] == [3, 4]
+    assert composants['quantite'] == [4, 1]
+    assert composants_types(grille_composants(composants)) == composants
+
+
+def test_relecture(tmp_path):
+    stockage = StockageComposants(str(tmp_path))
+    stockage.enregistrer('metallique_ferme', 'MET-F-4M-N-400-G.xlsx', 'a', GRILLE_A)
+    stockage.enregistrer('metallique_ferme', 'MET-F-4M-N-400-PT.xlsx', 'b', GRILLE_A)
+    stockage.fermer()
+    relu = StockageComposants(str(tmp_path))
+    assert relu.composants('MET-F-4M-N-400-PT') == composants_types(GRILLE_A)
+    assert len(relu.nomenclatures) == 1
+    relu.fermer()
+
+
+def test_deux_processus_ecrivent_en_meme_temps(tmp_path):
+    """Deux écrivains ouverts sur le même dossier : pas de collision d'identifiants, index complet"""
+    a = StockageComposants(str(tmp_path))
+    b = StockageComposants(str(tmp_path))
+    a.enregistrer('metallique_ferme', 'MET-F-4M-N-400-G.xlsx', 'a', GRILLE_A)
+    b.enregistrer('metallique_ferme', 'MET-F-5M-N-400-G.xlsx', 'b', GRILLE_B)
+    a.fermer()  # compacte l'index pendant que b écrit encore
+    b.enregistrer('metallique_ferme', 'MET-F-6M-N-400-G.xlsx', 'c', GRILLE_B)
+    b.fermer()
+
+    relu = StockageComposants(str(tmp_path))
+    assert relu.skus() == ['MET-F-4M-N-400-G', 'MET-F-5M-N-400-G', 'MET-F-6M-N-400-G']
+    assert relu.composants('MET-F-4M-N-400-G') == composants_types(GRILLE_A)
+    assert relu.composants('MET-F-5M-N-400-G') == composants_types(GRILLE_B)
+    assert relu.composants('MET-F-6M-N-400-G') == composants_types(GRILLE_B)
+    relu.fermer()
@@ -0,0 +1,81 @@
+"""Base SQLite et journal des résultats (stockage_resultats.py)"""
+
+import itertools
+import json
+
+import pytest
+
+import stockage_resultats
+from stockage_resultats import BaseResultats, JournalResultats
+
+CHEMIN_A = 'résultats/metallique_ferme/MET-F-4M-N-400-G.xlsx'
+CHEMIN_B = 'résultats/metallique_ferme/MET-F-5M-N-400-G.xlsx'
+
+
+def _ouvrir(stockage, dossier):
+    resultats_json = str(dossier / 'resultats_tous.json')
+    if stockage == 'sqlite':
+        return BaseResultats(str(dossier / 'resultats.sqlite'), resultats_json)
+    return JournalResultats(str(dossier / 'resultats.journal.jsonl'), resultats_json, None)
+
+
+@pytest.mark.parametrize('stockage', ['sqlite', 'journal'])
+def test_fusion_retrait_et_relecture(tmp_path, stockage):
+    base = _ouvrir(stockage, tmp_path)
+    base.enregistrer({'chemin_complet': CHEMIN_A, 'type_abri': 'metallique_ferme',
+                      'prix_avant_reduction': 1000.0, 'prix_apres_reduction': 900.0})
+    base.enregistrer({'chemin_complet': CHEMIN_B, 'prix_avant_reduction': 1100.0})
+    # Mise à jour partielle : les autres champs sont gardés
+    base.enregistrer({'chemin_complet': CHEMIN_A, 'tentative': 2})
+    assert base.resultat(CHEMIN_A)['prix_apres_reduction'] == 900.0
+    assert base.resultat(CHEMIN_A)['tentative'] == 2
+    assert [r['chemin_complet'] for r in base.par_sku('MET-F-4M-N-400-G')] == [CHEMIN_A]
+    assert base.retirer([CHEMIN_B, 'absent.xlsx']) == 1
+    base.exporter()
+    base.fermer()
+
+    with open(tmp_path / 'resultats_tous.json', encoding='utf-8') as f:
+        assert [r['chemin_complet'] for r in json.load(f)['resultats']] == [CHEMIN_A]
+    relu = _ouvrir(stockage, tmp_path)
+    assert list(relu.resultats()) == [CHEMIN_A]
+    assert relu.resultat(CHEMIN_A)['tentative'] == 2
+    relu.fermer()
+
+
+def test_journal_rejoue_apres_arret_brutal(tmp_path):
+    journal = _ouvrir('journal', tmp_path)
+    journal.enregistrer({'chemin_complet': CHEMIN_A, 'prix_avant_reduction': 1000.0})
+    journal.enregistrer({'chemin_complet': CHEMIN_B, 'prix_avant_reduction': 1100.0})
+    journal.retirer([CHEMIN_B])
+    journal.fichier.write('{"chemin_complet": "tronq')  # arrêt pendant l'écriture
+    journal.fichier.close()  # pas de fermer() : resultats_tous.json n'a jamais été écrit
+
+    relu = _ouvrir('journal', tmp_path)
+    assert relu.rejoues == 3
+    assert list(relu.resultats()) == [CHEMIN_A]
+    # Nouvel enregistrement après le rejeu, puis nouvel arrêt brutal : il n'est pas perdu
+    relu.enregistrer({'chemin_complet': CHEMIN_B, 'prix_avant_reduction': 1200.0})
+    relu.fichier.close()
+
+    relu = _ouvrir('journal', tmp_path)
+    assert list(relu.resultats()) == [CHEMIN_A, CHEMIN_B]
+    assert relu.resultat(CHEMIN_B)['prix_avant_reduction'] == 1200.0
+    relu.fermer()
+
+
+def test_base_reimporte_un_export_du_journal(tmp_path, monkeypatch):
+    # date_derniere_maj est à la seconde : une date distincte par export
+    secondes = itertools.count()
+    monkeypatch.setattr(stockage_resultats, '_maintenant', lambda: f'2026-01-01 00:00:{next(secondes):02d}')
+    base = _ouvrir('sqlite', tmp_path)
+    base.enregistrer({'chemin_complet': CHEMIN_A, 'prix_avant_reduction': 1000.0})
+    base.exporter()
+    base.fermer()
+
+    journal = _ouvrir('journal', tmp_path)
+    journal.enregistrer({'chemin_complet': CHEMIN_B, 'prix_avant_reduction': 1100.0})
+    journal.fermer()
+
+    base = _ouvrir('sqlite', tmp_path)
+    assert list(base.resultats()) == [CHEMIN_A, CHEMIN_B]
+    base.fermer()
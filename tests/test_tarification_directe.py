@@ -0,0 +1,81 @@
+"""Calcul direct des prix (tarification_directe.tarifer_type), sans Excel"""
+
+import os
+
+from conftest import RACINE
+from extract_prices_and_components import etat_fichier
+from generation_commune import charger_generateur
+from registre_templates import RegistreTemplates
+from stockage_composants import StockageComposants
+from stockage_resultats import BaseResultats
+from tarification_directe import EcritureClasseurs, tarifer_type
+
+
+class MoteurEnPanne:
+    def calculer(self, delta):
+        raise RuntimeError("Excel ne répond pas")
+
+
+class MoteurFictif:
+    def calculer(self, delta):
+        return {'prix_brut': 4308.33, 'remise': -1507.92, 'prix_net': 2800.41,
+                'composants': [['Import code', 'Article code', 'Description', 'Quantity', 'Unit'],
+                               ['X1', 'ART-1', 'Poteau', '4', 'pc']]}
+
+
+def _tarifer(tmp_path, moteur, base, classeurs=None):
+    registre = RegistreTemplates(None)
+    generateur = charger_generateur('metallique_ouvert_compact')
+    empreinte = registre.template(generateur.source_file).empreinte
+    composants = StockageComposants(str(tmp_path / 'composant'))
+    try:
+        return tarifer_type(generateur, {empreinte: moteur}, base, composants, classeurs=classeurs,
+                            registre=registre, resultats_dir=str(tmp_path / 'résultats'))
+    finally:
+        composants.fermer()
+        if classeurs is not None:
+            classeurs.fermer()
+
+
+def test_echec_excel_garde_les_prix_extraits(tmp_path, monkeypatch):
+    monkeypatch.chdir(RACINE)
+    base = BaseResultats(str(tmp_path / 'resultats.sqlite'), str(tmp_path / 'resultats_tous.json'))
+    chemin = os.path.join(str(tmp_path / 'résultats'), 'metallique_ouvert_compact', 'MET-COMPACT-2M-N-250-G.xlsx')
+    base.enregistrer({'chemin_complet': chemin, 'fichier': 'MET-COMPACT-2M-N-250-G.xlsx',
+                      'prix_avant_reduction': 1000.0, 'prix_apres_reduction': 650.0,
+                      'date_extraction': '2026-01-01 00:00:00'})
+
+    succes, sans_prix = _tarifer(tmp_path, MoteurEnPanne(), base)
+    assert succes == 0 and 'MET-COMPACT-2M-N-250-G' in sans_prix
+    resultat = base.resultat(chemin)
+    assert (resultat['prix_avant_reduction'], resultat['prix_apres_reduction']) == (1000.0, 650.0)
+    assert resultat['date_extraction'] == '2026-01-01 00:00:00'
+    assert resultat['erreur'].startswith('Erreur Excel')
+    # Variant sans résultat antérieur : enregistré sans prix
+    autre = base.resultat(os.path.join(str(tmp_path / 'résultats'), 'metallique_ouvert_compact', 'MET-COMPACT-6M-P-250-PT.xlsx'))
+    assert autre['prix_avant_reduction'] is None
+
+    succes, sans_prix = _tarifer(tmp_path, MoteurFictif(), base)
+    assert not sans_prix
+    resultat = base.resultat(chemin)
+    assert resultat['prix_apres_reduction'] == 2800.41 and resultat['erreur'] is None
+    base.fermer()
+
+
+def test_echec_excel_avec_classeurs_perime_les_prix(tmp_path, monkeypatch):
+    """Le classeur réécrit reçoit un manifeste neuf : ses anciens prix doivent rester à refaire"""
+    monkeypatch.chdir(RACINE)
+    base = BaseResultats(str(tmp_path / 'resultats.sqlite'), str(tmp_path / 'resultats_tous.json'))
+    chemin = os.path.join(str(tmp_path / 'résultats'), 'metallique_ouvert_compact', 'MET-COMPACT-2M-N-250-G.xlsx')
+    base.enregistrer({'chemin_complet': chemin, 'fichier': 'MET-COMPACT-2M-N-250-G.xlsx',
+                      'prix_avant_reduction': 1000.0, 'prix_apres_reduction': 650.0,
+                      'date_extraction': '2026-01-01 00:00:00'})
+
+    _tarifer(tmp_path, MoteurEnPanne(), base, EcritureClasseurs(base, str(tmp_path / 'résultats')))
+    resultat = base.resultat(chemin)
+    assert resultat['manifeste'] is not None and resultat['prix_apres_reduction'] == 650.0
+    assert etat_fichier(chemin, resultat) == ('modifie', None)
+
+    _tarifer(tmp_path, MoteurFictif(), base, EcritureClasseurs(base, str(tmp_path / 'résultats')))
+    assert etat_fichier(chemin, base.resultat(chemin))[0] == 'inchange'
+    base.fermer()
@@ -0,0 +1,18 @@
+"""Détection des types à régénérer (veille.py)"""
+
+import registre_templates
+import veille
+from conftest import RACINE
+from generation_commune import charger_generateur
+from registre_templates import RegistreTemplates
+
+
+def test_cle_type_suit_empreinte_code(monkeypatch):
+    monkeypatch.chdir(RACINE)
+    monkeypatch.setattr(registre_templates, '_registre', RegistreTemplates(None))
+    generateur = charger_generateur('metallique_ouvert_compact')
+    monkeypatch.setattr(veille, 'empreinte_code', lambda g: 'a' * 64)
+    cle = veille.cle_type(generateur)
+    assert cle.endswith('-' + 'a' * 16)
+    monkeypatch.setattr(veille, 'empreinte_code', lambda g: 'b' * 64)
+    assert veille.cle_type(generateur) != cle
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mode veille : régénère et recalcule les prix dès que le fichier de base change
+==============================================================================
+
+Surveille fichier de base/ et, quand nepastoucher.xlsx est déposé ou modifié
+(après DELAI_STABILITE secondes sans nouvelle écriture), enchaîne uniquement
+les étapes nécessaires :
+1. template allégé (alleger_template.py), s'il n'est plus à jour
+2. régénération incrémentale : seuls les types dont le template, le script ou
+   le code de génération commun (generation_commune.MODULES_GENERATION) a
+   changé sont régénérés, et seuls les classeurs dont les octets changent
+   sont réécrits (la génération est déterministe) ; les fichiers hors plan
+   sont supprimés
+3. recalcul des prix des classeurs réécrits (extract_prices_and_components.py,
+   macOS + Excel) : leurs anciens prix sont d'abord retirés des résultats
+   (resultats.sqlite, exportés dans resultats_tous.json)
+4. mise à jour des résultats : resultats_tous.json ne contient plus de prix
+   obsolètes ni de fichiers supprimés
+
+L'état, les étapes et leurs durées sont écrits dans veille.log ; l'état des
+types déjà générés est gardé dans .veille_etat.json (une veille relancée ne
+refait pas ce qui est à jour).
+
+Surveillance par inotify (Linux) si inotify_simple est installé
+(pip install inotify_simple), sinon par sondage toutes les INTERVALLE_SONDAGE s.
+
+Utilisation :
+    python veille.py               # veille jusqu'à Ctrl+C
+    python veille.py --une-fois    # traite l'état actuel puis s'arrête
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from generation_commune import (RESULTATS_DIR, TYPES_ABRIS, SortieDossier, charger_generateur,
+                                choisir_template, empreinte_code, generer_type)
+from registre_templates import registre_par_defaut
+from stockage_resultats import FICHIER_BASE, FICHIER_JOURNAL, ouvrir_stockage
+
+BASE_DIR = 'fichier de base'
+SOURCE_FILE = os.path.join(BASE_DIR, 'nepastoucher.xlsx')
+RESULTATS_JSON = 'resultats_tous.json'
+FICHIER_LOG = 'veille.log'
+FICHIER_ETAT = '.veille_etat.json'
+DELAI_STABILITE = 3.0     # s sans écriture avant de traiter (Excel enregistre en plusieurs fois)
+INTERVALLE_SONDAGE = 2.0  # s, sans inotify
+
+journal = logging.getLogger('veille')
+
+
+def _sha256(chemin):
+    empreinte = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1024 * 1024), b''):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+def _signature(chemin):
+    """(taille, date de modification) ou None si le fichier est absent"""
+    try:
+        infos = os.stat(chemin)
+    except OSError:
+        return None
+    return infos.st_size, infos.st_mtime
+
+
+# ---------------------------------------------------------------------------
+# Surveillance
+# ---------------------------------------------------------------------------
+
+class ObservateurSondage:
+    """Détecte un changement de taille ou de date du fichier surveillé"""
+
+    def __init__(self, chemin, intervalle=INTERVALLE_SONDAGE):
+        self.chemin = chemin
+        self.intervalle = intervalle
+        self.signature = _signature(chemin)
+
+    def attendre(self, timeout=None):
+        """Vrai dès que le fichier a changé ; Faux si timeout est écoulé"""
+        debut = time.monotonic()
+        while timeout is None or time.monotonic() - debut < timeout:
+            time.sleep(self.intervalle if timeout is None else min(self.intervalle, timeout))
+            signature = _signature(self.chemin)
+            if signature != self.signature:
+                self.signature = signature
+                return True
+        return False
+
+    def fermer(self):
+        pass
+
+
+class ObservateurInotify:
+    """Événements inotify du dossier, filtrés sur le nom du fichier surveillé"""
+
+    def __init__(self, chemin):
+        from inotify_simple import INotify, flags
+
+        self.nom = os.path.basename(chemin)
+        self.inotify = INotify()
+        self.inotify.add_watch(os.path.dirname(chemin) or '.',
+                               flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY)
+
+    def attendre(self, timeout=None):
+        fin = None if timeout is None else time.monotonic() + timeout
+        while True:
+            restant = None if fin is None else max(0, fin - time.monotonic())
+            evenements = self.inotify.read(timeout=None if restant is None else int(restant * 1000))
+            if any(evenement.name == self.nom for evenement in evenements):
+                return True
+            if fin is not None and time.monotonic() >= fin:
+                return False
+
+    def fermer(self):
+        self.inotify.close()
+
+
+def creer_observateur(chemin):
+    """inotify si disponible, sinon sondage"""
+    try:
+        observateur = ObservateurInotify(chemin)
+        journal.info("👀 Surveillance par inotify")
+        return observateur
+    except (ImportError, OSError):
+        journal.info(f"👀 Surveillance par sondage toutes les {INTERVALLE_SONDAGE:g} s "
+                     f"(pip install inotify_simple pour inotify)")
+        return ObservateurSondage(chemin)
+
+
+def attendre_stabilite(observateur, chemin, delai=DELAI_STABILITE):
+    """Attend que le fichier ne soit plus écrit pendant delai secondes (anti-rebond)"""
+    while True:
+        signature = _signature(chemin)
+        if observateur.attendre(timeout=delai):
+            continue
+        if signature is not None and _signature(chemin) == signature:
+            return
+
+
+# ---------------------------------------------------------------------------
+# Étapes
+# ---------------------------------------------------------------------------
+
+class SortieIncrementale(SortieDossier):
+    """SortieDossier qui ne réécrit un classeur que si ses octets changent"""
+
+    def __init__(self, resultats_dir=RESULTATS_DIR):
+        super().__init__(resultats_dir, nettoyer=False)
+        self.reecrits = []
+
+    def journal(self, type_abri, cle):
+        # Pas de reprise : les classeurs écrits avant une interruption ne seraient
+        # pas comptés dans reecrits, et leurs prix resteraient dans resultats_tous.json
+        return None
+
+    def ecrire(self, type_abri, nom_fichier, contenu):
+        chemin = os.path.join(self.dossier(type_abri), nom_fichier)
+        try:
+            with open(chemin, 'rb') as f:
+                if f.read() == contenu:
+                    return
+        except OSError:
+            pass
+        super().ecrire(type_abri, nom_fichier, contenu)
+        self.reecrits.append(chemin)
+
+
+def charger_etat():
+    try:
+        with open(FICHIER_ETAT, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'types': {}}
+
+
+def enregistrer_etat(etat):
+    with open(FICHIER_ETAT, 'w', encoding='utf-8') as f:
+        json.dump(etat, f, indent=2, ensure_ascii=False)
+
+
+def preparer_template():
+    """Étape 1 : template allégé ; Faux s'il n'a pas pu être créé (le fichier de base est utilisé)"""
+    if choisir_template(SOURCE_FILE) != SOURCE_FILE:
+        return True
+    result = subprocess.run([sys.executable, 'alleger_template.py'], capture_output=True, text=True)
+    if result.returncode != 0:
+        derniere_ligne = result.stdout.strip().splitlines()[-1:] or ['']
+        journal.warning(f"⚠️  Template allégé non créé : {derniere_ligne[0]}")
+        return False
+    return True
+
+
+def cle_type(generateur):
+    """Empreinte des entrées d'un type : template utilisé + code de génération (voir empreinte_code)"""
+    template = registre_par_defaut().template(generateur.source_file).contenu
+    return f'{hashlib.sha256(template).hexdigest()[:16]}-{empreinte_code(generateur)[:16]}'
+
+
+def regenerer(etat, types_abris=TYPES_ABRIS, resultats_dir=RESULTATS_DIR):
+    """Étape 2 : (classeurs réécrits, classeurs supprimés) des types dont les entrées ont changé"""
+    reecrits, supprimes = [], []
+    for type_abri in types_abris:
+        generateur = charger_generateur(type_abri)
+        if not os.path.exists(generateur.source_file):
+            continue
+        cle = cle_type(generateur)
+        if etat['types'].get(type_abri) == cle:
+            continue
+
+        debut = time.perf_counter()
+        sortie = SortieIncrementale(resultats_dir)
+        # Le détail de chaque variant n'a pas sa place dans le journal
+        with contextlib.redirect_stdout(io.StringIO()):
+            fichiers = generer_type(generateur, sortie)
+
+        dossier = sortie.dossier(type_abri)
+        planifies = set(fichiers)
+        for nom in sorted(os.listdir(dossier)):
+            if nom.endswith('.xlsx') and nom not in planifies:
+                os.remove(os.path.join(dossier, nom))
+                supprimes.append(os.path.join(dossier, nom))
+
+        etat['types'][type_abri] = cle
+        reecrits += sortie.reecrits
+        journal.info(f"   🔄 {type_abri} : {len(sortie.reecrits)} / {len(fichiers)} classeurs réécrits "
+                     f"({time.perf_counter() - debut:.1f} s)")
+    return reecrits, supprimes
+
+
+def retirer_resultats(chemins):
+    """
+    Retire les prix des classeurs réécrits ou supprimés du stockage des résultats
+    (stockage_resultats), puis réexporte resultats_tous.json
+    """
+    if not chemins or not any(os.path.exists(f) for f in (RESULTATS_JSON, FICHIER_BASE, FICHIER_JOURNAL)):
+        return 0
+    base = ouvrir_stockage(resultats_json=RESULTATS_JSON, intervalle_compaction=None)
+    try:
+        retires = base.retirer(chemins)
+        if retires:
+            base.exporter()
+        return retires
+    finally:
+        base.fermer()
+
+
+def recalculer_prix(fichier_log=FICHIER_LOG):
+    """Étape 3 : extraction des prix manquants (macOS + Excel uniquement), sortie dans le journal"""
+    if shutil.which('osascript') is None:
+        journal.warning("⚠️  Excel (AppleScript) indisponible : prix à recalculer sur macOS "
+                        "avec extract_prices_and_components.py")
+        return False
+    with open(fichier_log, 'a', encoding='utf-8') as log:
+        result = subprocess.run([sys.executable, 'extract_prices_and_components.py'],
+                                stdout=log, stderr=subprocess.STDOUT, text=True)
+    if result.returncode != 0:
+        journal.warning(f"⚠️  Extraction terminée avec le code {result.returncode}")
+    return result.returncode == 0
+
+
+def traiter(etat, types_abris=TYPES_ABRIS, fichier_log=FICHIER_LOG):
+    """Enchaîne les étapes nécessaires pour l'état actuel du fichier de base"""
+    if not os.path.exists(SOURCE_FILE):
+        journal.warning(f"⚠️  {SOURCE_FILE} absent")
+        return
+    empreinte = _sha256(SOURCE_FILE)
+    journal.info(f"📄 {SOURCE_FILE} : {empreinte[:16]}")
+    debut = time.perf_counter()
+    durees = {}
+
+    etape = time.perf_counter()
+    preparer_template()
+    durees['template'] = time.perf_counter() - etape
+
+    etape = time.perf_counter()
+    reecrits, supprimes = regenerer(etat, types_abris)
+    durees['génération'] = time.perf_counter() - etape
+    etat['source_sha256'] = empreinte
+    etat['date'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    enregistrer_etat(etat)
+
+    etape = time.perf_counter()
+    retires = retirer_resultats(reecrits + supprimes)
+    if reecrits:
+        recalculer_prix(fichier_log)
+    durees['prix'] = time.perf_counter() - etape
+
+    journal.info(f"✅ {len(reecrits)} classeur(s) réécrit(s), {len(supprimes)} supprimé(s), "
+                 f"{retires} prix retiré(s) de {RESULTATS_JSON} en {time.perf_counter() - debut:.1f} s "
+                 f"({', '.join(f'{nom} {duree:.1f} s' for nom, duree in durees.items())})")
+
+
+def configurer_journal(fichier_log=FICHIER_LOG):
+    journal.setLevel(logging.INFO)
+    format_log = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    for gestionnaire in (logging.FileHandler(fichier_log, encoding='utf-8'), logging.StreamHandler()):
+        gestionnaire.setFormatter(format_log)
+        journal.addHandler(gestionnaire)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Régénère et recalcule les prix quand le fichier de base change")
+    parser.add_argument('--types', nargs='+', choices=TYPES_ABRIS, default=TYPES_ABRIS)
+    parser.add_argument('--une-fois', action='store_true', help="Traiter l'état actuel puis s'arrêter")
+    parser.add_argument('--delai', type=float, default=DELAI_STABILITE,
+                        help="Secondes sans écriture avant de traiter (défaut : %(default)s)")
+    parser.add_argument('--log', default=FICHIER_LOG, help="Fichier journal (défaut : %(default)s)")
+    args = parser.parse_args()
+
+    configurer_journal(args.log)
+    etat = charger_etat()
+    journal.info("=" * 60)
+    journal.info(f"🚀 Veille de {SOURCE_FILE}")
+
+    # Observateur créé avant le premier traitement : un dépôt pendant celui-ci n'est pas perdu
+    observateur = None if args.une_fois else creer_observateur(SOURCE_FILE)
+    # Rattraper un changement survenu pendant que la veille était arrêtée
+    traiter(etat, args.types, args.log)
+    if observateur is None:
+        return
+
+    try:
+        while True:
+            observateur.attendre()
+            journal.info(f"📥 Changement détecté, attente de {args.delai:g} s sans écriture")
+            attendre_stabilite(observateur, SOURCE_FILE, args.delai)
+            try:
+                traiter(etat, args.types, args.log)
+            except Exception as e:
+                # Une erreur (fichier illisible, déposé à moitié...) ne doit pas arrêter la veille
+                journal.exception(f"❌ Erreur : {e}")
+    except KeyboardInterrupt:
+        journal.info("⏹️  Veille arrêtée")
+    finally:
+        observateur.fermer()
+
+
+if __name__ == '__main__':
+    main()
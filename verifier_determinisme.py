@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vérifie que la génération est déterministe (mêmes entrées -> même SHA-256)
+==========================================================================
+
+Construit un échantillon de variants de chaque type plusieurs fois, dans des
+processus séparés aux environnements différents (fuseau horaire, langue,
+PYTHONHASHSEED, heure de lancement), et compare les SHA-256 des classeurs.
+
+Entre deux machines : --enregistrer écrit les empreintes dans un fichier JSON,
+--comparer les compare avec celles d'une autre machine. La comparaison n'a de
+sens qu'avec le même template et la même version d'openpyxl (vérifiés).
+
+Utilisation :
+    python verifier_determinisme.py
+    python verifier_determinisme.py --types metallique_ferme --nombre 10
+    python verifier_determinisme.py --enregistrer empreintes.json   # machine A
+    python verifier_determinisme.py --comparer empreintes.json      # machine B
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+
+from generation_commune import TYPES_ABRIS, charger_generateur, choisir_template, construire_classeur
+
+NOMBRE_PAR_TYPE = 3
+# Environnements des exécutions comparées
+ENVIRONNEMENTS = [
+    {'TZ': 'UTC', 'LC_ALL': 'C', 'PYTHONHASHSEED': '0'},
+    {'TZ': 'Pacific/Auckland', 'LC_ALL': 'C.UTF-8', 'PYTHONHASHSEED': '4242'},
+]
+
+
+def _echantillon(variants, nombre):
+    """nombre variants répartis sur tout le plan (premier et dernier compris)"""
+    if len(variants) <= nombre:
+        return variants
+    if nombre == 1:
+        return variants[:1]
+    return [variants[i * (len(variants) - 1) // (nombre - 1)] for i in range(nombre)]
+
+
+def empreintes(types_abris, nombre=NOMBRE_PAR_TYPE, deterministe=True):
+    """
+    {'templates': {type: sha256 du template}, 'classeurs': {SKU: sha256 du classeur}}
+    Les types dont le fichier de base est absent sont ignorés.
+    """
+    resultat = {'templates': {}, 'classeurs': {}}
+    for type_abri in types_abris:
+        generateur = charger_generateur(type_abri)
+        if not os.path.exists(generateur.source_file):
+            continue
+        with open(choisir_template(generateur.source_file), 'rb') as f:
+            template = f.read()
+        resultat['templates'][type_abri] = hashlib.sha256(template).hexdigest()
+        for variant in _echantillon(list(generateur.planifier()), nombre):
+            contenu = construire_classeur(template, generateur.configurer, variant, deterministe)
+            resultat['classeurs'][variant['fichier']] = hashlib.sha256(contenu).hexdigest()
+    return resultat
+
+
+def _versions():
+    import openpyxl
+    return {'openpyxl': openpyxl.__version__, 'python': platform.python_version()}
+
+
+def _executer(types_abris, nombre, environnement):
+    """Calcule les empreintes dans un nouveau processus Python"""
+    commande = [sys.executable, os.path.abspath(__file__), '--executer', '--nombre', str(nombre),
+                '--types', *types_abris]
+    sortie = subprocess.run(commande, env={**os.environ, **environnement}, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(sortie)
+
+
+def _differences(reference, autre):
+    """SKU dont l'empreinte diffère (ou qui manquent d'un côté)"""
+    skus = sorted(set(reference) | set(autre))
+    return [sku for sku in skus if reference.get(sku) != autre.get(sku)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie que la génération est déterministe")
+    parser.add_argument('--types', nargs='+', choices=TYPES_ABRIS, default=TYPES_ABRIS)
+    parser.add_argument('--nombre', type=int, default=NOMBRE_PAR_TYPE,
+                        help="Variants construits par type (défaut : %(default)s)")
+    parser.add_argument('--enregistrer', metavar='FICHIER', help="Écrire les empreintes (JSON)")
+    parser.add_argument('--comparer', metavar='FICHIER', help="Comparer avec les empreintes d'une autre machine")
+    parser.add_argument('--executer', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executer:
+        json.dump(empreintes(args.types, args.nombre), sys.stdout)
+        return
+
+    print("=" * 80)
+    print("VÉRIFICATION DU DÉTERMINISME DE LA GÉNÉRATION")
+    print("=" * 80)
+
+    executions = []
+    for numero, environnement in enumerate(ENVIRONNEMENTS, 1):
+        print(f"\n🔄 Exécution {numero} : " + ', '.join(f'{cle}={valeur}' for cle, valeur in environnement.items()))
+        executions.append(_executer(args.types, args.nombre, environnement))
+    reference = executions[0]
+    if not reference['classeurs']:
+        print("❌ Aucun classeur construit (fichiers de base absents ?)")
+        sys.exit(1)
+    print(f"   {len(reference['classeurs'])} classeurs, {len(reference['templates'])} types")
+
+    erreurs = 0
+    for numero, execution in enumerate(executions[1:], 2):
+        differences = _differences(reference['classeurs'], execution['classeurs'])
+        if differences:
+            erreurs += len(differences)
+            print(f"\n❌ Exécution {numero} : {len(differences)} classeur(s) différent(s) :")
+            for sku in differences:
+                print(f"   - {sku}")
+    if not erreurs:
+        print(f"\n✅ SHA-256 identiques sur {len(executions)} exécutions")
+
+    if args.comparer:
+        with open(args.comparer, 'r', encoding='utf-8') as f:
+            autre = json.load(f)
+        print(f"\n🔍 Comparaison avec {args.comparer} ({autre.get('machine', '?')})")
+        incomparables = [nom for nom in ('openpyxl',) if autre.get(nom) != _versions()[nom]]
+        incomparables += [type_abri for type_abri, sha in reference['templates'].items()
+                          if autre.get('templates', {}).get(type_abri, sha) != sha]
+        if incomparables:
+            print(f"⚠️  Entrées différentes, comparaison impossible : {', '.join(incomparables)}")
+            erreurs += 1
+        else:
+            communs = {sku: sha for sku, sha in reference['classeurs'].items() if sku in autre['classeurs']}
+            differences = _differences(communs, {sku: autre['classeurs'][sku] for sku in communs})
+            if differences:
+                erreurs += len(differences)
+                print(f"❌ {len(differences)} classeur(s) différent(s) :")
+                for sku in differences:
+                    print(f"   - {sku}")
+            else:
+                print(f"✅ {len(communs)} classeurs identiques")
+
+    if args.enregistrer:
+        with open(args.enregistrer, 'w', encoding='utf-8') as f:
+            json.dump({'machine': platform.node(), **_versions(), **reference}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Empreintes enregistrées dans {args.enregistrer}")
+
+    if erreurs:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cohérence des prix extraits, avant leur envoi dans Odoo
+=======================================================
+
+Les anomalies de prix (recalcul raté, formule cassée dans le fichier de base)
+se repéraient à l'œil dans resultats_tous.json. verifier_prix.py charge tous
+les résultats avec prix en colonnes (tableaux numpy si numpy est installé,
+listes sinon) et vérifie, pour le prix avant et le prix après réduction :
+- largeur : à type, version, traitement et profondeur égaux, un abri plus large
+  n'est pas moins cher qu'un plus étroit
+- profondeur : de même, à largeur égale
+- traitement : G (galvanisé) <= PT (thermolaqué), à dimensions et version égales
+- version : N (Standard) <= P (PLUS), à dimensions et traitement égaux
+- remise : taux de remise (1 - après / avant) entre REMISE_MIN et REMISE_MAX
+Chaque règle de monotonie est un tri par (groupe, rang) puis une comparaison des
+voisins : une suite de prix non croissante a toujours deux voisins en défaut.
+
+Les paramètres d'un variant sont lus dans son SKU (<préfixe>-<largeur>M-<N|P>-
+<profondeur en cm>-<G|PT>, comme dans les plans des generate_*.py), son type dans
+le dossier du classeur : les classeurs d'un plan antérieur sont vérifiés aussi.
+Le rapport (rapport_coherence.json) liste chaque violation (SKU, SKU de
+référence, prix, écart) et les SKU concernés ; le code de sortie est 1 s'il y a
+des violations.
+
+Utilisation :
+    python verifier_prix.py
+    python verifier_prix.py --tolerance 1 --remise-max 0.4
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # listes Python : mêmes violations, plus lent
+    np = None
+
+from generation_commune import ecrire_json_atomique
+from stockage_resultats import FICHIER_BASE, FICHIER_JOURNAL, RESULTATS_JSON, STOCKAGES, ouvrir_stockage
+
+FICHIER_RAPPORT = 'rapport_coherence.json'
+TOLERANCE = 0.01   # € : écarts d'arrondi ignorés
+REMISE_MIN = 0.0
+REMISE_MAX = 0.5
+COLONNES_PRIX = ('prix_avant_reduction', 'prix_apres_reduction')
+# Paramètres qui distinguent deux variants d'un même type
+PARAMETRES = ('version', 'treatment', 'largeur_totale', 'profondeur_totale')
+MOTIF_SKU = re.compile(r'^(?P<prefixe>.+)-(?P<largeur>\d+(?:\.\d+)?)M-(?P<version>[NP])-'
+                       r'(?P<profondeur>\d+)-(?P<traitement>G|PT)$')
+RANGS = {
+    'treatment': {'G': 0, 'PT': 1},
+    'version': {'N': 0, 'P': 1},
+}
+# Règle -> paramètre selon lequel le prix ne doit pas baisser
+REGLES = {
+    'largeur': 'largeur_totale',
+    'profondeur': 'profondeur_totale',
+    'traitement': 'treatment',
+    'version': 'version',
+}
+
+
+def _sku(chemin):
+    nom = os.path.basename(chemin)
+    return nom[:-len('.xlsx')] if nom.endswith('.xlsx') else nom
+
+
+def _prix(valeur):
+    return isinstance(valeur, (int, float)) and not isinstance(valeur, bool) and valeur > 0
+
+
+def parametres_sku(sku):
+    """{'version', 'treatment', 'largeur_totale', 'profondeur_totale'} d'un SKU, ou None"""
+    m = MOTIF_SKU.match(sku)
+    if m is None:
+        return None
+    return {
+        'version': m['version'],
+        'treatment': m['traitement'],
+        'largeur_totale': float(m['largeur']),
+        'profondeur_totale': int(m['profondeur']) / 100,
+    }
+
+
+def charger_colonnes(resultats):
+    """
+    Colonnes des résultats avec prix : {'sku', 'type', paramètres, prix}
+    (prix en tableaux numpy si numpy est installé). Retourne aussi les SKU sans
+    prix et ceux dont le nom n'est pas reconnu.
+    """
+    colonnes = {cle: [] for cle in ('sku', 'type') + PARAMETRES + COLONNES_PRIX}
+    sans_prix, non_reconnus = [], []
+    for chemin, result in sorted(resultats.items()):
+        sku = _sku(chemin)
+        if not all(_prix(result.get(colonne)) for colonne in COLONNES_PRIX):
+            sans_prix.append(sku)
+            continue
+        variant = parametres_sku(sku)
+        if variant is None:
+            non_reconnus.append(sku)
+            continue
+        colonnes['sku'].append(sku)
+        colonnes['type'].append(os.path.basename(os.path.dirname(chemin)))
+        for cle in PARAMETRES:
+            colonnes[cle].append(variant.get(cle))
+        for colonne in COLONNES_PRIX:
+            colonnes[colonne].append(float(result[colonne]))
+    if np is not None:
+        for colonne in COLONNES_PRIX:
+            colonnes[colonne] = np.array(colonnes[colonne], dtype=float)
+    return colonnes, sans_prix, non_reconnus
+
+
+def _codes(cles):
+    """Un entier par clé distincte (numéro de groupe)"""
+    numeros = {}
+    codes = [numeros.setdefault(cle, len(numeros)) for cle in cles]
+    return np.array(codes) if np is not None else codes
+
+
+def _rangs(colonnes, parametre):
+    valeurs = colonnes[parametre]
+    rangs = RANGS.get(parametre)
+    rangs = [rangs[v] for v in valeurs] if rangs else valeurs
+    return np.array(rangs, dtype=float) if np is not None else rangs
+
+
+def baisses(groupes, rangs, prix, tolerance=TOLERANCE):
+    """
+    Paires (i, j) d'un même groupe où j suit i par rang croissant et
+    prix[j] < prix[i] - tolerance
+    """
+    if np is not None:
+        ordre = np.lexsort((rangs, groupes))
+        g, r, p = groupes[ordre], rangs[ordre], prix[ordre]
+        defaut = (g[1:] == g[:-1]) & (r[1:] > r[:-1]) & (p[1:] < p[:-1] - tolerance)
+        k = np.nonzero(defaut)[0]
+        return list(zip(ordre[k].tolist(), ordre[k + 1].tolist()))
+    ordre = sorted(range(len(groupes)), key=lambda i: (groupes[i], rangs[i]))
+    return [(i, j) for i, j in zip(ordre, ordre[1:])
+            if groupes[i] == groupes[j] and rangs[j] > rangs[i] and prix[j] < prix[i] - tolerance]
+
+
+def remises_hors_bornes(avant, apres, remise_min=REMISE_MIN, remise_max=REMISE_MAX):
+    """[(i, taux de remise)] hors de [remise_min, remise_max]"""
+    if np is not None:
+        taux = 1 - apres / avant
+        k = np.nonzero((taux < remise_min - 1e-9) | (taux > remise_max + 1e-9))[0]
+        return list(zip(k.tolist(), taux[k].tolist()))
+    taux = [1 - b / a for a, b in zip(avant, apres)]
+    return [(i, t) for i, t in enumerate(taux) if t < remise_min - 1e-9 or t > remise_max + 1e-9]
+
+
+def verifier(colonnes, tolerance=TOLERANCE, remise_min=REMISE_MIN, remise_max=REMISE_MAX):
+    """Violations des règles de cohérence, triées par règle puis SKU"""
+    skus = colonnes['sku']
+    violations = []
+    for regle, parametre in REGLES.items():
+        autres = [colonnes['type']] + [colonnes[cle] for cle in PARAMETRES if cle != parametre]
+        groupes = _codes(zip(*autres))
+        rangs = _rangs(colonnes, parametre)
+        for colonne in COLONNES_PRIX:
+            prix = colonnes[colonne]
+            for i, j in baisses(groupes, rangs, prix, tolerance):
+                violations.append({
+                    'regle': regle,
+                    'prix': colonne,
+                    'sku': skus[j],
+                    'reference': skus[i],
+                    'valeur': round(float(prix[j]), 2),
+                    'valeur_reference': round(float(prix[i]), 2),
+                    'ecart': round(float(prix[j] - prix[i]), 2),
+                })
+    avant, apres = colonnes['prix_avant_reduction'], colonnes['prix_apres_reduction']
+    for i, taux in remises_hors_bornes(avant, apres, remise_min, remise_max):
+        violations.append({
+            'regle': 'remise',
+            'sku': skus[i],
+            'prix_avant_reduction': round(float(avant[i]), 2),
+            'prix_apres_reduction': round(float(apres[i]), 2),
+            'taux_remise': round(taux, 4),
+        })
+    ordre_regles = list(REGLES) + ['remise']
+    violations.sort(key=lambda v: (ordre_regles.index(v['regle']), v['sku'], v.get('prix', '')))
+    return violations
+
+
+def rapport_coherence(resultats, tolerance=TOLERANCE, remise_min=REMISE_MIN, remise_max=REMISE_MAX):
+    """Rapport de cohérence des résultats {chemin: résultat}"""
+    debut = time.perf_counter()
+    colonnes, sans_prix, non_reconnus = charger_colonnes(resultats)
+    violations = verifier(colonnes, tolerance, remise_min, remise_max)
+    return {
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'duree_secondes': round(time.perf_counter() - debut, 3),
+        'numpy': np is not None,
+        'tolerance': tolerance,
+        'remise_min': remise_min,
+        'remise_max': remise_max,
+        'total': len(resultats),
+        'verifies': len(colonnes['sku']),
+        'sans_prix': len(sans_prix),
+        'non_reconnus': non_reconnus,
+        'par_regle': dict(Counter(v['regle'] for v in violations)),
+        'skus': sorted({v['sku'] for v in violations}),
+        'violations': violations,
+    }
+
+
+def afficher(rapport, chemin=FICHIER_RAPPORT, nombre=20):
+    print(f"🔎 {rapport['verifies']}/{rapport['total']} résultats vérifiés en {rapport['duree_secondes']:.2f} s"
+          f"{'' if rapport['numpy'] else ' (sans numpy)'}")
+    if rapport['sans_prix']:
+        print(f"   Sans prix complets (non vérifiés) : {rapport['sans_prix']}")
+    if rapport['non_reconnus']:
+        print(f"   ⚠️  SKU non reconnus (non vérifiés) : {len(rapport['non_reconnus'])}")
+    if not rapport['violations']:
+        print("✅ Aucune incohérence de prix")
+        return
+    print(f"❌ {len(rapport['violations'])} violations, {len(rapport['skus'])} SKU concernés :")
+    for regle, n in rapport['par_regle'].items():
+        print(f"   {regle:<12} {n}")
+    for v in rapport['violations'][:nombre]:
+        if v['regle'] == 'remise':
+            print(f"   - [remise] {v['sku']} : {100 * v['taux_remise']:.1f} % "
+                  f"({v['prix_avant_reduction']:.2f} € -> {v['prix_apres_reduction']:.2f} €)")
+        else:
+            print(f"   - [{v['regle']}] {v['sku']} : {v['valeur']:.2f} € < {v['reference']} : "
+                  f"{v['valeur_reference']:.2f} € ({v['prix']})")
+    if len(rapport['violations']) > nombre:
+        print(f"   ... et {len(rapport['violations']) - nombre} autres")
+    print(f"\n💾 Rapport complet : {chemin}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie la cohérence des prix extraits (monotonie, G <= PT, "
+                                                 "N <= P, remise)")
+    parser.add_argument('--stockage', choices=STOCKAGES, help="Stockage des résultats (défaut : celui déjà utilisé)")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="Écart de prix ignoré, en € (défaut : %(default)s)")
+    parser.add_argument('--remise-min', type=float, default=REMISE_MIN,
+                        help="Taux de remise minimal (défaut : %(default)s)")
+    parser.add_argument('--remise-max', type=float, default=REMISE_MAX,
+                        help="Taux de remise maximal (défaut : %(default)s)")
+    parser.add_argument('--rapport', default=FICHIER_RAPPORT, help="Fichier du rapport (défaut : %(default)s)")
+    args = parser.parse_args()
+
+    if not any(os.path.exists(f) for f in (FICHIER_BASE, FICHIER_JOURNAL, RESULTATS_JSON)):
+        print(f"❌ Ni {FICHIER_BASE}, ni {FICHIER_JOURNAL}, ni {RESULTATS_JSON} : "
+              f"lancez d'abord extract_prices_and_components.py")
+        sys.exit(1)
+
+    base = ouvrir_stockage(args.stockage, intervalle_compaction=None)
+    try:
+        resultats = base.resultats()
+    finally:
+        base.fermer()
+
+    rapport = rapport_coherence(resultats, tolerance=args.tolerance,
+                                remise_min=args.remise_min, remise_max=args.remise_max)
+    ecrire_json_atomique(args.rapport, rapport, indent=1)
+    afficher(rapport, args.rapport)
+    if rapport['violations']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,767 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lecture et modification directe d'un .xlsx (zip + XML), sans openpyxl
+======================================================================
+
+Un classeur généré ne diffère du template que par quelques cellules de la
+feuille Configure. Ce module permet de :
+- enregistrer ces cellules : FeuilleEnregistreuse rejoue configurer(ws, variant)
+  d'un script generate_*.py et en retient le delta (cellules + défusions)
+- préparer une base : template sans calcChain ni valeurs en cache des formules,
+  recalcul complet à l'ouverture (les valeurs en cache seraient celles du template)
+- appliquer un delta à la base : seule la feuille Configure est réécrite et
+  recompressée, les autres parties sont recopiées octet pour octet dans le zip
+- normaliser un .xlsx écrit par openpyxl (dates du zip, ordre des parties,
+  dates de docProps/core.xml) : mêmes entrées -> mêmes octets
+- lire quelques valeurs calculées (lire_cellules) : seules les feuilles
+  demandées sont analysées, en flux, jusqu'à la dernière ligne utile ;
+  lire_sorties en tire les prix, la configuration et les composants
+
+Appliquer un delta prend quelques millisecondes, contre ~0.4 s pour un
+chargement + enregistrement openpyxl.
+"""
+
+import html
+import io
+import posixpath
+import re
+import struct
+import zipfile
+import zlib
+
+RE_CELLULE = re.compile(r'<c\s[^>]*?(?:/>|>.*?</c>)', re.S)
+RE_LIGNE = re.compile(r'<row\s[^>]*?(?:/>|>.*?</row>)', re.S)
+RE_REF = re.compile(r'^([A-Z]+)(\d+)$')
+
+NOM_FEUILLE_CONFIGURE = 'Configure'
+# Sorties lues après le calcul par Excel (lire_sorties)
+NOM_FEUILLE_PRC = 'PRC import'
+CELLULES_PRIX = {'prix_brut': 'H7', 'remise': 'H8', 'prix_net': 'H9'}
+CELLULES_CONFIGURE = {'largeur': 'B1', 'profondeur': 'A2', 'treatment': 'B16', 'version': 'B17'}
+LIGNES_COMPOSANTS = range(2, 111)  # composants : PRC import A2:E110
+
+# Date des parties d'un zip normalisé (plus petite date DOS)
+DATE_ZIP_FIXE = (1980, 1, 1, 0, 0, 0)
+# Date de docProps/core.xml quand la référence n'en a pas
+DATE_DOCPROPS_FIXE = '1980-01-01T00:00:00Z'
+RE_DATE_DOCPROPS = re.compile(r'(<dcterms:(created|modified)\b[^>]*>)(.*?)(</dcterms:\2>)', re.S)
+
+
+# ---------------------------------------------------------------------------
+# Références de cellules
+# ---------------------------------------------------------------------------
+
+def lettre_colonne(colonne):
+    """1 -> 'A', 28 -> 'AB'"""
+    lettres = ''
+    while colonne:
+        colonne, reste = divmod(colonne - 1, 26)
+        lettres = chr(65 + reste) + lettres
+    return lettres
+
+
+def index_colonne(lettres):
+    """'A' -> 1, 'AB' -> 28"""
+    colonne = 0
+    for lettre in lettres:
+        colonne = colonne * 26 + ord(lettre) - 64
+    return colonne
+
+
+def decouper_ref(ref):
+    """'B16' -> (16, 2)"""
+    m = RE_REF.match(ref)
+    if not m:
+        raise ValueError(f"Référence de cellule invalide : {ref}")
+    return int(m.group(2)), index_colonne(m.group(1))
+
+
+def ref_cellule(ligne, colonne):
+    """(16, 2) -> 'B16'"""
+    return f'{lettre_colonne(colonne)}{ligne}'
+
+
+def cellules_plage(plage):
+    """'A33:B33' -> [(33, 1), (33, 2)] (ligne par ligne)"""
+    debut, _, fin = plage.partition(':')
+    ligne_min, col_min = decouper_ref(debut)
+    ligne_max, col_max = decouper_ref(fin or debut)
+    return [(ligne, col) for ligne in range(ligne_min, ligne_max + 1)
+            for col in range(col_min, col_max + 1)]
+
+
+def _attribut(balise, nom):
+    """Lit un attribut dans une balise XML brute"""
+    m = re.search(rf'\s{nom}="([^"]*)"', balise)
+    return m.group(1) if m else None
+
+
+# ---------------------------------------------------------------------------
+# Zip brut : les parties non modifiées sont recopiées sans décompression
+# ---------------------------------------------------------------------------
+
+class PartieZip:
+    """Partie d'un zip, gardée sous sa forme compressée"""
+
+    __slots__ = ('nom', 'methode', 'crc', 'taille_compressee', 'taille', 'date_heure', 'donnees')
+
+    def __init__(self, nom, methode, crc, taille_compressee, taille, date_heure, donnees):
+        self.nom = nom
+        self.methode = methode
+        self.crc = crc
+        self.taille_compressee = taille_compressee
+        self.taille = taille
+        self.date_heure = date_heure
+        self.donnees = donnees
+
+    @classmethod
+    def depuis_contenu(cls, nom, contenu, date_heure=DATE_ZIP_FIXE):
+        """Compresse (deflate) un contenu décompressé"""
+        compresseur = zlib.compressobj(6, zlib.DEFLATED, -15)
+        donnees = compresseur.compress(contenu) + compresseur.flush()
+        return cls(nom, zipfile.ZIP_DEFLATED, zlib.crc32(contenu), len(donnees),
+                   len(contenu), date_heure, donnees)
+
+    def contenu(self):
+        """Contenu décompressé"""
+        if self.methode == zipfile.ZIP_STORED:
+            return self.donnees
+        return zlib.decompress(self.donnees, -15)
+
+
+def lire_zip_brut(contenu):
+    """Liste des parties d'un zip (octets), dans l'ordre de l'archive"""
+    parties = []
+    with zipfile.ZipFile(io.BytesIO(contenu)) as z:
+        for info in z.infolist():
+            if info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                raise ValueError(f"{info.filename} : compression non prise en charge")
+            # En-tête local : 30 octets + nom + champ extra (longueurs aux octets 26-29)
+            longueur_nom, longueur_extra = struct.unpack_from('<HH', contenu, info.header_offset + 26)
+            debut = info.header_offset + 30 + longueur_nom + longueur_extra
+            parties.append(PartieZip(info.filename, info.compress_type, info.CRC, info.compress_size,
+                                     info.file_size, info.date_time,
+                                     contenu[debut:debut + info.compress_size]))
+    return parties
+
+
+def _date_dos(date_heure):
+    annee, mois, jour, heure, minute, seconde = date_heure
+    return (((annee - 1980) << 9) | (mois << 5) | jour,
+            (heure << 11) | (minute << 5) | (seconde // 2))
+
+
+def ecrire_zip_brut(parties):
+    """Assemble un zip à partir de parties déjà compressées ; retourne les octets"""
+    sortie = io.BytesIO()
+    repertoire = []
+    for partie in parties:
+        nom = partie.nom.encode('utf-8')
+        drapeaux = 0x800 if not partie.nom.isascii() else 0
+        date, heure = _date_dos(partie.date_heure)
+        position = sortie.tell()
+        sortie.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, 20, drapeaux, partie.methode, heure, date,
+                                 partie.crc, partie.taille_compressee, partie.taille, len(nom), 0))
+        sortie.write(nom)
+        sortie.write(partie.donnees)
+        repertoire.append(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, drapeaux, partie.methode,
+                                      heure, date, partie.crc, partie.taille_compressee, partie.taille,
+                                      len(nom), 0, 0, 0, 0, 0, position) + nom)
+    debut_repertoire = sortie.tell()
+    for entree in repertoire:
+        sortie.write(entree)
+    taille_repertoire = sortie.tell() - debut_repertoire
+    sortie.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, len(parties), len(parties),
+                             taille_repertoire, debut_repertoire, 0))
+    return sortie.getvalue()
+
+
+def _ordre_parties(nom):
+    """[Content_Types].xml puis _rels/.rels en tête (comme Excel), le reste par nom"""
+    return ({'[Content_Types].xml': 0, '_rels/.rels': 1}.get(nom, 2), nom)
+
+
+def dates_docprops(contenu):
+    """{'created': ..., 'modified': ...} de docProps/core.xml d'un .xlsx (octets)"""
+    with zipfile.ZipFile(io.BytesIO(contenu)) as z:
+        if 'docProps/core.xml' not in z.namelist():
+            return {}
+        core = z.read('docProps/core.xml').decode('utf-8')
+    return {m.group(2): m.group(3) for m in RE_DATE_DOCPROPS.finditer(core)}
+
+
+def normaliser_xlsx(contenu, reference=None):
+    """
+    Rend un .xlsx (octets) déterministe ; retourne les octets.
+    - toutes les parties datées de DATE_ZIP_FIXE
+    - parties triées ([Content_Types].xml et _rels/.rels en tête)
+    - dates created / modified de docProps/core.xml reprises de la référence
+      (le template : openpyxl y met l'heure de l'enregistrement), sinon DATE_DOCPROPS_FIXE
+    Les données compressées sont recopiées telles quelles, sauf docProps/core.xml.
+    Deux classeurs construits à partir des mêmes entrées (template, variant, version
+    d'openpyxl) ont alors les mêmes octets, quels que soient la machine et l'heure.
+    """
+    dates = dates_docprops(reference) if reference is not None else {}
+    parties = []
+    for partie in sorted(lire_zip_brut(contenu), key=lambda p: _ordre_parties(p.nom)):
+        if partie.nom == 'docProps/core.xml':
+            core = RE_DATE_DOCPROPS.sub(
+                lambda m: m.group(1) + dates.get(m.group(2), DATE_DOCPROPS_FIXE) + m.group(4),
+                partie.contenu().decode('utf-8'))
+            partie = PartieZip.depuis_contenu(partie.nom, core.encode('utf-8'))
+        else:
+            partie.date_heure = DATE_ZIP_FIXE
+        parties.append(partie)
+    return ecrire_zip_brut(parties)
+
+
+# ---------------------------------------------------------------------------
+# Structure du classeur
+# ---------------------------------------------------------------------------
+
+def chemin_feuille(contenus, nom_feuille):
+    """Partie XML d'une feuille (ex. 'Configure' -> 'xl/worksheets/sheet2.xml')"""
+    workbook = contenus['xl/workbook.xml'].decode('utf-8')
+    rels = contenus['xl/_rels/workbook.xml.rels'].decode('utf-8')
+    for balise in re.findall(r'<sheet\s[^>]*/>', workbook):
+        if html.unescape(_attribut(balise, 'name') or '') != nom_feuille:
+            continue
+        rid = _attribut(balise, 'r:id')
+        for relation in re.findall(r'<Relationship\s[^>]*?/>', rels):
+            if _attribut(relation, 'Id') == rid:
+                cible = _attribut(relation, 'Target')
+                if cible.startswith('/'):
+                    return cible[1:]
+                return posixpath.normpath(posixpath.join('xl', cible))
+    raise KeyError(f"Feuille '{nom_feuille}' introuvable")
+
+
+def _texte_riche(xml):
+    """Texte d'un <si> ou <is> : concaténation des <t>, sans les indications phonétiques"""
+    xml = re.sub(r'<rPh\b.*?</rPh>', '', xml, flags=re.S)
+    return ''.join(html.unescape(t) for t in re.findall(r'<t(?:\s[^>]*)?>(.*?)</t>', xml, flags=re.S))
+
+
+def lire_chaines_partagees(contenus):
+    """Liste des chaînes partagées (xl/sharedStrings.xml)"""
+    xml = contenus.get('xl/sharedStrings.xml')
+    if xml is None:
+        return []
+    return [_texte_riche(si) for si in
+            re.findall(r'<si>(.*?)</si>|<si/>', xml.decode('utf-8'), flags=re.S)]
+
+
+def _nombre(texte):
+    if re.fullmatch(r'-?\d+', texte):
+        return int(texte)
+    return float(texte)
+
+
+def valeur_cellule(xml_cellule, chaines):
+    """
+    Valeur d'une cellule, comme openpyxl (data_only=False) : les formules sont
+    retournées sous la forme '=…' (les formules partagées dépendantes valent '=')
+    """
+    m = re.search(r'<f(?:\s[^>]*)?(?:/>|>(.*?)</f>)', xml_cellule, re.S)
+    if m:
+        return '=' + html.unescape(m.group(1) or '')
+    balise = xml_cellule[:xml_cellule.index('>') + 1]
+    type_cellule = _attribut(balise, 't') or 'n'
+    if type_cellule == 'inlineStr':
+        m = re.search(r'<is>(.*?)</is>', xml_cellule, re.S)
+        return _texte_riche(m.group(1)) if m else ''
+    m = re.search(r'<v>(.*?)</v>', xml_cellule, re.S)
+    if not m or m.group(1) == '':
+        return None
+    texte = html.unescape(m.group(1))
+    if type_cellule == 's':
+        return chaines[int(texte)]
+    if type_cellule == 'b':
+        return texte == '1'
+    if type_cellule in ('str', 'e'):
+        return texte
+    return _nombre(texte)
+
+
+def _section(xml, balise):
+    """(début, fin) du contenu d'un élément <balise>…</balise> ; None si absent ou vide"""
+    debut = xml.find(f'<{balise}>')
+    if debut < 0:
+        return None
+    debut += len(balise) + 2
+    return debut, xml.index(f'</{balise}>', debut)
+
+
+def lire_valeurs(xml_feuille, chaines):
+    """Valeurs de toutes les cellules non vides d'une feuille : {ref: valeur}"""
+    section = _section(xml_feuille, 'sheetData')
+    if section is None:
+        return {}
+    valeurs = {}
+    for cellule in RE_CELLULE.findall(xml_feuille, *section):
+        valeur = valeur_cellule(cellule, chaines)
+        if valeur is not None:
+            valeurs[_attribut(cellule, 'r')] = valeur
+    return valeurs
+
+
+def lire_fusions(xml_feuille):
+    """Plages fusionnées d'une feuille (['I2:J3', 'A33:B33', ...])"""
+    return re.findall(r'<mergeCell\s+ref="([^"]+)"\s*/>', xml_feuille)
+
+
+# ---------------------------------------------------------------------------
+# Lecture ciblée des valeurs calculées
+# ---------------------------------------------------------------------------
+
+NS_PRINCIPAL = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+
+
+def _texte_element(element):
+    """Texte d'un <si> ou <is> analysé : <t> directs et <t> des <r>, sans <rPh>"""
+    morceaux = []
+    for enfant in element:
+        if enfant.tag == f'{NS_PRINCIPAL}t':
+            morceaux.append(enfant.text or '')
+        elif enfant.tag == f'{NS_PRINCIPAL}r':
+            t = enfant.find(f'{NS_PRINCIPAL}t')
+            if t is not None:
+                morceaux.append(t.text or '')
+    return ''.join(morceaux)
+
+
+def _valeur_en_cache(cellule):
+    """
+    Valeur en cache d'un <c> analysé, comme openpyxl avec data_only=True (sans
+    conversion des dates) ; une chaîne partagée est retournée sous la forme
+    ('s', index), résolue ensuite par lire_cellules.
+    """
+    type_cellule = cellule.get('t', 'n')
+    if type_cellule == 'inlineStr':
+        element = cellule.find(f'{NS_PRINCIPAL}is')
+        return _texte_element(element) if element is not None else None
+    v = cellule.find(f'{NS_PRINCIPAL}v')
+    if v is None or not v.text:
+        return None
+    if type_cellule == 's':
+        return ('s', int(v.text))
+    if type_cellule == 'b':
+        return v.text == '1'
+    if type_cellule in ('str', 'e'):
+        return v.text
+    return _nombre(v.text)
+
+
+def _lire_feuille_en_flux(flux, refs):
+    """
+    {ref: valeur en cache} des cellules refs d'une feuille, lue en flux
+    (iterparse) : la lecture s'arrête à la fin de la dernière ligne demandée.
+    """
+    import xml.etree.ElementTree as ET
+
+    ligne_max = max(decouper_ref(ref)[0] for ref in refs)
+    valeurs = {}
+    ligne_courante = 0
+    for _, element in ET.iterparse(flux, events=('end',)):
+        if element.tag == f'{NS_PRINCIPAL}c':
+            ref = element.get('r')
+            if ref in refs:
+                valeurs[ref] = _valeur_en_cache(element)
+        elif element.tag == f'{NS_PRINCIPAL}row':
+            ligne_courante = int(element.get('r') or ligne_courante + 1)
+            element.clear()
+            if ligne_courante >= ligne_max:
+                break
+        elif element.tag == f'{NS_PRINCIPAL}sheetData':
+            break
+    return valeurs
+
+
+def _lire_chaines_en_flux(flux, index):
+    """{index: texte} des chaînes partagées demandées, lues jusqu'à la plus grande"""
+    import xml.etree.ElementTree as ET
+
+    index_max = max(index)
+    chaines = {}
+    courant = 0
+    for _, element in ET.iterparse(flux, events=('end',)):
+        if element.tag != f'{NS_PRINCIPAL}si':
+            continue
+        if courant in index:
+            chaines[courant] = _texte_element(element)
+        element.clear()
+        if courant >= index_max:
+            break
+        courant += 1
+    return chaines
+
+
+def lire_cellules(source, demandes):
+    """
+    Valeurs calculées (en cache) de quelques cellules, sans charger le classeur :
+    seules les feuilles demandées sont décompressées et analysées, en flux, et
+    chacune est abandonnée après sa dernière ligne demandée ; seules les chaînes
+    partagées utilisées sont lues.
+    source : chemin ou octets du .xlsx ; demandes : {nom de feuille: refs}
+    Retourne {nom de feuille: {ref: valeur}} (None pour une cellule vide ou absente).
+    KeyError si une feuille est introuvable.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as z:
+        contenus = {nom: z.read(nom) for nom in ('xl/workbook.xml', 'xl/_rels/workbook.xml.rels')}
+        resultat = {}
+        for nom_feuille, refs in demandes.items():
+            refs = set(refs)
+            with z.open(chemin_feuille(contenus, nom_feuille)) as flux:
+                valeurs = _lire_feuille_en_flux(flux, refs) if refs else {}
+            resultat[nom_feuille] = {ref: valeurs.get(ref) for ref in refs}
+
+        index = {valeur[1] for valeurs in resultat.values() for valeur in valeurs.values()
+                 if isinstance(valeur, tuple)}
+        if index:
+            with z.open('xl/sharedStrings.xml') as flux:
+                chaines = _lire_chaines_en_flux(flux, index)
+            for valeurs in resultat.values():
+                for ref, valeur in valeurs.items():
+                    if isinstance(valeur, tuple):
+                        valeurs[ref] = chaines[valeur[1]]
+    return resultat
+
+
+def lire_sorties(source, composants=True):
+    """
+    Sorties d'un classeur calculé par Excel (lire_cellules) :
+    {'prix_brut', 'remise', 'prix_net' (PRC import H7:H9), 'largeur', 'profondeur',
+     'treatment', 'version' (Configure B1, A2, B16, B17),
+     'composants' : lignes A:E de PRC import, de LIGNES_COMPOSANTS (si composants)}
+    """
+    refs_composants = [[ref_cellule(ligne, colonne) for colonne in range(1, 6)]
+                       for ligne in (LIGNES_COMPOSANTS if composants else ())]
+    valeurs = lire_cellules(source, {
+        NOM_FEUILLE_PRC: list(CELLULES_PRIX.values()) + [ref for ligne in refs_composants for ref in ligne],
+        NOM_FEUILLE_CONFIGURE: CELLULES_CONFIGURE.values(),
+    })
+    sorties = {cle: valeurs[NOM_FEUILLE_PRC][ref] for cle, ref in CELLULES_PRIX.items()}
+    sorties.update({cle: valeurs[NOM_FEUILLE_CONFIGURE][ref] for cle, ref in CELLULES_CONFIGURE.items()})
+    if composants:
+        sorties['composants'] = [[valeurs[NOM_FEUILLE_PRC][ref] for ref in ligne] for ligne in refs_composants]
+    return sorties
+
+
+# ---------------------------------------------------------------------------
+# Base : template préparé pour l'application de deltas
+# ---------------------------------------------------------------------------
+
+def _retirer_valeurs_en_cache(xml_feuille):
+    """Retire les valeurs en cache des formules (et leur type) d'une feuille"""
+    def nettoyer(m):
+        cellule = m.group(0)
+        if '<f' not in cellule:
+            return cellule
+        balise = cellule[:cellule.index('>') + 1]
+        balise_sans_type = re.sub(r'\st="[^"]*"', '', balise)
+        corps = re.sub(r'<v>.*?</v>|<v/>', '', cellule[len(balise):], flags=re.S)
+        return balise_sans_type + corps
+    return RE_CELLULE.sub(nettoyer, xml_feuille)
+
+
+def preparer_base(template):
+    """
+    Prépare un template (octets) pour servir de base aux deltas ; retourne les octets.
+    - xl/calcChain.xml retiré (Excel le reconstruit)
+    - valeurs en cache des formules retirées (elles ne valent que pour le template)
+    - recalcul complet à l'ouverture (fullCalcOnLoad)
+    Les cellules et formules sont inchangées.
+    """
+    parties = lire_zip_brut(template)
+    contenus = {p.nom: p.contenu() for p in parties}
+    modifiees = {}
+
+    if 'xl/calcChain.xml' in contenus:
+        rels = contenus['xl/_rels/workbook.xml.rels'].decode('utf-8')
+        rels = re.sub(r'<Relationship\s[^>]*Target="(?:/xl/)?calcChain\.xml"[^>]*/>', '', rels)
+        modifiees['xl/_rels/workbook.xml.rels'] = rels
+        types = contenus['[Content_Types].xml'].decode('utf-8')
+        types = re.sub(r'<Override PartName="/xl/calcChain\.xml"[^>]*/>', '', types)
+        modifiees['[Content_Types].xml'] = types
+
+    workbook = contenus['xl/workbook.xml'].decode('utf-8')
+    m = re.search(r'<calcPr\b[^>]*?/?>', workbook)
+    if m is None:
+        # calcPr suit definedNames (ou sheets) dans le schéma
+        ancre = '</definedNames>' if '</definedNames>' in workbook else '</sheets>'
+        workbook = workbook.replace(ancre, ancre + '<calcPr fullCalcOnLoad="1"/>', 1)
+    elif 'fullCalcOnLoad=' not in m.group(0):
+        workbook = workbook.replace(m.group(0), m.group(0).replace('<calcPr', '<calcPr fullCalcOnLoad="1"', 1), 1)
+    modifiees['xl/workbook.xml'] = workbook
+
+    for nom, contenu in contenus.items():
+        if nom.startswith('xl/worksheets/') and nom.endswith('.xml'):
+            modifiees[nom] = _retirer_valeurs_en_cache(contenu.decode('utf-8'))
+
+    resultat = []
+    for partie in parties:
+        if partie.nom == 'xl/calcChain.xml':
+            continue
+        if partie.nom in modifiees:
+            partie = PartieZip.depuis_contenu(partie.nom, modifiees[partie.nom].encode('utf-8'),
+                                              partie.date_heure)
+        resultat.append(partie)
+    return ecrire_zip_brut(resultat)
+
+
+# ---------------------------------------------------------------------------
+# Application d'un delta
+# ---------------------------------------------------------------------------
+
+def _xml_cellule(ref, valeur, balise_existante=None):
+    """XML d'une cellule ; le style (s) de la cellule existante est conservé"""
+    style = _attribut(balise_existante, 's') if balise_existante else None
+    attributs = f' r="{ref}"' + (f' s="{style}"' if style is not None else '')
+    if valeur is None:
+        return f'<c{attributs}/>'
+    if isinstance(valeur, bool):
+        return f'<c{attributs} t="b"><v>{int(valeur)}</v></c>'
+    if isinstance(valeur, (int, float)):
+        return f'<c{attributs}><v>{valeur!r}</v></c>'
+    if isinstance(valeur, str):
+        if valeur.startswith('='):
+            raise ValueError(f"{ref} : l'écriture de formules n'est pas prise en charge")
+        espace = ' xml:space="preserve"' if valeur != valeur.strip() else ''
+        texte = html.escape(valeur, quote=False)
+        return f'<c{attributs} t="inlineStr"><is><t{espace}>{texte}</t></is></c>'
+    raise TypeError(f"{ref} : type de valeur non pris en charge ({type(valeur).__name__})")
+
+
+def _modifier_ligne(xml_ligne, numero, cellules):
+    """Applique {colonne: (ref, valeur)} à une ligne <row> (None : cellule à supprimer si absente)"""
+    if xml_ligne is None:
+        xml_ligne = f'<row r="{numero}"/>'
+    balise = re.match(r'<row\s[^>]*?/?>', xml_ligne).group(0)
+    corps = xml_ligne[len(balise):-len('</row>')] if not balise.endswith('/>') else ''
+
+    existantes = {}
+    for cellule in RE_CELLULE.findall(corps):
+        existantes[decouper_ref(_attribut(cellule, 'r'))[1]] = cellule
+
+    for colonne, (ref, valeur, supprimer) in cellules.items():
+        ancienne = existantes.get(colonne)
+        if supprimer:
+            existantes.pop(colonne, None)
+            continue
+        if ancienne is not None:
+            m = re.search(r'<f\s[^>]*\bref="', ancienne)
+            if m:
+                raise ValueError(f"{ref} porte une formule partagée ou matricielle : modification impossible")
+        elif valeur is None:
+            continue
+        existantes[colonne] = _xml_cellule(ref, valeur, ancienne)
+
+    # spans n'est qu'une indication, invalide dès qu'une cellule est ajoutée
+    balise = re.sub(r'\sspans="[^"]*"', '', balise)
+    if balise.endswith('/>'):
+        balise = balise[:-2].rstrip() + '>'
+    return balise + ''.join(existantes[c] for c in sorted(existantes)) + '</row>'
+
+
+def _etendre_dimension(xml_feuille, refs):
+    """Élargit <dimension ref="…"/> pour couvrir les cellules écrites"""
+    m = re.search(r'<dimension\s+ref="([^"]+)"\s*/>', xml_feuille)
+    if m is None or not refs:
+        return xml_feuille
+    debut, _, fin = m.group(1).partition(':')
+    ligne_min, col_min = decouper_ref(debut)
+    ligne_max, col_max = decouper_ref(fin or debut)
+    for ref in refs:
+        ligne, col = decouper_ref(ref)
+        ligne_min, ligne_max = min(ligne_min, ligne), max(ligne_max, ligne)
+        col_min, col_max = min(col_min, col), max(col_max, col)
+    plage = f'{ref_cellule(ligne_min, col_min)}:{ref_cellule(ligne_max, col_max)}'
+    return xml_feuille[:m.start(1)] + plage + xml_feuille[m.end(1):]
+
+
+def appliquer_delta_feuille(xml_feuille, cellules, defusions=()):
+    """
+    Applique un delta à l'XML d'une feuille et retourne le nouvel XML.
+    cellules : {ref: valeur} (None vide la cellule en gardant son style)
+    defusions : plages à défusionner ; comme openpyxl, les cellules de la plage
+    autres que la première sont supprimées (avant l'écriture des cellules)
+    """
+    par_ligne = {}
+    for plage in defusions:
+        motif = rf'<mergeCell\s+ref="{re.escape(plage)}"\s*/>'
+        if not re.search(motif, xml_feuille):
+            raise ValueError(f"Plage fusionnée {plage} introuvable")
+        xml_feuille = re.sub(motif, '', xml_feuille)
+        for ligne, colonne in cellules_plage(plage)[1:]:
+            par_ligne.setdefault(ligne, {})[colonne] = (ref_cellule(ligne, colonne), None, True)
+
+    if defusions:
+        restantes = len(lire_fusions(xml_feuille))
+        if restantes:
+            xml_feuille = re.sub(r'(<mergeCells\b[^>]*?\scount=")\d+(")', rf'\g<1>{restantes}\2', xml_feuille)
+        else:
+            xml_feuille = re.sub(r'<mergeCells\b[^>]*?(?:/>|>\s*</mergeCells>)', '', xml_feuille)
+
+    for ref, valeur in cellules.items():
+        ligne, colonne = decouper_ref(ref)
+        par_ligne.setdefault(ligne, {})[colonne] = (ref, valeur, False)
+    if not par_ligne:
+        return xml_feuille
+
+    section = _section(xml_feuille, 'sheetData')
+    if section is None:
+        xml_feuille = xml_feuille.replace('<sheetData/>', '<sheetData></sheetData>', 1)
+        section = _section(xml_feuille, 'sheetData')
+    debut, fin = section
+
+    lignes = {int(_attribut(ligne, 'r')): ligne for ligne in RE_LIGNE.findall(xml_feuille, debut, fin)}
+    for numero, cellules_ligne in par_ligne.items():
+        lignes[numero] = _modifier_ligne(lignes.get(numero), numero, cellules_ligne)
+    sheet_data = ''.join(lignes[n] for n in sorted(lignes))
+
+    xml_feuille = xml_feuille[:debut] + sheet_data + xml_feuille[fin:]
+    return _etendre_dimension(xml_feuille, [ref for ref, valeur in cellules.items() if valeur is not None])
+
+
+class Base:
+    """
+    Base préparée (voir preparer_base), gardée en mémoire sous forme de parties
+    compressées : materialiser() ne recompresse que la feuille Configure.
+    """
+
+    def __init__(self, contenu, nom_feuille=NOM_FEUILLE_CONFIGURE):
+        self.parties = lire_zip_brut(contenu)
+        contenus = {p.nom: p.contenu() for p in self.parties
+                    if p.nom in ('xl/workbook.xml', 'xl/_rels/workbook.xml.rels', 'xl/sharedStrings.xml')}
+        self.chemin_feuille = chemin_feuille(contenus, nom_feuille)
+        self.index_feuille = next(i for i, p in enumerate(self.parties) if p.nom == self.chemin_feuille)
+        self.xml_feuille = self.parties[self.index_feuille].contenu().decode('utf-8')
+        self.chaines = lire_chaines_partagees(contenus)
+        self._valeurs = None
+
+    def valeurs(self):
+        """Valeurs de la feuille Configure de la base"""
+        if self._valeurs is None:
+            self._valeurs = lire_valeurs(self.xml_feuille, self.chaines)
+        return self._valeurs
+
+    def fusions(self):
+        return lire_fusions(self.xml_feuille)
+
+    def enregistrer(self, configurer, variant):
+        """Delta produit par configurer(ws, variant) d'un script generate_*.py"""
+        feuille = FeuilleEnregistreuse(self.valeurs(), self.fusions())
+        configurer(feuille, variant)
+        return feuille.delta()
+
+    def materialiser(self, cellules, defusions=()):
+        """Octets du .xlsx obtenu en appliquant le delta à la base"""
+        xml = appliquer_delta_feuille(self.xml_feuille, cellules, defusions)
+        parties = list(self.parties)
+        ancienne = parties[self.index_feuille]
+        parties[self.index_feuille] = PartieZip.depuis_contenu(ancienne.nom, xml.encode('utf-8'),
+                                                               ancienne.date_heure)
+        return ecrire_zip_brut(parties)
+
+
+# ---------------------------------------------------------------------------
+# Enregistrement du delta d'un variant
+# ---------------------------------------------------------------------------
+
+class _Plage:
+    """Plage fusionnée (sous-ensemble de openpyxl CellRange utilisé par les scripts)"""
+
+    def __init__(self, coord):
+        self.coord = coord
+        debut, _, fin = coord.partition(':')
+        self.min_row, self.min_col = decouper_ref(debut)
+        self.max_row, self.max_col = decouper_ref(fin or debut)
+
+    def __str__(self):
+        return self.coord
+
+
+class _Fusions:
+    def __init__(self, plages):
+        self.ranges = plages
+
+
+class _Cellule:
+    def __init__(self, feuille, ref):
+        self._feuille = feuille
+        self._ref = ref
+
+    @property
+    def value(self):
+        return self._feuille._valeurs.get(self._ref)
+
+    @value.setter
+    def value(self, valeur):
+        self._feuille._ecrire(self._ref, valeur)
+
+
+class FeuilleEnregistreuse:
+    """
+    Remplace la feuille openpyxl passée à configurer(ws, variant) et enregistre
+    les cellules modifiées. Couvre ce qu'utilisent les scripts generate_*.py :
+    ws.cell(row, column).value (lecture/écriture), ws.merged_cells.ranges,
+    ws.unmerge_cells(plage).
+    """
+
+    def __init__(self, valeurs, fusions):
+        self._initiales = dict(valeurs)
+        self._valeurs = dict(valeurs)
+        self._ecrites = []
+        self._defusions = []
+        self.merged_cells = _Fusions([_Plage(plage) for plage in fusions])
+
+    def _cellule_fusionnee(self, ref):
+        """Vrai si ref est une cellule non principale d'une plage fusionnée"""
+        ligne, colonne = decouper_ref(ref)
+        for plage in self.merged_cells.ranges:
+            if (plage.min_row <= ligne <= plage.max_row and plage.min_col <= colonne <= plage.max_col
+                    and (ligne, colonne) != (plage.min_row, plage.min_col)):
+                return True
+        return False
+
+    def _ecrire(self, ref, valeur):
+        if self._cellule_fusionnee(ref):
+            # Comme openpyxl (MergedCell)
+            raise AttributeError(f"{ref} fait partie d'une plage fusionnée : valeur en lecture seule")
+        if valeur is None:
+            self._valeurs.pop(ref, None)
+        else:
+            self._valeurs[ref] = valeur
+        if ref not in self._ecrites:
+            self._ecrites.append(ref)
+
+    def cell(self, row, column, value=None):
+        cellule = _Cellule(self, ref_cellule(row, column))
+        if value is not None:
+            cellule.value = value
+        return cellule
+
+    def unmerge_cells(self, range_string):
+        plage = next((p for p in self.merged_cells.ranges if p.coord == range_string), None)
+        if plage is None:
+            raise ValueError(f"Cell range {range_string} is not merged")
+        self.merged_cells.ranges.remove(plage)
+        self._defusions.append(range_string)
+        # Les cellules autres que la première sont supprimées
+        for ligne, colonne in cellules_plage(range_string)[1:]:
+            ref = ref_cellule(ligne, colonne)
+            self._valeurs.pop(ref, None)
+            self._initiales.pop(ref, None)
+
+    def delta(self):
+        """{'cellules': {ref: valeur}, 'defusions': [plages]} : écart avec la base"""
+        cellules = {}
+        for ref in sorted(self._ecrites, key=decouper_ref):
+            valeur = self._valeurs.get(ref)
+            initiale = self._initiales.get(ref)
+            if (type(valeur), valeur) != (type(initiale), initiale):
+                cellules[ref] = valeur
+        return {'cellules': cellules, 'defusions': list(self._defusions)}